@@ -1,275 +1,195 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
 import os
+import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Dict, Any, Callable, Literal, Optional, AsyncIterator, Tuple
 
-from openai import OpenAI
 from openai import NotFoundError, RateLimitError
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import ValidationError, BaseModel
 
 from app.core.config import settings
-from app.schemas.content import ContentRequest, ContentResponse, ContentSuggestion, ImageGenerationRequest, ImageGenerationResponse, PlaceSearchRequest, PlaceSearchResponse, Place, CustomPromptRequest, CustomPromptResponse, PublishContentRequest, PublishedContentItem, PublishedContentResponse
+from app.services import codec
+from app.services.batch import Budget, BudgetExceededError, map_bounded
+from app.services.cache import TTLCache, normalize_text
+from app.services.compression import compression_cache
+from app.services.counter_buffer import CounterBuffer
+from app.services.ids import new_item_id
+from app.services.job_queue import Job, JobQueue, QueueFullError
+from app.services.image_store import image_pipeline
+from app.services.json_stream import ArrayStreamParser
+from app.services.llm import AllModelsFailedError, LLMOutputError, complete_with_fallback, hedge_stats, model_router, record_usage, usage_stats
+from app.services.llm_output import output_stats, parse_llm_json
+from app.services.openai_client import client
+from app.services.prompts import CONTENT_SUGGESTIONS, PLACES_MAX_TOKENS, Prompt, completion_budget, content_words, custom_words, prompt_registry
+from app.services.publish_index import InvalidCursorError
+from app.services.publish_store import CounterDelta, create_publish_store
+from app.services.rate_limiter import RateLimitTimeout, call_limited, chat_limiter, image_limiter
+from app.services.singleflight import SingleFlight
+from app.services.tokens import count_tokens
+from app.schemas.content import ContentRequest, ContentResponse, ContentBatchRequest, ContentBatchItemResult, ContentBatchSummary, ContentSuggestion, ImageGenerationRequest, ImageGenerationResponse, ImageJobResponse, PlaceSearchRequest, PlaceSearchResponse, Place, CustomPromptRequest, CustomPromptResponse, PublishContentRequest, PublishedContentItem, PublishedContentResponse, PublishedSearchResponse, AnalyticsEvent, AnalyticsIngestResponse, AnalyticsItemResult
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Configure OpenAI client
-client = OpenAI(api_key=settings.openai_api_key)
+publish_store = create_publish_store(
+    settings.publish_store_backend,
+    snapshot_path=settings.publish_store_path,
+    sqlite_path=settings.publish_sqlite_path,
+    fsync=settings.publish_log_fsync,
+    compact_json=settings.publish_store_compact_json,
+)
+counter_buffer = CounterBuffer(publish_store, max_pending=settings.analytics_flush_max_pending)
 
-PUBLISH_STORE_PATH = os.path.join("be", "static", "generated", "published_content.json")
+# Serialized published-content responses, keyed by ETag and query
+published_response_cache = TTLCache(
+    max_entries=settings.published_response_cache_entries,
+    ttl_seconds=settings.published_response_cache_ttl_seconds,
+)
+# Distinguishes ETags across restarts, since store versions start over
+_ETAG_EPOCH = os.urandom(4).hex()
+# Sorts on stored counters: their order changes when buffered counts flush
+COUNTER_SORTS = ("views", "shares", "engagement_rate")
+# Builds of a conditional response before serving it untagged
+CONDITIONAL_BUILD_ATTEMPTS = 3
 
+# Popular typeahead queries repeat constantly; cache their place lists
+search_cache = TTLCache(
+    max_entries=settings.search_cache_max_entries,
+    ttl_seconds=settings.search_cache_ttl_seconds,
+    persist_path=settings.search_cache_path,
+)
 
-def _ensure_publish_store() -> None:
-    os.makedirs(os.path.dirname(PUBLISH_STORE_PATH), exist_ok=True)
-    if not os.path.exists(PUBLISH_STORE_PATH):
-        with open(PUBLISH_STORE_PATH, "w") as f:
-            json.dump({"items": []}, f)
 
+def _search_cache_key(payload: PlaceSearchRequest) -> str:
+    return f"{normalize_text(payload.language)}|{normalize_text(payload.query)}"
 
 
+# Identical generate-content requests in flight share one upstream completion
+generate_flight = SingleFlight()
+generate_cache = TTLCache(
+    max_entries=settings.generate_cache_max_entries,
+    ttl_seconds=settings.generate_cache_ttl_seconds,
+)
 
 
-def _write_publish_store(data: Dict[str, Any]) -> None:
-    _ensure_publish_store()
-    with open(PUBLISH_STORE_PATH, "w") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def _content_request_key(payload: ContentRequest) -> str:
+    canonical = {
+        "destination": normalize_text(payload.destination),
+        "start_date": normalize_text(payload.start_date or ""),
+        "end_date": normalize_text(payload.end_date or ""),
+        "content_type": normalize_text(payload.content_type or "Blog Post"),
+        "language": normalize_text(payload.language),
+        "tone": normalize_text(payload.tone or "friendly and informative"),
+    }
+    return json.dumps(canonical, sort_keys=True)
 
 
-def _migrate_existing_items(store: Dict[str, Any]) -> None:
-    """Migrate existing items to include new analytics fields."""
-    try:
-        items = store.get("items", [])
-        migrated = False
-        valid_items = []
-        
-        for item in items:
-            # Skip items that are missing essential fields
-            if not item.get("id") or not item.get("title"):
-                logger.warning(f"Skipping invalid item: {item}")
-                continue
-                
-            # Add missing analytics fields if they don't exist
-            if "views" not in item:
-                item["views"] = 0
-                migrated = True
-            if "shares" not in item:
-                item["shares"] = 0
-                migrated = True
-            if "engagement_rate" not in item:
-                item["engagement_rate"] = 0.0
-                migrated = True
-            if "growth_rate" not in item:
-                item["growth_rate"] = 0.0
-                migrated = True
-            if "created_at" not in item:
-                item["created_at"] = item.get("date", "")
-                migrated = True
-            if "last_viewed" not in item:
-                item["last_viewed"] = None
-                migrated = True
-            
-            valid_items.append(item)
-        
-        # Update store with only valid items
-        store["items"] = valid_items
-        
-        if migrated or len(valid_items) != len(items):
-            logger.info(f"Migrated existing items and cleaned up. Valid items: {len(valid_items)}")
-    except Exception as e:
-        logger.error(f"Error during migration: {e}")
+def _content_prompt(payload: ContentRequest) -> Prompt:
+    content_type = payload.content_type or 'Blog Post'
+    return prompt_registry.render(
+        "content",
+        max_tokens=completion_budget(content_words(content_type), CONTENT_SUGGESTIONS, payload.language),
+        destination=payload.destination,
+        start_date=payload.start_date or 'N/A',
+        end_date=payload.end_date or 'N/A',
+        content_type=content_type,
+        language=payload.language,
+        tone=payload.tone or 'friendly and informative',
+        count=CONTENT_SUGGESTIONS,
+    )
 
 
-def _read_publish_store() -> Dict[str, Any]:
-    _ensure_publish_store()
-    with open(PUBLISH_STORE_PATH, "r") as f:
-        try:
-            store = json.load(f)
-            # Migrate existing items when reading (pass store to avoid recursion)
-            _migrate_existing_items(store)
-            return store
-        except Exception:
-            return {"items": []}
+def _build_suggestion(suggestion: Dict[str, Any], payload: ContentRequest) -> ContentSuggestion:
+    """Build a ContentSuggestion from raw model output, filling missing fields."""
+    return ContentSuggestion(
+        title=suggestion.get('title', 'Untitled'),
+        content=suggestion.get('content', 'No content available'),
+        type=suggestion.get('type', payload.content_type or 'Blog Post'),
+        reading_time=suggestion.get('reading_time', '2 min'),
+        quality=suggestion.get('quality', 'High'),
+        tags=suggestion.get('tags', []),
+        highlights=suggestion.get('highlights', []),
+        neighborhoods=suggestion.get('neighborhoods', []),
+        recommended_spots=suggestion.get('recommended_spots', []),
+        price_range=suggestion.get('price_range'),
+        best_times=suggestion.get('best_times'),
+        cautions=suggestion.get('cautions'),
+    )
+
 
 @router.post("/generate-content", response_model=ContentResponse)
 async def generate_content(payload: ContentRequest) -> ContentResponse:
-    """Generate AI-powered travel content suggestions."""
+    """Generate AI-powered travel content suggestions.
+
+    Concurrent identical requests are coalesced onto a single completion.
+    """
+    key = _content_request_key(payload)
+    cached = generate_cache.get(key)
+    if cached is not None:
+        return ContentResponse(**cached)
+
+    async def _run() -> ContentResponse:
+        result = await _generate_content(payload)
+        generate_cache.set(key, result.model_dump())
+        return result
+
+    return await generate_flight.do(key, _run)
+
+
+async def _generate_content(payload: ContentRequest) -> ContentResponse:
     try:
-        # Define candidate models to try in order
-        candidate_models = [
-            settings.openai_model,
-            "gpt-4o-mini",
-            "gpt-4o",
-            "gpt-4-1106-preview"
-        ]
-        
-        system_instructions = (
-            'You are a senior travel editor (think Time Out / Eater / FT Weekend). '
-            'Write vivid, useful copy grounded ONLY in provided inputs. No fabrication.\n\n'
-            'VOICE & STYLE\n'
-            '- Lead with a concrete hook (what it is + why now).\n'
-            '- Use specific nouns, short sensory details, and service info.\n'
-            '- Prefer verbs over adjectives. No hype, no exclamation marks, no rhetorical questions.\n'
-            '- Active voice. Mix sentence lengths. British English if destination/language implies it.\n\n'
-            'CONTENT RULES (hard)\n'
-            '- Facts must come from inputs. If unknown, use tempered phrasing ("often", "typically", "many vendors")—never invent brand names, dates, or schedules.\n'
-            '- Anchor each suggestion to ONE clear PLACE/event/venue (from title → recommended_spots → neighborhoods → destination).\n'
-            '- Include at least one micro-itinerary action sequence (arrive → do → eat/see → where to stand/sit).\n'
-            '- Include 1–2 practical tips (timing, crowd avoidance, payment, seating, nearest area).\n'
-            '- Include seasonal/temporal cues ONLY if present or safely inferable (e.g., "late summer" → summer).\n'
-            '- Numbers only if present in inputs; otherwise use qualitative ranges (e.g., "£", "moderate").\n'
-            '- Ban clichés & filler: hidden gem, bustling, vibrant, picturesque, must-see, must-try, rich tapestry, iconic, enchanting, unforgettable, culinary journey, delectable, mouthwatering, gem.\n\n'
-            'PRICE RULES:\n'
-            '- For price_range: Use descriptive terms like "Free", "Budget-friendly", "Moderate", "Premium", "Luxury" or specific ranges like "£5-15", "€20-50"\n'
-            '- NEVER use just "$", "$$", "$$$" symbols\n'
-            '- If price is unknown, set price_range to null\n'
-            '- Be specific about what the price covers (entry fee, meal, activity, etc.)\n\n'
-            'OUTPUT (JSON only; no markdown, no extra keys):\n'
-            '{\n'
-            '  "suggestions": [{\n'
-            '    "title": str,                  // concrete + specific\n'
-            '    "content": str,                // 35–60 words IG, 60–100 FB, 80–130 Blog\n'
-            '    "type": str,                   // content type\n'
-            '    "reading_time": str,           // e.g., "45 sec" or "3 min"\n'
-            '    "quality": "High" | "Medium",\n'
-            '    "tags": [str],\n'
-            '    "highlights": [str],           // 3–5 terse bullets; concrete (things to do/eat/see)\n'
-            '    "neighborhoods": [str],\n'
-            '    "recommended_spots": [str],    // venues/landmarks actually referenced in content\n'
-            '    "price_range": str | null,     // descriptive price info or null if unknown\n'
-            '    "best_times": str | null,      // only if in inputs or safely inferred\n'
-            '    "cautions": str | null         // e.g., crowds, queues, cashless\n'
-            '  }]\n'
-            '}\n\n'
-            'VALIDATION (before output)\n'
-            '- The PLACE referenced in content MUST appear in recommended_spots or neighborhoods.\n'
-            '- Each highlight must be a tangible action/item (not generic praise).\n'
-            '- Remove banned words. If any remain, rewrite once then output.\n'
-            '- Price_range must be descriptive, not just symbols.'
-        )
+        prompt = _content_prompt(payload)
 
-        user_prompt = (
-            f"Destination: {payload.destination}\n"
-            f"Dates: {payload.start_date or 'N/A'} to {payload.end_date or 'N/A'}\n"
-            f"Preferred content type: {payload.content_type or 'Blog Post'}\n"
-            f"Language: {payload.language}\n"
-            f"Tone: {payload.tone or 'friendly and informative'}\n\n"
-            'TASK\n'
-            'Create 3 tailored suggestion(s) as if filed by a reporter on the ground. Choose ONE specific PLACE per suggestion (title → recommended_spots → neighborhoods → destination). Use only input-safe facts; otherwise hedge.\n\n'
-            'FOR EACH SUGGESTION\n'
-            '- Hook sentence: what it is + why go now (seasonal cue if provided).\n'
-            '- 1–2 sentences with concrete, sensory specifics taken from inputs (e.g., named dishes, stall types, river views, arches).\n'
-            '- Micro-itinerary: arrive timing (if present/safe), do → eat/see → where to sit/stand (e.g., waterfront tables, shaded arcade).\n'
-            '- One practical tip: crowds/payment/seating/weather/transport (generic if not provided, e.g., "arrive early to secure a table").\n'
-            '- Keep copy tight; avoid brand/vendor names unless they appear in inputs.\n'
-            '- Word count by type: Blog 80–130, Instagram 35–60, Facebook 60–100.\n\n'
-            'STRUCTURE\n'
-            '- Fill all schema fields.\n'
-            '- "quality": set to High if copy includes hook + micro-itinerary + practical tip + concrete nouns; else Medium.\n'
-            '- "best_times": only if in inputs or safely inferred (e.g., "late mornings" → "morning", "Saturdays August–September" → "summer weekends").\n'
-            '- "price_range": $, ££, etc. if present; else null.\n'
-            '- "cautions": crowding/queues/weather if hinted; else null.\n\n'
-            'CHECKS\n'
-            '- No invented facts, dates, or exact times.\n'
-            '- No clichés or banned words.\n'
-            '- British vs US spelling must match Language/Destination context.\n'
-            '- Output ONLY valid JSON per schema.'
-        )
+        def _parse(content: str, model: str) -> ContentResponse:
+            data = parse_llm_json(content, kind="content", list_key="suggestions")
+            raw_suggestions = data.get('suggestions') if isinstance(data, dict) else data
+            if not isinstance(raw_suggestions, list):
+                raise LLMOutputError("response has no 'suggestions' list")
 
-        # Try each model until one works
-        last_error = None
-        for model in candidate_models:
-            try:
-                logger.info(f"Attempting to use model: {model}")
-                
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_instructions},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    temperature=0.55,
-                    presence_penalty=0.2,
-                    max_tokens=2000
-                )
-                
-                content = response.choices[0].message.content.strip()
-                logger.info(f"Successfully generated content with model: {model}")
-                
-                # Try to parse JSON response
-                try:
-                    data = json.loads(content)
-                    suggestions = []
-                    
-                    for suggestion in data.get('suggestions', []):
-                        # Ensure all required fields are present
-                        suggestion_data = {
-                            'title': suggestion.get('title', 'Untitled'),
-                            'content': suggestion.get('content', 'No content available'),
-                            'type': suggestion.get('type', payload.content_type or 'Blog Post'),
-                            'reading_time': suggestion.get('reading_time', '2 min'),
-                            'quality': suggestion.get('quality', 'High'),
-                            'tags': suggestion.get('tags', []),
-                            'highlights': suggestion.get('highlights', []),
-                            'neighborhoods': suggestion.get('neighborhoods', []),
-                            'recommended_spots': suggestion.get('recommended_spots', []),
-                            'price_range': suggestion.get('price_range'),
-                            'best_times': suggestion.get('best_times'),
-                            'cautions': suggestion.get('cautions')
-                        }
-                        suggestions.append(ContentSuggestion(**suggestion_data))
-                    
-                    return ContentResponse(suggestions=suggestions)
-                    
-                except json.JSONDecodeError as json_error:
-                    logger.warning(f"JSON parsing failed for model {model}: {json_error}")
-                    # Fallback: try to extract content even if JSON is malformed
-                    if 'title' in content.lower() and 'content' in content.lower():
-                        # Create a basic fallback suggestion
-                        fallback_suggestion = ContentSuggestion(
-                            title="Travel Guide to " + payload.destination,
-                            content=content[:200] + "..." if len(content) > 200 else content,
-                            type=payload.content_type or "Blog Post",
-                            reading_time="3 min",
-                            quality="Medium",
-                            tags=["Travel", "Guide", payload.destination],
-                            highlights=["Explore local culture", "Discover hidden spots", "Experience authentic cuisine"],
-                            neighborhoods=[],
-                            recommended_spots=[],
-                            price_range=None,
-                            best_times=None,
-                            cautions=None
-                        )
-                        return ContentResponse(suggestions=[fallback_suggestion])
-                    
-                    last_error = json_error
+            suggestions = []
+            for raw in raw_suggestions:
+                if not isinstance(raw, dict) or not raw.get('content'):
                     continue
-                    
-            except NotFoundError as e:
-                logger.warning(f"Model {model} not found: {e}")
-                last_error = e
-                continue
-            except RateLimitError as e:
-                logger.error(f"Rate limit exceeded: {e}")
-                raise HTTPException(
-                    status_code=429, 
-                    detail={"message": "OpenAI API rate limit exceeded. Please check your billing and quota."}
-                )
-            except Exception as e:
-                logger.error(f"Error with model {model}: {e}")
-                last_error = e
-                continue
-        
-        # If we get here, all models failed
-        logger.error(f"All models failed. Last error: {last_error}")
+                try:
+                    suggestions.append(_build_suggestion(raw, payload))
+                except ValidationError as e:
+                    logger.warning(f"Skipping invalid suggestion from model {model}: {e}")
+            # Only an answer with nothing usable is worth another completion
+            if not suggestions:
+                raise LLMOutputError("no usable suggestions in response")
+            return ContentResponse(suggestions=suggestions)
+
+        return await complete_with_fallback(
+            prompt.messages,
+            _parse,
+            operation="content generation",
+            hedge=True,
+            prompt_tokens=prompt.prompt_tokens,
+            temperature=0.55,
+            presence_penalty=0.2,
+            max_tokens=prompt.max_tokens
+        )
+
+    except (RateLimitError, RateLimitTimeout) as e:
+        logger.error(f"Rate limit exceeded: {e}")
+        raise HTTPException(
+            status_code=429, 
+            detail={"message": "OpenAI API rate limit exceeded. Please check your billing and quota."}
+        )
+    except AllModelsFailedError as e:
+        logger.error(str(e))
         raise HTTPException(
             status_code=500, 
             detail={"message": "Content generation failed. Please try again later."}
         )
-        
     except ValidationError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail={"message": "Invalid request data"})
@@ -277,137 +197,325 @@ async def generate_content(payload: ContentRequest) -> ContentResponse:
         logger.error(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail={"message": "Internal server error"})
 
+
+def _sse_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def _close_stream(stream: Any) -> None:
+    """Close an upstream completion stream so the model stops generating (and billing)."""
+    close = getattr(stream, "close", None)
+    try:
+        if close is not None:
+            await close()
+        else:
+            # Older SDKs: close the underlying HTTP response
+            await stream.response.aclose()
+    except Exception as e:
+        logger.warning(f"Failed to close upstream stream: {e}")
+
+
+async def _stream_suggestions(payload: ContentRequest) -> AsyncIterator[str]:
+    """Yield each suggestion as an SSE event as soon as its JSON object closes."""
+    prompt = _content_prompt(payload)
+
+    last_error = None
+    for model in model_router.candidates():
+        if not model_router.acquire(model):
+            continue
+        started = time.perf_counter()
+        try:
+            logger.info(f"Attempting streamed generation with model: {model}")
+            stream = await call_limited(
+                chat_limiter,
+                prompt.request_tokens,
+                lambda: client.chat.completions.create(
+                    model=model,
+                    messages=prompt.messages,
+                    temperature=0.55,
+                    presence_penalty=0.2,
+                    max_tokens=prompt.max_tokens,
+                    timeout=settings.openai_chat_timeout,
+                    stream=True
+                ),
+                prompt_tokens=prompt.prompt_tokens,
+            )
+        except NotFoundError as e:
+            logger.warning(f"Model {model} not found: {e}")
+            model_router.record_failure(model, permanent=True)
+            last_error = e
+            continue
+        except (RateLimitError, RateLimitTimeout) as e:
+            logger.error(f"Rate limit exceeded: {e}")
+            model_router.release(model)
+            yield _sse_event("error", {"status": 429, "message": "OpenAI API rate limit exceeded. Please check your billing and quota."})
+            return
+        except Exception as e:
+            logger.error(f"Error with model {model}: {e}")
+            model_router.record_failure(model)
+            last_error = e
+            continue
+
+        parser = ArrayStreamParser("suggestions")
+        emitted = 0
+        # Streamed chunks carry no usage, so the completion is counted locally
+        streamed: List[str] = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                streamed.append(delta)
+                for raw in parser.feed(delta):
+                    try:
+                        suggestion = _build_suggestion(raw, payload)
+                    except ValidationError as e:
+                        logger.warning(f"Skipping invalid streamed suggestion: {e}")
+                        continue
+                    yield _sse_event("suggestion", suggestion.model_dump(), event_id=emitted)
+                    emitted += 1
+            # Verdict before the finally below releases the attempt
+            if emitted:
+                model_router.record_success(model, time.perf_counter() - started)
+            else:
+                # Answered, but nothing parsable: not an outage
+                model_router.record_output_error(model)
+        except Exception as e:
+            logger.error(f"Stream from model {model} failed after {emitted} suggestion(s): {e}")
+            model_router.record_failure(model)
+            if emitted:
+                yield _sse_event("error", {"status": 502, "message": "Content stream interrupted."})
+                return
+            last_error = e
+            continue
+        finally:
+            # Also runs when the client disconnects and the generator is closed
+            await _close_stream(stream)
+            completion_tokens = count_tokens("".join(streamed))
+            chat_limiter.settle(prompt.request_tokens, prompt.prompt_tokens + completion_tokens)
+            model_router.release(model)
+            record_usage(
+                "content stream",
+                model,
+                prompt_tokens=prompt.prompt_tokens,
+                completion_tokens=completion_tokens,
+                max_tokens=prompt.max_tokens,
+                estimated=True,
+            )
+
+        if emitted:
+            logger.info(f"Streamed {emitted} suggestion(s) with model: {model}")
+            yield _sse_event("done", {"count": emitted})
+            return
+        logger.warning(f"Model {model} streamed no parsable suggestions")
+        last_error = ValueError("no suggestions in stream")
+
+    logger.error(f"All models failed for streamed generation. Last error: {last_error}")
+    yield _sse_event("error", {"status": 500, "message": "Content generation failed. Please try again later."})
+
+
+@router.post("/generate-content/stream")
+async def generate_content_stream(payload: ContentRequest) -> StreamingResponse:
+    """Stream travel content suggestions as Server-Sent Events.
+
+    Emits one ``suggestion`` event per suggestion as soon as the model finishes
+    it, then a final ``done`` (or ``error``) event.
+    """
+    return StreamingResponse(
+        _stream_suggestions(payload),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Shared by every batch so concurrent campaigns cannot multiply upstream load
+batch_limiter = asyncio.Semaphore(settings.batch_global_concurrency)
+# Every batch reservation also draws on this, so campaigns share one cap
+global_batch_budget = Budget(
+    max_requests=settings.batch_global_request_budget or None,
+    max_tokens=settings.batch_global_token_budget or None,
+    window=settings.batch_global_budget_window_seconds,
+    name="global",
+)
+
+
+async def _generate_batch_item(
+    payload: ContentRequest,
+    budget: Budget,
+    shared: Dict[str, "asyncio.Future[ContentResponse]"],
+) -> ContentResponse:
+    """One batch item; duplicates within the batch share one reservation and completion."""
+    key = _content_request_key(payload)
+    task = shared.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_generate_batch_request(payload, key, budget))
+        shared[key] = task
+        # Mark the exception retrieved even if every waiter went away
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return await asyncio.shield(task)
+
+
+async def _generate_batch_request(payload: ContentRequest, key: str, budget: Budget) -> ContentResponse:
+    # Cached results cost nothing upstream, so only uncached items spend budget
+    if generate_cache.get(key) is None:
+        budget.reserve(_content_prompt(payload).request_tokens)
+    return await generate_content(payload)
+
+
+def _batch_error(error: BaseException) -> Dict[str, Any]:
+    if isinstance(error, BudgetExceededError):
+        return {"status": 429, "message": f"Not started: {error}"}
+    if isinstance(error, HTTPException):
+        detail = error.detail
+        message = detail.get("message") if isinstance(detail, dict) else str(detail)
+        return {"status": error.status_code, "message": message}
+    logger.error(f"Unexpected error in batch item: {error}")
+    return {"status": 500, "message": "Internal server error"}
+
+
+async def _batch_lines(requests: List[ContentRequest], concurrency: int, budget: Budget) -> AsyncIterator[bytes]:
+    started = time.perf_counter()
+    succeeded = failed = 0
+    shared: Dict[str, "asyncio.Future[ContentResponse]"] = {}
+    try:
+        async for index, result, error in map_bounded(
+            requests,
+            lambda payload: _generate_batch_item(payload, budget, shared),
+            concurrency=concurrency,
+            limiter=batch_limiter,
+        ):
+            line = ContentBatchItemResult(
+                index=index,
+                destination=requests[index].destination,
+                status="ok" if error is None else "error",
+                result=result,
+                error=None if error is None else _batch_error(error),
+            )
+            if error is None:
+                succeeded += 1
+            else:
+                failed += 1
+            yield codec.dumps(line.model_dump(mode="json")) + b"\n"
+    finally:
+        # A batch closed early (client gone) must not leave its requests running
+        for task in shared.values():
+            task.cancel()
+    summary = ContentBatchSummary(
+        total=len(requests),
+        succeeded=succeeded,
+        failed=failed,
+        budget=budget.stats(),
+        elapsed_seconds=round(time.perf_counter() - started, 3),
+    )
+    logger.info(f"Batch generation finished: {succeeded}/{len(requests)} succeeded in {summary.elapsed_seconds}s")
+    yield codec.dumps(summary.model_dump(mode="json")) + b"\n"
+
+
+@router.post("/generate-content/batch")
+async def generate_content_batch(batch: ContentBatchRequest) -> StreamingResponse:
+    """Generate suggestions for many destinations concurrently, streamed as NDJSON.
+
+    Items run with at most ``concurrency`` upstream calls in flight (and at
+    most BATCH_GLOBAL_CONCURRENCY across all batches). Uncached items reserve
+    an estimated token cost first, from both the batch's budget and the
+    budget shared by all batches (BATCH_GLOBAL_*_BUDGET per window); once
+    either is spent the remaining items are reported as errors without
+    calling upstream. Identical items
+    share one reservation and one completion. Emits one
+    ``result`` line per item in completion order, each carrying its request
+    ``index``, then a final ``summary`` line. A failed item never aborts the
+    batch.
+    """
+    if len(batch.requests) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail={"message": f"Too many requests in batch (max {settings.batch_max_items})"},
+        )
+    concurrency = min(batch.concurrency or settings.batch_concurrency, settings.batch_global_concurrency)
+    token_cap = settings.batch_token_budget or None
+    max_tokens = batch.max_tokens if token_cap is None else min(batch.max_tokens or token_cap, token_cap)
+    budget = Budget(max_requests=batch.max_requests, max_tokens=max_tokens, parent=global_batch_budget)
+    return StreamingResponse(
+        _batch_lines(batch.requests, concurrency, budget),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/search-places", response_model=PlaceSearchResponse)
 async def search_places(payload: PlaceSearchRequest) -> PlaceSearchResponse:
     """Search for places using OpenAI to find relevant locations based on user query."""
     try:
         logger.info(f"Search request received for query: '{payload.query}'")
-        
-        # Define candidate models to try in order
-        candidate_models = [
-            settings.openai_model,
-            "gpt-4o-mini",
-            "gpt-4o",
-            "gpt-4-1106-preview"
-        ]
-        
-        system_instructions = (
-            'You are a travel expert and geographer. Your task is to find ALL relevant places based on user search queries.\n\n'
-            'SEARCH RULES:\n'
-            '- Interpret the user query broadly and find ALL relevant places\n'
-            '- Include cities, regions, landmarks, neighborhoods, and points of interest\n'
-            '- For regions like "Transilvania", include major cities, smaller towns, castles, monasteries, natural attractions, museums, and cultural sites\n'
-            '- For specific queries like "Paris cafes", include relevant neighborhoods, districts, and areas\n'
-            '- Provide comprehensive geographical coverage\n'
-            '- Include both well-known and lesser-known places\n'
-            '- For regions, cover different areas and types of attractions\n'
-            '- IMPORTANT: Only return places that are DIRECTLY related to the search query\n'
-            '- Do NOT return generic or unrelated places\n\n'
-            'PRICE RULES:\n'
-            '- For price_range: Use descriptive terms like "Free", "Budget-friendly", "Moderate", "Premium", "Luxury" or specific ranges like "£5-15", "€20-50"\n'
-            '- NEVER use just "$", "$$", "$$$" symbols\n'
-            '- If price is unknown, set price_range to null\n'
-            '- Be specific about what the price covers (entry fee, meal, activity, etc.)\n\n'
-            'OUTPUT FORMAT (JSON only):\n'
-            '{\n'
-            '  "places": [\n'
-            '    {\n'
-            '      "name": "Place Name",\n'
-            '      "type": "city|region|landmark|neighborhood|town|village|monastery|castle|museum|park|natural_site",\n'
-            '      "country": "Country Name",\n'
-            '      "description": "Detailed description (2-3 sentences) with key features, history, and what makes it special",\n'
-            '      "highlights": ["Highlight 1", "Highlight 2", "Highlight 3", "Highlight 4", "Highlight 5"],\n'
-            '      "categories": ["category1", "category2", "category3"]\n'
-            '    }\n'
-            '  ]\n'
-            '}\n\n'
-            'CATEGORIES: culture, nature, food, history, architecture, entertainment, shopping, outdoor, religious, modern, traditional, adventure, relaxation, education, nightlife\n'
-            'HIGHLIGHTS: 5-7 specific attractions, landmarks, activities, or unique features\n'
-            'DESCRIPTION: Detailed but concise, mentioning key features, historical significance, and unique characteristics\n'
-            'Return 15-25 relevant places based on the search query to provide comprehensive coverage.'
-        )
 
-        user_prompt = f"Search query: '{payload.query}'\nLanguage: {payload.language}\n\nFind ONLY places that are DIRECTLY related to '{payload.query}'. Do not return generic or unrelated places. Focus on locations, attractions, and points of interest that are specifically associated with this search term."
+        cache_key = _search_cache_key(payload)
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Search cache hit for query: '{payload.query}'")
+            return PlaceSearchResponse(**{**cached, "search_query": payload.query})
+        
+        prompt = prompt_registry.render("places", max_tokens=PLACES_MAX_TOKENS, query=payload.query, language=payload.language)
 
         logger.info(f"Using system instructions and user prompt for search")
-        
-        # Try each model until one works
-        last_error = None
-        for model in candidate_models:
-            try:
-                logger.info(f"Attempting search with model: {model}")
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_instructions},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=3000
-                )
-                
-                content = response.choices[0].message.content.strip()
-                logger.info(f"Received response from model {model}, content length: {len(content)}")
-                
-                # Try to parse the JSON response
+
+        def _parse(content: str, model: str) -> PlaceSearchResponse:
+            data = parse_llm_json(content, kind="places", list_key="places")
+            if not isinstance(data, dict) or not isinstance(data.get('places'), list):
+                raise LLMOutputError("response has no 'places' list")
+
+            places = []
+            for place_data in data['places']:
                 try:
-                    # Remove any markdown formatting if present
-                    if content.startswith('```json'):
-                        content = content.split('```json')[1]
-                    if content.endswith('```'):
-                        content = content.rsplit('```', 1)[0]
-                    
-                    data = json.loads(content.strip())
-                    logger.info(f"Successfully parsed JSON response")
-                    
-                    if 'places' in data and isinstance(data['places'], list):
-                        places = []
-                        for place_data in data['places']:
-                            try:
-                                place = Place(
-                                    name=place_data.get('name', ''),
-                                    type=place_data.get('type', ''),
-                                    country=place_data.get('country', ''),
-                                    description=place_data.get('description', ''),
-                                    highlights=place_data.get('highlights', []),
-                                    categories=place_data.get('categories', [])
-                                )
-                                places.append(place)
-                            except Exception as e:
-                                logger.warning(f"Failed to parse place data: {e}")
-                                continue
-                        
-                        logger.info(f"Successfully created {len(places)} place objects")
-                        return PlaceSearchResponse(
-                            places=places,
-                            total_results=len(places),
-                            search_query=payload.query
-                        )
-                    
-                except json.JSONDecodeError as json_error:
-                    logger.warning(f"JSON decode error with model {model}: {json_error}")
-                    last_error = json_error
+                    place = Place(
+                        name=place_data.get('name', ''),
+                        type=place_data.get('type', ''),
+                        country=place_data.get('country', ''),
+                        description=place_data.get('description', ''),
+                        highlights=place_data.get('highlights', []),
+                        categories=place_data.get('categories', [])
+                    )
+                    places.append(place)
+                except Exception as e:
+                    logger.warning(f"Failed to parse place data: {e}")
                     continue
-                    
-            except NotFoundError as e:
-                logger.warning(f"Model {model} not found: {e}")
-                last_error = e
-                continue
-            except RateLimitError as e:
-                logger.error(f"Rate limit exceeded: {e}")
-                raise HTTPException(
-                    status_code=429, 
-                    detail={"message": "OpenAI API rate limit exceeded. Please check your billing and quota."}
-                )
-            except Exception as e:
-                logger.error(f"Error with model {model}: {e}")
-                last_error = e
-                continue
-        
-        # If we get here, all models failed
-        logger.error(f"All models failed. Last error: {last_error}")
+
+            # e.g. output cut off inside the first place: worth another model
+            if not places:
+                raise LLMOutputError("no usable places in response")
+            logger.info(f"Successfully created {len(places)} place objects")
+            return PlaceSearchResponse(
+                places=places,
+                total_results=len(places),
+                search_query=payload.query
+            )
+
+        search_response = await complete_with_fallback(
+            prompt.messages,
+            _parse,
+            operation="search",
+            prompt_tokens=prompt.prompt_tokens,
+            temperature=0.3,
+            max_tokens=prompt.max_tokens
+        )
+        if search_response.places:
+            search_cache.set(cache_key, search_response.model_dump())
+        return search_response
+
+    except (RateLimitError, RateLimitTimeout) as e:
+        logger.error(f"Rate limit exceeded: {e}")
+        raise HTTPException(
+            status_code=429, 
+            detail={"message": "OpenAI API rate limit exceeded. Please check your billing and quota."}
+        )
+    except AllModelsFailedError as e:
+        logger.error(str(e))
         raise HTTPException(status_code=500, detail={"message": "Failed to search places"})
-        
     except ValidationError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail={"message": "Invalid request data"})
@@ -415,101 +523,159 @@ async def search_places(payload: PlaceSearchRequest) -> PlaceSearchResponse:
         logger.error(f"Unexpected error in place search: {str(e)}")
         raise HTTPException(status_code=500, detail={"message": "Internal server error"})
 
+def _image_prompt(payload: ImageGenerationRequest) -> Tuple[str, str]:
+    """Build the (image prompt, alt text) pair for a content card."""
+    # 1. Determine PLACE (main subject) by priority
+    place = None
+    if payload.title and any(word.lower() in payload.title.lower() for word in ['market', 'street', 'plaza', 'square', 'park', 'museum', 'cathedral', 'bridge']):
+        # Extract place from title
+        title_words = payload.title.split()
+        for word in title_words:
+            if word.lower() in ['market', 'street', 'plaza', 'square', 'park', 'museum', 'cathedral', 'bridge']:
+                place = word
+                break
+    elif payload.recommended_spots:
+        place = payload.recommended_spots[0]
+    elif payload.neighborhoods:
+        place = payload.neighborhoods[0]
+    else:
+        place = payload.destination
+    
+    # Append destination if not already included
+    if payload.destination.lower() not in place.lower():
+        place = f"{place} in {payload.destination}"
+    
+    # 2. Determine time/season
+    time_of_day = "daytime"
+    if payload.best_times:
+        best_times_lower = payload.best_times.lower()
+        if any(word in best_times_lower for word in ['morning', 'early', 'dawn', 'sunrise']):
+            time_of_day = "morning"
+        elif any(word in best_times_lower for word in ['sunset', 'evening', 'golden hour', 'dusk']):
+            time_of_day = "sunset"
+        elif any(word in best_times_lower for word in ['night', 'evening', 'late']):
+            time_of_day = "night"
+        elif any(word in best_times_lower for word in ['winter', 'spring', 'summer', 'autumn', 'fall']):
+            time_of_day = best_times_lower.split()[0]  # Extract season
+    
+    # 3. Extract concrete visual elements (up to 4)
+    content_words = payload.content.lower().split()
+    concrete_elements = []
+    visual_keywords = ['market', 'stalls', 'vendor', 'awning', 'bread', 'cheese', 'cobblestone', 'street', 'river', 'harbor', 'canal', 'beach', 'coast', 'cliffs', 'bay', 'bridge', 'park', 'museum', 'cathedral', 'neon', 'food', 'people', 'buildings', 'trees', 'flowers', 'fountain', 'statue']
+    
+    for word in content_words:
+        if word in visual_keywords and len(concrete_elements) < 4:
+            concrete_elements.append(word)
+    
+    if not concrete_elements:
+        concrete_elements = ['buildings', 'people', 'street']
+    
+    # 4. Determine perspective & composition
+    if any(word in payload.content.lower() for word in ['market', 'street', 'food', 'neon', 'vendor']):
+        perspective = "street-level, 24–35mm wide-angle; people mid-ground, leading lines"
+    elif any(word in payload.content.lower() for word in ['river', 'harbor', 'canal', 'beach', 'coast', 'cliffs', 'bay']):
+        perspective = "elevated vantage, 35–50mm; foreground anchor, sweeping background"
+    else:
+        perspective = "eye-level, 35mm; center-weighted subject"
+    
+    # 5. Determine lighting & palette
+    if time_of_day in ['sunset', 'morning']:
+        lighting = "warm cinematic side-light, soft shadows; natural colors"
+    elif time_of_day == 'night':
+        lighting = "ambient city light; natural colors"
+    else:
+        lighting = "soft daylight; natural balanced colors"
+    
+    # 6. Build the image prompt
+    image_prompt = f"{place}; {time_of_day}; {perspective}; {lighting}; photorealistic, sharp focus, high detail. Must include: {', '.join(concrete_elements[:4])}. AVOID: no text overlays, no watermarks, no logos, no billboards, no heavy HDR, no anime, no illustration, no fisheye, avoid motion blur."
+    
+    # 7. Generate alt text
+    alt_text = f"Photorealistic image of {place} during {time_of_day}, showing {', '.join(concrete_elements[:3])}"
+    return image_prompt, alt_text
+
+
+# Image generation runs in background jobs so slow provider calls do not
+# hold HTTP requests open; identical prompts share one job
+image_jobs = JobQueue(
+    "image",
+    concurrency=settings.image_job_concurrency,
+    max_pending=settings.image_job_max_pending,
+    retention_seconds=settings.image_job_retention_seconds,
+    reuse_seconds=settings.image_job_reuse_seconds,
+)
+IMAGE_JOB_KEEPALIVE_SECONDS = 15
+
+
+async def _render_image(image_prompt: str, alt_text: str) -> ImageGenerationResponse:
+    # Generate, then keep a local copy and its resized variants
+    stored = await image_pipeline.generate(image_prompt, size="1024x1024")
+    return ImageGenerationResponse(
+        image_prompt=image_prompt,
+        alt_text=alt_text,
+        image_url=image_pipeline.public_url(stored.url),
+        image_variants=image_pipeline.public_variants(stored.variants),
+    )
+
+
+def _submit_image_job(payload: ImageGenerationRequest) -> Tuple[Job, bool]:
+    image_prompt, alt_text = _image_prompt(payload)
+    key = hashlib.sha256(image_prompt.encode("utf-8")).hexdigest()
+    try:
+        return image_jobs.submit(
+            key,
+            lambda: _render_image(image_prompt, alt_text),
+            meta={"image_prompt": image_prompt, "alt_text": alt_text},
+        )
+    except QueueFullError as e:
+        logger.warning(f"Image job rejected: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail={"message": "Too many image requests in progress. Please try again shortly."},
+            headers={"Retry-After": "10"},
+        )
+
+
+def _image_job_result(job: Job) -> Optional[ImageGenerationResponse]:
+    if job.status == "succeeded":
+        return job.result
+    if job.status == "failed":
+        return ImageGenerationResponse(**job.meta, image_url=None, error="Image generation failed")
+    return None
+
+
+def _image_job_response(job: Job, deduplicated: bool = False) -> ImageJobResponse:
+    return ImageJobResponse(
+        job_id=job.id,
+        status=job.status,
+        deduplicated=deduplicated,
+        created_at=datetime.fromtimestamp(job.created_at),
+        finished_at=datetime.fromtimestamp(job.finished_at) if job.finished_at else None,
+        result=_image_job_result(job),
+        error="Image generation failed" if job.status == "failed" else None,
+    )
+
+
+def _get_image_job(job_id: str) -> Job:
+    job = image_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail={"message": "Image job not found"})
+    return job
+
+
 @router.post("/generate-image", response_model=ImageGenerationResponse)
 async def generate_image(payload: ImageGenerationRequest) -> ImageGenerationResponse:
-    """Generate a photorealistic travel image based on content card."""
+    """Generate a photorealistic travel image based on content card.
+
+    Waits for the result; prefer ``POST /generate-image/jobs`` for clients
+    that can poll, since generation often takes 15-40 seconds.
+    """
     try:
-        # 1. Determine PLACE (main subject) by priority
-        place = None
-        if payload.title and any(word.lower() in payload.title.lower() for word in ['market', 'street', 'plaza', 'square', 'park', 'museum', 'cathedral', 'bridge']):
-            # Extract place from title
-            title_words = payload.title.split()
-            for word in title_words:
-                if word.lower() in ['market', 'street', 'plaza', 'square', 'park', 'museum', 'cathedral', 'bridge']:
-                    place = word
-                    break
-        elif payload.recommended_spots:
-            place = payload.recommended_spots[0]
-        elif payload.neighborhoods:
-            place = payload.neighborhoods[0]
-        else:
-            place = payload.destination
-        
-        # Append destination if not already included
-        if payload.destination.lower() not in place.lower():
-            place = f"{place} in {payload.destination}"
-        
-        # 2. Determine time/season
-        time_of_day = "daytime"
-        if payload.best_times:
-            best_times_lower = payload.best_times.lower()
-            if any(word in best_times_lower for word in ['morning', 'early', 'dawn', 'sunrise']):
-                time_of_day = "morning"
-            elif any(word in best_times_lower for word in ['sunset', 'evening', 'golden hour', 'dusk']):
-                time_of_day = "sunset"
-            elif any(word in best_times_lower for word in ['night', 'evening', 'late']):
-                time_of_day = "night"
-            elif any(word in best_times_lower for word in ['winter', 'spring', 'summer', 'autumn', 'fall']):
-                time_of_day = best_times_lower.split()[0]  # Extract season
-        
-        # 3. Extract concrete visual elements (up to 4)
-        content_words = payload.content.lower().split()
-        concrete_elements = []
-        visual_keywords = ['market', 'stalls', 'vendor', 'awning', 'bread', 'cheese', 'cobblestone', 'street', 'river', 'harbor', 'canal', 'beach', 'coast', 'cliffs', 'bay', 'bridge', 'park', 'museum', 'cathedral', 'neon', 'food', 'people', 'buildings', 'trees', 'flowers', 'fountain', 'statue']
-        
-        for word in content_words:
-            if word in visual_keywords and len(concrete_elements) < 4:
-                concrete_elements.append(word)
-        
-        if not concrete_elements:
-            concrete_elements = ['buildings', 'people', 'street']
-        
-        # 4. Determine perspective & composition
-        if any(word in payload.content.lower() for word in ['market', 'street', 'food', 'neon', 'vendor']):
-            perspective = "street-level, 24–35mm wide-angle; people mid-ground, leading lines"
-        elif any(word in payload.content.lower() for word in ['river', 'harbor', 'canal', 'beach', 'coast', 'cliffs', 'bay']):
-            perspective = "elevated vantage, 35–50mm; foreground anchor, sweeping background"
-        else:
-            perspective = "eye-level, 35mm; center-weighted subject"
-        
-        # 5. Determine lighting & palette
-        if time_of_day in ['sunset', 'morning']:
-            lighting = "warm cinematic side-light, soft shadows; natural colors"
-        elif time_of_day == 'night':
-            lighting = "ambient city light; natural colors"
-        else:
-            lighting = "soft daylight; natural balanced colors"
-        
-        # 6. Build the image prompt
-        image_prompt = f"{place}; {time_of_day}; {perspective}; {lighting}; photorealistic, sharp focus, high detail. Must include: {', '.join(concrete_elements[:4])}. AVOID: no text overlays, no watermarks, no logos, no billboards, no heavy HDR, no anime, no illustration, no fisheye, avoid motion blur."
-        
-        # 7. Generate alt text
-        alt_text = f"Photorealistic image of {place} during {time_of_day}, showing {', '.join(concrete_elements[:3])}"
-        
-        # 8. Call OpenAI Images API
-        try:
-            response = client.images.generate(
-                prompt=image_prompt,
-                n=1,
-                size="1024x1024",
-                model="dall-e-3"
-            )
-            image_url = response.data[0].url
-        except Exception as img_error:
-            logger.error(f"Image generation failed: {str(img_error)}")
-            return ImageGenerationResponse(
-                image_prompt=image_prompt,
-                alt_text=alt_text,
-                image_url=None,
-                error="Image generation failed"
-            )
-        
-        return ImageGenerationResponse(
-            image_prompt=image_prompt,
-            alt_text=alt_text,
-            image_url=image_url
-        )
-        
+        job, _ = _submit_image_job(payload)
+        # The job runs on a worker, so a disconnecting caller cannot cancel it
+        await job.done.wait()
+        return _image_job_result(job)
+    except HTTPException:
+        raise
     except ValidationError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail={"message": "Invalid request data"})
@@ -517,136 +683,119 @@ async def generate_image(payload: ImageGenerationRequest) -> ImageGenerationResp
         logger.error(f"Unexpected error in image generation: {str(e)}")
         raise HTTPException(status_code=500, detail={"message": "Internal server error"})
 
+
+@router.post("/generate-image/jobs", response_model=ImageJobResponse, status_code=202)
+async def create_image_job(payload: ImageGenerationRequest, response: Response) -> ImageJobResponse:
+    """Queue image generation and return its job id immediately.
+
+    Poll ``GET /generate-image/jobs/{job_id}`` or subscribe to
+    ``GET /generate-image/jobs/{job_id}/events`` for completion.
+    """
+    try:
+        job, deduplicated = _submit_image_job(payload)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error queueing image job: {str(e)}")
+        raise HTTPException(status_code=500, detail={"message": "Internal server error"})
+    response.headers["Location"] = f"{settings.api_v1_str}/generate-image/jobs/{job.id}"
+    return _image_job_response(job, deduplicated)
+
+
+@router.get("/generate-image/jobs/{job_id}", response_model=ImageJobResponse)
+async def get_image_job(job_id: str) -> ImageJobResponse:
+    """Current status of an image job, with the result once finished."""
+    return _image_job_response(_get_image_job(job_id))
+
+
+async def _image_job_events(job: Job) -> AsyncIterator[str]:
+    yield _sse_event("status", {"job_id": job.id, "status": job.status})
+    while not job.done.is_set():
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout=IMAGE_JOB_KEEPALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            # Comment line keeps proxies from closing an idle stream
+            yield ": keepalive\n\n"
+    event = "done" if job.status == "succeeded" else "error"
+    yield _sse_event(event, _image_job_response(job).model_dump(mode="json"))
+
+
+@router.get("/generate-image/jobs/{job_id}/events")
+async def image_job_events(job_id: str) -> StreamingResponse:
+    """Server-Sent Events for an image job.
+
+    Emits the current ``status`` at once, then a single ``done`` (or
+    ``error``) event with the full job when it finishes.
+    """
+    job = _get_image_job(job_id)
+    return StreamingResponse(
+        _image_job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/generate-custom-content", response_model=CustomPromptResponse)
 async def generate_custom_content(payload: CustomPromptRequest) -> CustomPromptResponse:
     """Generate AI-powered travel content based on a custom user prompt."""
     try:
         logger.info(f"Custom prompt request received for destination: '{payload.destination}'")
         
-        # Define candidate models to try in order
-        candidate_models = [
-            settings.openai_model,
-            "gpt-4o-mini",
-            "gpt-4o",
-            "gpt-4-1106-preview"
-        ]
-        
-        system_instructions = (
-            'You are a senior travel editor and content creator. Your task is to generate high-quality travel content based on the user\'s custom prompt.\n\n'
-            'CONTENT RULES:\n'
-            '- Follow the user\'s custom prompt EXACTLY as specified\n'
-            '- Generate content that matches the requested content type and style\n'
-            '- Ensure all content is accurate and relevant to the destination\n'
-            '- Include practical information, tips, and recommendations\n'
-            '- Make the content engaging, informative, and useful for travelers\n'
-            '- If existing content is provided, improve or modify it according to the prompt\n\n'
-            'PRICE RULES:\n'
-            '- For price_range: Use descriptive terms like "Free", "Budget-friendly", "Moderate", "Premium", "Luxury" or specific ranges like "£5-15", "€20-50"\n'
-            '- NEVER use just "$", "$$", "$$$" symbols\n'
-            '- If price is unknown, set price_range to null\n'
-            '- Be specific about what the price covers (entry fee, meal, activity, etc.)\n\n'
-            'OUTPUT FORMAT (JSON only):\n'
-            '{\n'
-            '  "title": "Engaging title based on the prompt",\n'
-            '  "content": "Content generated according to the custom prompt",\n'
-            '  "type": "Content type (Blog Post, Instagram Post, etc.)",\n'
-            '  "reading_time": "Estimated reading time (e.g., 3 min)",\n'
-            '  "quality": "High",\n'
-            '  "tags": ["relevant", "tags", "for", "content"],\n'
-            '  "highlights": ["Key highlight 1", "Key highlight 2", "Key highlight 3"],\n'
-            '  "neighborhoods": ["Relevant neighborhoods or areas"],\n'
-            '  "recommended_spots": ["Specific places, venues, or attractions"],\n'
-            '  "price_range": "Descriptive price info or null",\n'
-            '  "best_times": "Best times to visit if relevant",\n'
-            '  "cautions": "Important notes or warnings if relevant"\n'
-            '}\n\n'
-            'IMPORTANT: The content must directly address and fulfill the user\'s custom prompt requirements. Price_range must be descriptive, not just symbols.'
+        words = custom_words(payload.prompt, payload.content_type, payload.existing_content)
+        prompt = prompt_registry.render(
+            "custom",
+            max_tokens=completion_budget(words, language=payload.language),
+            prompt=payload.prompt,
+            destination=payload.destination,
+            content_type=payload.content_type,
+            language=payload.language,
+            existing=f"Existing Content to Improve: {payload.existing_content}" if payload.existing_content else "",
         )
 
-        user_prompt = f"""Custom Prompt: {payload.prompt}
+        logger.info(f"Using custom prompt for content generation")
 
-Destination: {payload.destination}
-Content Type: {payload.content_type}
-Language: {payload.language}
-{f"Existing Content to Improve: {payload.existing_content}" if payload.existing_content else ""}
+        def _parse(content: str, model: str) -> CustomPromptResponse:
+            data = parse_llm_json(content, kind="custom")
+            if not isinstance(data, dict) or not data.get('content'):
+                raise LLMOutputError("response has no content")
 
-Please generate content that specifically addresses the custom prompt above. The content should be tailored to the destination and content type requested."""
+            # Create the response object
+            return CustomPromptResponse(
+                title=data.get('title', 'Custom Generated Title'),
+                content=data.get('content', 'Custom generated content'),
+                type=data.get('type', payload.content_type),
+                reading_time=data.get('reading_time', '3 min'),
+                quality=data.get('quality', 'High'),
+                tags=data.get('tags', []),
+                highlights=data.get('highlights', []),
+                neighborhoods=data.get('neighborhoods', []),
+                recommended_spots=data.get('recommended_spots', []),
+                price_range=data.get('price_range'),
+                best_times=data.get('best_times'),
+                cautions=data.get('cautions'),
+                generated_from_prompt=payload.prompt
+            )
 
-        logger.info(f"Using custom prompt for content generation")
-        
-        # Try each model until one works
-        last_error = None
-        for model in candidate_models:
-            try:
-                logger.info(f"Attempting custom content generation with model: {model}")
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_instructions},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=2000
-                )
-                
-                content = response.choices[0].message.content.strip()
-                logger.info(f"Received custom content response from model {model}, content length: {len(content)}")
-                
-                # Try to parse the JSON response
-                try:
-                    # Remove any markdown formatting if present
-                    if content.startswith('```json'):
-                        content = content.split('```json')[1]
-                    if content.endswith('```'):
-                        content = content.rsplit('```', 1)[0]
-                    
-                    data = json.loads(content.strip())
-                    logger.info(f"Successfully parsed custom content JSON response")
-                    
-                    # Create the response object
-                    custom_response = CustomPromptResponse(
-                        title=data.get('title', 'Custom Generated Title'),
-                        content=data.get('content', 'Custom generated content'),
-                        type=data.get('type', payload.content_type),
-                        reading_time=data.get('reading_time', '3 min'),
-                        quality=data.get('quality', 'High'),
-                        tags=data.get('tags', []),
-                        highlights=data.get('highlights', []),
-                        neighborhoods=data.get('neighborhoods', []),
-                        recommended_spots=data.get('recommended_spots', []),
-                        price_range=data.get('price_range'),
-                        best_times=data.get('best_times'),
-                        cautions=data.get('cautions'),
-                        generated_from_prompt=payload.prompt
-                    )
-                    
-                    logger.info(f"Successfully created custom content response")
-                    return custom_response
-                    
-                except json.JSONDecodeError as json_error:
-                    logger.warning(f"JSON decode error with model {model}: {json_error}")
-                    last_error = json_error
-                    continue
-                    
-            except NotFoundError as e:
-                logger.warning(f"Model {model} not found: {e}")
-                last_error = e
-                continue
-            except RateLimitError as e:
-                logger.error(f"Rate limit exceeded: {e}")
-                raise HTTPException(
-                    status_code=429, 
-                    detail={"message": "OpenAI API rate limit exceeded. Please check your billing and quota."}
-                )
-            except Exception as e:
-                logger.error(f"Error with model {model}: {e}")
-                last_error = e
-                continue
-        
-        # If we get here, all models failed
-        logger.error(f"All models failed for custom content generation. Last error: {last_error}")
+        custom_response = await complete_with_fallback(
+            prompt.messages,
+            _parse,
+            operation="custom content generation",
+            hedge=True,
+            prompt_tokens=prompt.prompt_tokens,
+            temperature=0.7,
+            max_tokens=prompt.max_tokens
+        )
+        logger.info(f"Successfully created custom content response")
+        return custom_response
+
+    except (RateLimitError, RateLimitTimeout) as e:
+        logger.error(f"Rate limit exceeded: {e}")
+        raise HTTPException(
+            status_code=429, 
+            detail={"message": "OpenAI API rate limit exceeded. Please check your billing and quota."}
+        )
+    except AllModelsFailedError as e:
+        logger.error(f"All models failed for custom content generation. Last error: {e.last_error}")
         raise HTTPException(status_code=500, detail={"message": "Failed to generate custom content"})
-        
     except ValidationError as e:
         logger.error(f"Validation error in custom content generation: {str(e)}")
         raise HTTPException(status_code=400, detail={"message": "Invalid request data"})
@@ -659,12 +808,11 @@ Please generate content that specifically addresses the custom prompt above. The
 async def publish_content(payload: PublishContentRequest) -> PublishedContentItem:
     """Persist a piece of content as Published and return stored item."""
     try:
-        store = _read_publish_store()
         now = datetime.now()
         date_str = now.strftime("%m/%d/%Y")
         time_str = now.strftime("%H:%M")
         item = PublishedContentItem(
-            id=f"pub_{int(now.timestamp()*1000)}",
+            id=new_item_id(),
             title=payload.title,
             content=payload.content,
             type=payload.type,
@@ -678,7 +826,9 @@ async def publish_content(payload: PublishContentRequest) -> PublishedContentIte
             best_times=payload.best_times,
             cautions=payload.cautions,
             destination=payload.destination,
-            image_url=payload.image_url,
+            # Stored images are kept as paths; responses add the public base URL
+            image_url=image_pipeline.stored_url(payload.image_url),
+            image_variants=image_pipeline.stored_variants(payload.image_variants) or image_pipeline.variants_for_url(payload.image_url),
             status="Published",
             location=payload.destination,
             date=date_str,
@@ -692,11 +842,8 @@ async def publish_content(payload: PublishContentRequest) -> PublishedContentIte
             last_viewed=None,
         )
 
-        items = store.get("items", [])
-        items.insert(0, item.dict())
-        store["items"] = items
-        _write_publish_store(store)
-        return item
+        publish_store.insert(item.model_dump())
+        return PublishedContentItem(**_published_item(item.model_dump()))
     except ValidationError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail={"message": "Invalid request data"})
@@ -705,77 +852,227 @@ async def publish_content(payload: PublishContentRequest) -> PublishedContentIte
         raise HTTPException(status_code=500, detail={"message": "Internal server error"})
 
 
+_PUBLISHED_FIELDS = tuple(PublishedContentItem.model_fields)
+# Predefined lightweight shape for listing views (``fields=summary``)
+SUMMARY_FIELDS = ("id", "title", "destination", "date", "views", "engagement_rate")
+
+
+def _parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Resolve a ``fields=`` parameter to the fields to return (``id`` always included)."""
+    if not fields:
+        return _PUBLISHED_FIELDS
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    if requested == ["summary"]:
+        return SUMMARY_FIELDS
+    unknown = [name for name in requested if name not in _PUBLISHED_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail={"message": f"Unknown fields: {', '.join(unknown)}"})
+    return ("id", *dict.fromkeys(name for name in requested if name != "id"))
+
+
+def _published_item(item_data: Dict[str, Any], fields: Tuple[str, ...] = _PUBLISHED_FIELDS) -> Dict[str, Any]:
+    """The response shape of a stored item (which already has every field, schema v2)."""
+    item = {field: item_data.get(field) for field in fields}
+    if "image_url" in item:
+        item["image_url"] = image_pipeline.public_url(item["image_url"])
+    if "image_variants" in item:
+        item["image_variants"] = image_pipeline.public_variants(item["image_variants"])
+    return item
+
+
+def _published_etag(counts: bool = False) -> str:
+    # Flushing buffered counters changes no visible count, so it only
+    # invalidates responses ordered by flushed counts (``counts``)
+    return f'W/"{_ETAG_EPOCH}-{publish_store.version(counts=counts)}-{counter_buffer.version}"'
+
+
+def _not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/ prefixes are ignored
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _conditional_json(request: Request, build: Callable[[], Any], counts: bool = False) -> Response:
+    """Serve published content with ETag/Last-Modified validators.
+
+    A matching ``If-None-Match`` (or ``If-Modified-Since``) gets a 304
+    without reading the store or serializing anything. Otherwise the
+    payload from ``build()`` is encoded with the fast codec, skipping
+    response-model validation (the route's ``response_model`` still
+    documents the shape), and the bytes are cached for this version.
+    ``counts`` marks responses ordered by stored view/share counts.
+
+    ``build()`` takes the store lock itself, so the version is read before
+    and after it: the body is cached and tagged only if nothing changed in
+    between, and rebuilt otherwise (served untagged after a few tries).
+    """
+    etag = _published_etag(counts)
+    last_modified = max(publish_store.last_modified, counter_buffer.last_modified)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    query = f"{request.url.path}?{sorted(request.query_params.multi_items())}"
+    body = published_response_cache.get(f"{etag}|{query}")
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers=headers)
+    for _ in range(CONDITIONAL_BUILD_ATTEMPTS):
+        body = codec.dumps(build())
+        current = _published_etag(counts)
+        if current == etag:
+            published_response_cache.set(f"{etag}|{query}", body)
+            return Response(content=body, media_type="application/json", headers=headers)
+        # Written to while building: the body may mix versions
+        etag = headers["ETag"] = current
+    del headers["ETag"]
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/published", response_model=PublishedContentResponse)
-async def list_published_content() -> PublishedContentResponse:
-    """Return all published content items (most recent first)."""
+async def list_published_content(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    destination: Optional[str] = None,
+    status: Optional[str] = None,
+    tag: Optional[str] = None,
+    type: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    sort: Optional[Literal["created_at", "views", "shares", "engagement_rate"]] = None,
+    order: Literal["asc", "desc"] = "desc",
+    fields: Optional[str] = Query(None, description='Comma-separated fields to return, or "summary"'),
+) -> Response:
+    """Return published content items (most recent first by default).
+
+    Without any query parameters every item is returned in publish order.
+    Otherwise results come from the store's secondary indexes: pass
+    ``limit`` to paginate and the returned ``next_cursor`` as ``cursor`` to
+    fetch the following page (with the same filters and sort). ``fields``
+    limits each item to the named fields; ``fields=summary`` returns just
+    id, title, destination, date, views and engagement_rate.
+
+    Responses carry an ETag that changes with any store mutation; send it
+    back as ``If-None-Match`` to get a 304 when nothing changed.
+    """
+    filters = {"destination": destination, "status": status, "tag": tag, "type": type}
+    paginated = any(v is not None for v in (limit, cursor, sort, created_from, created_to, *filters.values()))
+    projection = _parse_fields(fields)
+
+    def _build() -> Dict[str, Any]:
+        next_cursor = None
+        if paginated:
+            page = publish_store.query(
+                filters=filters,
+                created_from=created_from,
+                created_to=created_to,
+                sort=sort or "created_at",
+                descending=order == "desc",
+                cursor=cursor,
+                limit=limit,
+            )
+            items, total, next_cursor = page.items, page.total, page.next_cursor
+        else:
+            items = publish_store.list_items()
+            total = len(items)
+        items = counter_buffer.overlay_many(items)
+        return {
+            "items": [_published_item(item_data, projection) for item_data in items],
+            "total": total,
+            "next_cursor": next_cursor,
+        }
+
     try:
-        store = _read_publish_store()
-        items = store.get("items", [])
-        # Handle existing items that might not have new analytics fields
-        parsed_items = []
-        for item_data in items:
-            # Ensure all required fields are present with defaults
-            item_with_defaults = {
-                "id": item_data.get("id", ""),
-                "title": item_data.get("title", ""),
-                "content": item_data.get("content", ""),
-                "type": item_data.get("type", ""),
-                "reading_time": item_data.get("reading_time", ""),
-                "quality": item_data.get("quality", ""),
-                "tags": item_data.get("tags", []),
-                "highlights": item_data.get("highlights", []),
-                "neighborhoods": item_data.get("neighborhoods", []),
-                "recommended_spots": item_data.get("recommended_spots", []),
-                "price_range": item_data.get("price_range"),
-                "best_times": item_data.get("best_times"),
-                "cautions": item_data.get("cautions"),
-                "destination": item_data.get("destination"),
-                "image_url": item_data.get("image_url"),
-                "status": item_data.get("status", "Published"),
-                "location": item_data.get("location"),
-                "date": item_data.get("date", ""),
-                "time": item_data.get("time", ""),
-                # Analytics fields with defaults
-                "views": item_data.get("views", 0),
-                "shares": item_data.get("shares", 0),
-                "engagement_rate": item_data.get("engagement_rate", 0.0),
-                "growth_rate": item_data.get("growth_rate", 0.0),
-                "created_at": item_data.get("created_at") or item_data.get("date", ""),  # Fallback to date if no created_at
-                "last_viewed": item_data.get("last_viewed")
-            }
-            parsed_items.append(PublishedContentItem(**item_with_defaults))
-        return PublishedContentResponse(items=parsed_items, total=len(parsed_items))
+        return _conditional_json(request, _build, counts=sort in COUNTER_SORTS)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail={"message": str(e)})
     except Exception as e:
         logger.error(f"Unexpected error reading published items: {str(e)}")
         raise HTTPException(status_code=500, detail={"message": "Failed to read published content"})
 
 
+@router.get("/published/search", response_model=PublishedSearchResponse)
+async def search_published_content(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    fields: Optional[str] = Query(None, description='Comma-separated fields to return, or "summary"'),
+) -> Response:
+    """Full-text search over published content, best matches first.
+
+    Matches title, destination, content, tags, highlights, neighborhoods and
+    recommended spots (title, destination and tags weigh most); accents and
+    case are ignored and the last word also matches as a prefix.
+    """
+    projection = _parse_fields(fields)
+
+    def _build() -> Dict[str, Any]:
+        started = time.perf_counter()
+        hits, total = publish_store.search(q, limit=limit, offset=offset)
+        results = [
+            {**_published_item(counter_buffer.overlay(item), projection), "score": score}
+            for item, score in hits
+        ]
+        logger.info(f"Search {q!r} matched {total} items in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return {"query": q, "items": results, "total": total}
+
+    try:
+        return _conditional_json(request, _build)
+    except Exception as e:
+        logger.error(f"Error searching published items: {str(e)}")
+        raise HTTPException(status_code=500, detail={"message": "Failed to search published content"})
+
+
+@router.get("/published/{item_id}", response_model=PublishedContentItem)
+async def get_published_item(
+    item_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description='Comma-separated fields to return, or "summary"'),
+) -> Response:
+    """Return one published content item (supports If-None-Match)."""
+    projection = _parse_fields(fields)
+    # ``If-None-Match: *`` only matches an item that exists
+    if publish_store.get(item_id) is None:
+        raise HTTPException(status_code=404, detail="Content item not found")
+
+    def _build() -> Dict[str, Any]:
+        item = publish_store.get(item_id)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Content item not found")
+        return _published_item(counter_buffer.overlay(item), projection)
+
+    try:
+        return _conditional_json(request, _build)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reading item: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to read item")
+
+
 @router.post("/published/{item_id}/view")
 async def track_view(item_id: str):
     """Track a view for a published content item."""
     try:
-        store = _read_publish_store()
-        items = store.get("items", [])
-        
-        # Find and update the item
-        for item in items:
-            if item.get("id") == item_id:
-                item["views"] = item.get("views", 0) + 1
-                item["last_viewed"] = datetime.now().isoformat()
-                
-                # Calculate engagement rate (simplified: views + shares / total possible)
-                total_interactions = item.get("views", 0) + item.get("shares", 0)
-                if total_interactions > 0:
-                    item["engagement_rate"] = round((total_interactions / (total_interactions + 10)) * 100, 1)
-                
-                # Calculate growth rate (simplified: based on recent activity)
-                if item.get("views", 0) > 10:
-                    item["growth_rate"] = round(min(25.0, (item.get("views", 0) / 10) * 5), 1)
-                
-                _write_publish_store(store)
-                return {"message": "View tracked", "views": item["views"]}
-        
-        raise HTTPException(status_code=404, detail="Content item not found")
+        item = counter_buffer.record(item_id, views=1, last_viewed=datetime.now().isoformat())
+        if item is None:
+            raise HTTPException(status_code=404, detail="Content item not found")
+        return {"message": "View tracked", "views": item["views"]}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error tracking view: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to track view")
@@ -785,45 +1082,133 @@ async def track_view(item_id: str):
 async def track_share(item_id: str):
     """Track a share for a published content item."""
     try:
-        store = _read_publish_store()
-        items = store.get("items", [])
-        
-        # Find and update the item
-        for item in items:
-            if item.get("id") == item_id:
-                item["shares"] = item.get("shares", 0) + 1
-                
-                # Recalculate engagement rate
-                total_interactions = item.get("views", 0) + item.get("shares", 0)
-                if total_interactions > 0:
-                    item["engagement_rate"] = round((total_interactions / (total_interactions + 10)) * 100, 1)
-                
-                _write_publish_store(store)
-                return {"message": "Share tracked", "shares": item["shares"]}
-        
-        raise HTTPException(status_code=404, detail="Content item not found")
+        item = counter_buffer.record(item_id, shares=1)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Content item not found")
+        return {"message": "Share tracked", "shares": item["shares"]}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error tracking share: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to track share")
 
 
+# Invalid-record messages echoed back in a bulk ingestion response
+MAX_INGEST_ERRORS = 50
+
+
+async def _ndjson_records(request: Request) -> AsyncIterator[Any]:
+    """Decode an NDJSON body line by line as it streams in."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+def _event_timestamp(event: AnalyticsEvent) -> str:
+    if event.timestamp is None:
+        return datetime.now().isoformat()
+    if event.timestamp.tzinfo is not None:
+        # Stored timestamps are naive local time
+        return event.timestamp.astimezone().replace(tzinfo=None).isoformat()
+    return event.timestamp.isoformat()
+
+
+@router.post("/published/events", response_model=AnalyticsIngestResponse)
+async def ingest_analytics_events(request: Request) -> AnalyticsIngestResponse:
+    """Apply a batch of view/share events in one store transaction.
+
+    The body is a JSON array of ``{"item_id", "event", "timestamp"}`` records
+    or, with an ``application/x-ndjson`` content type, one record per line.
+    Events are aggregated per item before being written; invalid records are
+    counted and reported without failing the batch.
+    """
+    deltas: Dict[str, CounterDelta] = {}
+    errors: List[str] = []
+    received = 0
+
+    def _add(record: Any) -> None:
+        nonlocal received
+        received += 1
+        if received > settings.analytics_ingest_max_events:
+            raise HTTPException(
+                status_code=413,
+                detail={"message": f"Too many events (max {settings.analytics_ingest_max_events})"},
+            )
+        try:
+            if isinstance(record, bytes):
+                record = json.loads(record)
+            event = AnalyticsEvent.model_validate(record)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            errors.append(f"record {received}: invalid JSON ({str(e)})")
+            return
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            errors.append(f"record {received}: {problems}")
+            return
+        delta = deltas.setdefault(event.item_id, CounterDelta())
+        if event.event == "view":
+            delta.add(views=1, last_viewed=_event_timestamp(event))
+        else:
+            delta.add(shares=1)
+
+    try:
+        content_type = request.headers.get("content-type", "")
+        if "ndjson" in content_type or "jsonl" in content_type:
+            async for line in _ndjson_records(request):
+                _add(line)
+        else:
+            try:
+                records = json.loads(await request.body())
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise HTTPException(status_code=400, detail={"message": f"Invalid JSON body: {str(e)}"})
+            if not isinstance(records, list):
+                raise HTTPException(status_code=400, detail={"message": "Expected a JSON array of events"})
+            for record in records:
+                _add(record)
+
+        updated = publish_store.increment_many(deltas) if deltas else {}
+        results = {}
+        for item_id, item in updated.items():
+            item = counter_buffer.overlay(item)
+            results[item_id] = AnalyticsItemResult(
+                views_added=deltas[item_id].views,
+                shares_added=deltas[item_id].shares,
+                views=item.get("views", 0),
+                shares=item.get("shares", 0),
+            )
+        unknown_ids = sorted(item_id for item_id in deltas if item_id not in updated)
+        applied = sum(r.views_added + r.shares_added for r in results.values())
+        logger.info(f"Ingested {applied} analytics events for {len(results)} items ({len(errors)} invalid, {len(unknown_ids)} unknown ids)")
+        return AnalyticsIngestResponse(
+            received=received,
+            applied=applied,
+            invalid=len(errors),
+            results=results,
+            unknown_ids=unknown_ids,
+            errors=errors[:MAX_INGEST_ERRORS],
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ingesting analytics events: {str(e)}")
+        raise HTTPException(status_code=500, detail={"message": "Failed to ingest analytics events"})
+
+
 @router.delete("/published/{item_id}")
 async def delete_published_item(item_id: str):
     """Delete a published content item."""
     try:
-        store = _read_publish_store()
-        items = store.get("items", [])
-        
-        # Find and remove the item
-        original_length = len(items)
-        items = [item for item in items if item.get("id") != item_id]
-        
-        if len(items) == original_length:
+        if not publish_store.delete(item_id):
             raise HTTPException(status_code=404, detail="Content item not found")
-        
-        store["items"] = items
-        _write_publish_store(store)
         return {"message": "Content item deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting item: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to delete item")
@@ -842,6 +1227,7 @@ class UpdatePublishedContentRequest(BaseModel):
     cautions: Optional[str] = None
     destination: Optional[str] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, str]] = None
     status: Optional[str] = None
     location: Optional[str] = None
 
@@ -850,35 +1236,42 @@ class UpdatePublishedContentRequest(BaseModel):
 async def update_published_item(item_id: str, payload: UpdatePublishedContentRequest):
     """Update a published content item."""
     try:
-        store = _read_publish_store()
-        items = store.get("items", [])
-        
-        # Find and update the item
-        for item in items:
-            if item.get("id") == item_id:
-                # Update the item with new data
-                item.update({
-                    "title": payload.title if payload.title is not None else item.get("title"),
-                    "content": payload.content if payload.content is not None else item.get("content"),
-                    "type": payload.type if payload.type is not None else item.get("type"),
-                    "tags": payload.tags if payload.tags is not None else item.get("tags"),
-                    "highlights": payload.highlights if payload.highlights is not None else item.get("highlights"),
-                    "neighborhoods": payload.neighborhoods if payload.neighborhoods is not None else item.get("neighborhoods"),
-                    "recommended_spots": payload.recommended_spots if payload.recommended_spots is not None else item.get("recommended_spots"),
-                    "price_range": payload.price_range if payload.price_range is not None else item.get("price_range"),
-                    "best_times": payload.best_times if payload.best_times is not None else item.get("best_times"),
-                    "cautions": payload.cautions if payload.cautions is not None else item.get("cautions"),
-                    "destination": payload.destination if payload.destination is not None else item.get("destination"),
-                    "image_url": payload.image_url if payload.image_url is not None else item.get("image_url"),
-                    "status": payload.status if payload.status is not None else item.get("status"),
-                    "location": payload.location if payload.location is not None else item.get("location"),
-                })
-                
-                _write_publish_store(store)
-                return PublishedContentItem(**item) # Return the updated item
-        
-        raise HTTPException(status_code=404, detail="Content item not found")
+        # Only overwrite fields that were provided
+        updates = payload.model_dump(exclude_none=True)
+        if "image_url" in updates:
+            updates["image_url"] = image_pipeline.stored_url(updates["image_url"])
+        if "image_variants" in updates:
+            updates["image_variants"] = image_pipeline.stored_variants(updates["image_variants"])
+        elif "image_url" in updates:
+            updates["image_variants"] = image_pipeline.variants_for_url(updates["image_url"])
+        item = publish_store.update(item_id, updates)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Content item not found")
+        return PublishedContentItem(**_published_item(counter_buffer.overlay(item))) # Return the updated item
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating item: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update item")
 
+
+@router.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    """Return in-process cache and performance counters."""
+    return {
+        "search_cache": search_cache.stats(),
+        "generate_cache": generate_cache.stats(),
+        "generate_coalescing": generate_flight.stats(),
+        "batch_budget": global_batch_budget.stats(),
+        "models": model_router.stats(),
+        "hedging": hedge_stats(),
+        "analytics_buffer": counter_buffer.stats(),
+        "published_response_cache": published_response_cache.stats(),
+        "compression_cache": compression_cache.stats(),
+        "images": image_pipeline.stats(),
+        "image_jobs": image_jobs.stats(),
+        "rate_limits": {"chat": chat_limiter.stats(), "images": image_limiter.stats()},
+        "llm_output": output_stats(),
+        "token_usage": usage_stats(),
+        "prompts": prompt_registry.stats(),
+    }
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 import json
 import os
 
@@ -21,13 +21,134 @@ class Settings(BaseSettings):
 
     openai_api_key: str
     openai_model: str = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+    # Tried after openai_model, in order, when it is unavailable or unhealthy
+    openai_fallback_models: List[str] | str = ['gpt-4o-mini', 'gpt-4o', 'gpt-4-1106-preview']
+
+    # OpenAI HTTP transport (one pooled connection pool shared by all routes)
+    openai_max_connections: int = int(os.getenv('OPENAI_MAX_CONNECTIONS', '100'))
+    openai_max_keepalive_connections: int = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '20'))
+    openai_keepalive_expiry: float = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '30'))
+    openai_connect_timeout: float = float(os.getenv('OPENAI_CONNECT_TIMEOUT', '10'))
+    # Retries of connection errors, timeouts and 5xx responses per call
+    openai_max_retries: int = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+    # Client-side rate limiting of upstream calls (0 disables a limit). Calls
+    # wait in arrival order for capacity up to openai_rate_limit_max_wait
+    # seconds; upstream 429s are retried with jittered exponential backoff
+    openai_rpm_limit: int = int(os.getenv('OPENAI_RPM_LIMIT', '500'))
+    openai_tpm_limit: int = int(os.getenv('OPENAI_TPM_LIMIT', '200000'))
+    openai_image_rpm_limit: int = int(os.getenv('OPENAI_IMAGE_RPM_LIMIT', '5'))
+    openai_rate_limit_max_wait: float = float(os.getenv('OPENAI_RATE_LIMIT_MAX_WAIT', '30'))
+    openai_rate_limit_retries: int = int(os.getenv('OPENAI_RATE_LIMIT_RETRIES', '3'))
+    openai_backoff_base: float = float(os.getenv('OPENAI_BACKOFF_BASE', '1'))
+    openai_backoff_max: float = float(os.getenv('OPENAI_BACKOFF_MAX', '20'))
+    # Per-call timeouts (seconds)
+    openai_chat_timeout: float = float(os.getenv('OPENAI_CHAT_TIMEOUT', '60'))
+    openai_image_timeout: float = float(os.getenv('OPENAI_IMAGE_TIMEOUT', '90'))
+
+    # /search-places result cache
+    search_cache_max_entries: int = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '512'))
+    search_cache_ttl_seconds: float = float(os.getenv('SEARCH_CACHE_TTL_SECONDS', '86400'))
+    search_cache_path: Optional[str] = os.getenv('SEARCH_CACHE_PATH') or None
+
+    # /generate-content result cache behind request coalescing (0 disables it,
+    # so "regenerate" keeps returning fresh suggestions by default)
+    generate_cache_max_entries: int = int(os.getenv('GENERATE_CACHE_MAX_ENTRIES', '256'))
+    generate_cache_ttl_seconds: float = float(os.getenv('GENERATE_CACHE_TTL_SECONDS', '0'))
+
+    # /generate-content/batch: items per batch, default per-batch concurrency,
+    # concurrency across all running batches, and the default token budget
+    # per batch (estimated prompt + max_tokens per uncached item)
+    batch_max_items: int = int(os.getenv('BATCH_MAX_ITEMS', '500'))
+    batch_concurrency: int = int(os.getenv('BATCH_CONCURRENCY', '8'))
+    batch_global_concurrency: int = int(os.getenv('BATCH_GLOBAL_CONCURRENCY', '16'))
+    batch_token_budget: int = int(os.getenv('BATCH_TOKEN_BUDGET', '2000000'))
+    # Shared by all batches per BATCH_GLOBAL_BUDGET_WINDOW_SECONDS (0 = no cap)
+    batch_global_token_budget: int = int(os.getenv('BATCH_GLOBAL_TOKEN_BUDGET', '20000000'))
+    batch_global_request_budget: int = int(os.getenv('BATCH_GLOBAL_REQUEST_BUDGET', '10000'))
+    batch_global_budget_window_seconds: float = float(os.getenv('BATCH_GLOBAL_BUDGET_WINDOW_SECONDS', '86400'))
+
+    # Prompt templates. Static prefixes are counted with this tiktoken
+    # encoding when tiktoken is installed (else estimated from length)
+    tokenizer_encoding: str = os.getenv('TOKENIZER_ENCODING', 'cl100k_base')
+    # Where tiktoken caches its BPE files (fetched on first use); pre-seed it
+    # to run offline. Empty keeps tiktoken's default (a temp directory)
+    tokenizer_cache_dir: str = os.getenv('TOKENIZER_CACHE_DIR', '')
+    # max_tokens is sized from the expected output: words * tokens per word
+    # (doubled for non-English output) plus JSON overhead, times headroom,
+    # clamped to [min, max]
+    llm_tokens_per_word: float = float(os.getenv('LLM_TOKENS_PER_WORD', '1.4'))
+    llm_completion_headroom: float = float(os.getenv('LLM_COMPLETION_HEADROOM', '1.25'))
+    llm_min_completion_tokens: int = int(os.getenv('LLM_MIN_COMPLETION_TOKENS', '400'))
+    llm_max_completion_tokens: int = int(os.getenv('LLM_MAX_COMPLETION_TOKENS', '4000'))
+
+    # Model router circuit breaker
+    circuit_failure_threshold: int = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '3'))
+    circuit_cooldown_seconds: float = float(os.getenv('CIRCUIT_COOLDOWN_SECONDS', '30'))
+    circuit_not_found_cooldown_seconds: float = float(os.getenv('CIRCUIT_NOT_FOUND_COOLDOWN_SECONDS', '3600'))
+
+    # Hedged requests: if the primary model is slower than its recent latency
+    # percentile, start the same prompt on the next model and keep the winner
+    llm_hedging_enabled: bool = os.getenv('LLM_HEDGING_ENABLED', 'false').lower() == 'true'
+    llm_hedge_percentile: float = float(os.getenv('LLM_HEDGE_PERCENTILE', '95'))
+    llm_hedge_min_samples: int = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+    llm_hedge_default_delay: float = float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', '15'))
+    llm_hedge_min_delay: float = float(os.getenv('LLM_HEDGE_MIN_DELAY', '2'))
+    llm_hedge_max_delay: float = float(os.getenv('LLM_HEDGE_MAX_DELAY', '30'))
+
+    # Published content store. "log": JSON snapshot plus an append-only log
+    # beside it; "sqlite": database at publish_sqlite_path (imports the JSON
+    # store on first start)
+    publish_store_backend: str = os.getenv('PUBLISH_STORE_BACKEND', 'log')
+    publish_sqlite_path: str = os.getenv('PUBLISH_SQLITE_PATH', os.path.join('be', 'static', 'generated', 'published_content.db'))
+    publish_store_path: str = os.getenv('PUBLISH_STORE_PATH', os.path.join('be', 'static', 'generated', 'published_content.json'))
+    publish_log_fsync: bool = os.getenv('PUBLISH_LOG_FSYNC', 'false').lower() == 'true'
+    publish_compact_interval_seconds: float = float(os.getenv('PUBLISH_COMPACT_INTERVAL_SECONDS', '30'))
+    publish_compact_threshold: int = int(os.getenv('PUBLISH_COMPACT_THRESHOLD', '500'))
+    # Write the snapshot without indentation (smaller, faster; less readable)
+    publish_store_compact_json: bool = os.getenv('PUBLISH_STORE_COMPACT_JSON', 'false').lower() == 'true'
+    # JSON codec for the publish store and large responses: auto (orjson when installed), orjson or json
+    json_codec: str = os.getenv('JSON_CODEC', 'auto')
+    # Serialized /published responses kept per store version
+    published_response_cache_entries: int = int(os.getenv('PUBLISHED_RESPONSE_CACHE_ENTRIES', '64'))
+    published_response_cache_ttl_seconds: float = float(os.getenv('PUBLISHED_RESPONSE_CACHE_TTL_SECONDS', '600'))
+    # Response compression (brotli when installed and accepted, else gzip)
+    compression_enabled: bool = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    compression_minimum_size: int = int(os.getenv('COMPRESSION_MINIMUM_SIZE', '1024'))
+    compression_gzip_level: int = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+    compression_brotli_quality: int = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+    compression_cache_entries: int = int(os.getenv('COMPRESSION_CACHE_ENTRIES', '128'))
+    compression_cache_ttl_seconds: float = float(os.getenv('COMPRESSION_CACHE_TTL_SECONDS', '600'))
+    # Generated images are downloaded once into content-addressed storage and
+    # resized into variants. "openai" calls the Images API; "fake" renders a
+    # local placeholder (no network) for development and testing
+    image_backend: str = os.getenv('IMAGE_BACKEND', 'openai')
+    image_storage_dir: str = os.getenv('IMAGE_STORAGE_DIR', os.path.join('be', 'static', 'generated', 'images'))
+    image_url_prefix: str = os.getenv('IMAGE_URL_PREFIX', '/static/images')
+    # Prepended to image paths in responses so a frontend on another origin
+    # can load them (stored content keeps paths, so this can change freely).
+    # Empty serves relative paths; deployments set their own public origin
+    image_public_base_url: str = os.getenv('IMAGE_PUBLIC_BASE_URL', '')
+    image_variant_workers: int = int(os.getenv('IMAGE_VARIANT_WORKERS', '2'))
+    image_download_max_bytes: int = int(os.getenv('IMAGE_DOWNLOAD_MAX_BYTES', str(20 * 1024 * 1024)))
+    image_jpeg_quality: int = int(os.getenv('IMAGE_JPEG_QUALITY', '85'))
+    # Image generation runs as background jobs: at most image_job_concurrency
+    # at once, image_job_max_pending waiting; finished jobs are kept for polling
+    image_job_concurrency: int = int(os.getenv('IMAGE_JOB_CONCURRENCY', '4'))
+    image_job_max_pending: int = int(os.getenv('IMAGE_JOB_MAX_PENDING', '100'))
+    image_job_retention_seconds: float = float(os.getenv('IMAGE_JOB_RETENTION_SECONDS', '3600'))
+    # Reuse a finished job for an identical prompt (0 keeps "regenerate" fresh)
+    image_job_reuse_seconds: float = float(os.getenv('IMAGE_JOB_REUSE_SECONDS', '0'))
+    # View/share tracking is buffered in memory and written in batches
+    analytics_flush_interval_seconds: float = float(os.getenv('ANALYTICS_FLUSH_INTERVAL_SECONDS', '2'))
+    analytics_flush_max_pending: int = int(os.getenv('ANALYTICS_FLUSH_MAX_PENDING', '1000'))
+    analytics_ingest_max_events: int = int(os.getenv('ANALYTICS_INGEST_MAX_EVENTS', '100000'))
 
     backend_cors_origins: List[AnyHttpUrl] | List[str] = []
 
-    @field_validator('backend_cors_origins', mode='before')
+    @field_validator('backend_cors_origins', 'openai_fallback_models', mode='before')
     @classmethod
-    def assemble_cors_origins(cls, v):
-        """Support JSON list or comma-separated string for CORS origins."""
+    def assemble_list(cls, v):
+        """Support JSON list or comma-separated string for list settings."""
         if not v:
             return []
         if isinstance(v, list):
@@ -1,12 +1,62 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.api.v1.routes.content import router as content_router
+from app.api.v1.routes.content import router as content_router, counter_buffer, image_jobs, publish_store, search_cache
+from app.services.compression import CompressionMiddleware, compression_cache
+from app.services.counter_buffer import run_flusher
+from app.services.image_store import ImmutableStaticFiles, image_pipeline
+from app.services.openai_client import close_client
+from app.services.prompts import prompt_registry
+from app.services.publish_store import run_compaction
+from app.services.tokens import load_tokenizer
+
+logger = logging.getLogger(__name__)
+
+
+async def _load_tokenizer() -> None:
+    """Load the tokenizer in a thread (it may download), then recount prompt prefixes."""
+    if await asyncio.to_thread(load_tokenizer):
+        prompt_registry.load()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Estimated counts until the tokenizer is ready; startup does not wait for it
+    prompt_registry.load()
+    tokenizer = asyncio.create_task(_load_tokenizer())
+    compaction = asyncio.create_task(run_compaction(
+        publish_store,
+        interval=settings.publish_compact_interval_seconds,
+        threshold=settings.publish_compact_threshold,
+    ))
+    flusher = asyncio.create_task(run_flusher(counter_buffer, interval=settings.analytics_flush_interval_seconds))
+    image_jobs.start()
+    yield
+    # Shutdown
+    for task in (flusher, compaction, tokenizer):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await image_jobs.stop()
+    try:
+        counter_buffer.flush()
+    except Exception as e:
+        # The rest of shutdown (compaction, close, cache save) must still run
+        logger.error(f"Final counter flush failed; {counter_buffer.stats()['pending_events']} event(s) lost: {e}")
+    publish_store.compact()
+    publish_store.close()
+    search_cache.save()
+    await image_pipeline.close()
+    await close_client()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.project_name)
+    app = FastAPI(title=settings.project_name, lifespan=lifespan)
 
     # CORS
     app.add_middleware(
@@ -16,12 +66,23 @@ def create_app() -> FastAPI:
         allow_methods=['*'],
         allow_headers=['*'],
     )
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+            cache=compression_cache,
+        )
 
     # Health
     @app.get('/health')
     def health() -> dict[str, str]:  # pragma: no cover - trivial route
         return {"status": "ok"}
 
+    # Content-addressed generated images
+    app.mount(settings.image_url_prefix, ImmutableStaticFiles(directory=settings.image_storage_dir), name='images')
+
     # API routes
     app.include_router(content_router, prefix=settings.api_v1_str, tags=['content'])
 
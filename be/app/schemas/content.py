@@ -1,4 +1,5 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -30,6 +31,33 @@ class ContentResponse(BaseModel):
     suggestions: List[ContentSuggestion]
 
 
+class ContentBatchRequest(BaseModel):
+    requests: List[ContentRequest] = Field(..., min_length=1, description='One content request per destination')
+    concurrency: Optional[int] = Field(default=None, ge=1, description='Upstream calls in flight for this batch (capped by the server)')
+    max_requests: Optional[int] = Field(default=None, ge=1, description='Stop starting uncached items after this many upstream calls')
+    max_tokens: Optional[int] = Field(default=None, ge=1, description='Estimated token budget for the batch (capped by the server)')
+
+
+class ContentBatchItemResult(BaseModel):
+    """One NDJSON line of a batch response, emitted as each item completes."""
+    type: Literal["result"] = "result"
+    index: int
+    destination: str
+    status: Literal["ok", "error"]
+    result: Optional[ContentResponse] = None
+    error: Optional[Dict[str, Any]] = None
+
+
+class ContentBatchSummary(BaseModel):
+    """Final NDJSON line of a batch response."""
+    type: Literal["summary"] = "summary"
+    total: int
+    succeeded: int
+    failed: int
+    budget: Dict[str, Optional[int]]
+    elapsed_seconds: float
+
+
 class ImageGenerationRequest(BaseModel):
     title: str
     content: str
@@ -46,6 +74,19 @@ class ImageGenerationResponse(BaseModel):
     image_size: str = "1024x1024"
     alt_text: str
     image_url: Optional[str] = None
+    # thumbnail/card/full URLs of the locally stored copy
+    image_variants: Optional[Dict[str, str]] = None
+    error: Optional[str] = None
+
+
+class ImageJobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    # True when an identical prompt was already queued or running
+    deduplicated: bool = False
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[ImageGenerationResponse] = None
     error: Optional[str] = None
 
 
@@ -110,6 +151,7 @@ class PublishContentRequest(BaseModel):
     cautions: Optional[str] = None
     destination: Optional[str] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, str]] = None
 
 
 class PublishedContentItem(BaseModel):
@@ -128,6 +170,7 @@ class PublishedContentItem(BaseModel):
     cautions: Optional[str] = None
     destination: Optional[str] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, str]] = None
     status: str = Field(default="Published")
     location: Optional[str] = None
     date: str
@@ -144,4 +187,36 @@ class PublishedContentItem(BaseModel):
 class PublishedContentResponse(BaseModel):
     items: List[PublishedContentItem]
     total: int
+    next_cursor: Optional[str] = None
+
+
+class PublishedSearchResult(PublishedContentItem):
+    score: float = Field(..., description='BM25 relevance score')
+
+
+class PublishedSearchResponse(BaseModel):
+    query: str
+    items: List[PublishedSearchResult]
+    total: int = Field(..., description='Number of matching items')
+
+
+class AnalyticsEvent(BaseModel):
+    item_id: str
+    event: Literal['view', 'share']
+    timestamp: Optional[datetime] = Field(default=None, description='When the event happened; defaults to ingestion time')
+
+
+class AnalyticsItemResult(BaseModel):
+    views_added: int
+    shares_added: int
+    views: int
+    shares: int
+
 
+class AnalyticsIngestResponse(BaseModel):
+    received: int = Field(..., description='Records in the request body')
+    applied: int = Field(..., description='Events applied to known items')
+    invalid: int = Field(..., description='Records that could not be parsed or validated')
+    results: Dict[str, AnalyticsItemResult]
+    unknown_ids: List[str]
+    errors: List[str] = Field(default_factory=list, description='First few invalid-record messages')
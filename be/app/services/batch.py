@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class BudgetExceededError(Exception):
+    """A batch item was not started because its budget is spent."""
+
+
+class Budget:
+    """Request and token allowance for one batch, or for all of them.
+
+    Tokens are reserved before an upstream call starts (an estimate of
+    prompt plus completion cap), so concurrent items can never overshoot.
+    ``None`` limits are unlimited. A reservation also draws on ``parent``
+    (the process-wide budget shared by every batch) and fails if either is
+    spent. With ``window`` seconds set, the counts reset once per window.
+    """
+
+    def __init__(
+        self,
+        max_requests: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        parent: Optional[Budget] = None,
+        window: Optional[float] = None,
+        name: str = "batch",
+    ) -> None:
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.parent = parent
+        self.window = window
+        self.name = name
+        self.requests = 0
+        self.tokens = 0
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> None:
+        with self._lock:
+            if self.window is not None and time.monotonic() - self._window_start >= self.window:
+                self.requests = self.tokens = 0
+                self._window_start = time.monotonic()
+            if self.max_requests is not None and self.requests + 1 > self.max_requests:
+                raise BudgetExceededError(f"{self.name} request budget of {self.max_requests} spent")
+            if self.max_tokens is not None and self.tokens + tokens > self.max_tokens:
+                raise BudgetExceededError(f"{self.name} token budget of {self.max_tokens} spent ({self.tokens} reserved)")
+            if self.parent is not None:
+                # Child lock then parent lock, always in that order
+                self.parent.reserve(tokens)
+            self.requests += 1
+            self.tokens += tokens
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {
+            "requests": self.requests,
+            "max_requests": self.max_requests,
+            "tokens": self.tokens,
+            "max_tokens": self.max_tokens,
+        }
+
+
+async def map_bounded(
+    items: Sequence[T],
+    fn: Callable[[T], Awaitable[R]],
+    concurrency: int,
+    limiter: Optional[asyncio.Semaphore] = None,
+) -> AsyncIterator[Tuple[int, Optional[R], Optional[BaseException]]]:
+    """Run ``fn`` over ``items`` with at most ``concurrency`` in flight.
+
+    Yields ``(index, result, error)`` in completion order; one item failing
+    does not stop the rest. ``limiter`` is an extra semaphore shared with
+    other batches so their combined concurrency stays bounded. Closing the
+    iterator early cancels the items still running.
+    """
+    results: "asyncio.Queue[Tuple[int, Optional[R], Optional[BaseException]]]" = asyncio.Queue()
+    next_index = iter(range(len(items)))
+
+    async def _run(index: int) -> None:
+        try:
+            if limiter is None:
+                result = await fn(items[index])
+            else:
+                async with limiter:
+                    result = await fn(items[index])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            results.put_nowait((index, None, e))
+        else:
+            results.put_nowait((index, result, None))
+
+    async def _worker() -> None:
+        for index in next_index:
+            await _run(index)
+
+    workers = [asyncio.create_task(_worker()) for _ in range(max(1, min(concurrency, len(items))))]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(value: str) -> str:
+    """Fold case, whitespace and diacritics so equivalent queries share a key."""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a fixed TTL.
+
+    Values must be JSON-serializable when ``persist_path`` is set, since the
+    cache is written to disk on ``save()`` and reloaded on construction.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, persist_path: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if persist_path:
+            self.load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def load(self) -> None:
+        """Load unexpired entries from ``persist_path`` if it exists."""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r") as f:
+                raw = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache file {self.persist_path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            for key, expires_at, value in raw.get("entries", []):
+                if expires_at > now:
+                    self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"Loaded {len(self._entries)} cache entries from {self.persist_path}")
+
+    def save(self) -> None:
+        """Atomically write unexpired entries to ``persist_path``."""
+        if not self.persist_path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [[key, expires_at, value] for key, (expires_at, value) in self._entries.items() if expires_at > now]
+        os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+        tmp_path = f"{self.persist_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.persist_path)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Union
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# orjson.JSONDecodeError subclasses this, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+
+def _resolve_backend(requested: str) -> str:
+    if requested == "json" or (requested == "auto" and orjson is None):
+        return "json"
+    if orjson is None:
+        raise RuntimeError("JSON_CODEC=orjson but orjson is not installed")
+    return "orjson"
+
+
+backend = _resolve_backend(settings.json_codec)
+
+
+def dumps(obj: Any, *, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, compact unless ``indent`` is set."""
+    if backend == "orjson":
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if backend == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.services.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional speedup
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+# Bodies this large are compressed off the event loop
+THREAD_OFFLOAD_SIZE = 256 * 1024
+
+compression_cache = TTLCache(
+    max_entries=settings.compression_cache_entries,
+    ttl_seconds=settings.compression_cache_ttl_seconds,
+)
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip compression for complete (non-streaming) responses.
+
+    Brotli is preferred when the client accepts it and the ``brotli`` package
+    is installed. Bodies under ``minimum_size``, already-encoded responses,
+    non-text content types and streamed responses (SSE, NDJSON) pass through
+    untouched. Compressed bytes are cached by URL and response ETag, or by a
+    digest of the body when there is no ETag, so unchanged payloads polled
+    repeatedly are compressed once.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        cache: Optional[TTLCache] = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache
+
+    def _choose_encoding(self, scope: Scope) -> Optional[str]:
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        wildcard = accepted.get("*", 0.0)
+        if brotli is not None and accepted.get("br", wildcard) > 0:
+            return "br"
+        if accepted.get("gzip", wildcard) > 0:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def _send(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            if message.get("more_body", False):
+                # Streaming response: send as-is
+                passthrough = True
+                await send(self._with_vary(start))
+                await send(message)
+                return
+            await self._send_complete(scope, start, message.get("body", b""), encoding, send)
+
+        await self.app(scope, receive, _send)
+
+    @staticmethod
+    def _with_vary(start: Message) -> Message:
+        headers = MutableHeaders(raw=list(start["headers"]))
+        headers.add_vary_header("Accept-Encoding")
+        return {**start, "headers": headers.raw}
+
+    def _compressible(self, headers: MutableHeaders, body: bytes) -> bool:
+        if "content-encoding" in headers or len(body) < self.minimum_size:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def _send_complete(self, scope: Scope, start: Message, body: bytes, encoding: str, send: Send) -> None:
+        headers = MutableHeaders(raw=list(start["headers"]))
+        headers.add_vary_header("Accept-Encoding")
+        if self._compressible(headers, body):
+            etag = headers.get("etag")
+            # ETags are per store version, not per URL
+            version = f"{scope['path']}?{scope.get('query_string', b'').decode('latin-1')}|{etag}" if etag else None
+            if len(body) >= THREAD_OFFLOAD_SIZE:
+                body = await asyncio.to_thread(self._compressed, body, encoding, version)
+            else:
+                body = self._compressed(body, encoding, version)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+        await send({**start, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+
+    def _compressed(self, body: bytes, encoding: str, version: Optional[str]) -> bytes:
+        key = None
+        if self.cache is not None and self.cache.enabled:
+            version = version or hashlib.blake2b(body, digest_size=16).hexdigest()
+            key = f"{encoding}|{version}|{len(body)}"
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        if key is not None:
+            self.cache.set(key, compressed)
+        return compressed
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import suppress
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.publish_store import CounterDelta, PublishStore
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """Aggregate view/share increments in memory and flush them in batches.
+
+    ``record`` only touches memory; pending deltas are written with one
+    ``increment_many`` call by the background flusher (``run_flusher``),
+    on its interval or as soon as ``max_pending`` events have accumulated,
+    and at shutdown. Derived rates
+    are recomputed once per item per flush. Use ``overlay`` on items read
+    from the store so responses include counts that are not flushed yet
+    (sorting by views/shares reflects flushed counts only).
+    """
+
+    def __init__(self, store: PublishStore, max_pending: int) -> None:
+        self.store = store
+        self.max_pending = max(1, max_pending)
+        self._pending: Dict[str, CounterDelta] = {}
+        self._pending_events = 0
+        # Held across a flush so readers never see deltas both pending and stored
+        self._lock = threading.Lock()
+        self.flushes = 0
+        self.flushed_events = 0
+        self.failures = 0
+        # Changes whenever overlaid counts change (flushing does not change them)
+        self.version = 0
+        self.last_modified = 0.0
+        # Set while run_flusher is running: asks it to flush now (thread-safe)
+        self._wake: Optional[Callable[[], None]] = None
+
+    def record(
+        self,
+        item_id: str,
+        views: int = 0,
+        shares: int = 0,
+        last_viewed: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Buffer an increment; returns the item with buffered counts, or None if unknown."""
+        item = self.store.get(item_id)
+        if item is None:
+            return None
+        with self._lock:
+            delta = self._pending.setdefault(item_id, CounterDelta())
+            delta.add(views, shares, last_viewed)
+            self._pending_events += 1
+            self.version += 1
+            self.last_modified = time.time()
+            full = self._pending_events >= self.max_pending
+            result = self._overlay(item)
+        if full:
+            wake = self._wake
+            if wake is not None:
+                # Never write from the caller: it is usually the event loop
+                wake()
+            else:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Flushing buffered counters failed: {e}")
+        return result
+
+    def _overlay(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        delta = self._pending.get(item["id"])
+        if delta is None:
+            return item
+        merged = dict(item)
+        delta.apply_to(merged)
+        return merged
+
+    def overlay(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """``item`` with any unflushed counts applied (a copy if it changed)."""
+        with self._lock:
+            return self._overlay(item)
+
+    def overlay_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            if not self._pending:
+                return items
+            return [self._overlay(item) for item in items]
+
+    def flush(self) -> int:
+        """Write all pending deltas to the store; returns the number of events flushed."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            try:
+                self.store.increment_many(self._pending)
+            except Exception:
+                # Keep the deltas; the next flush retries them
+                self.failures += 1
+                raise
+            flushed = self._pending_events
+            self.flushes += 1
+            self.flushed_events += flushed
+            self._pending = {}
+            self._pending_events = 0
+        logger.debug(f"Flushed {flushed} buffered counter event(s)")
+        return flushed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending_items": len(self._pending),
+                "pending_events": self._pending_events,
+                "max_pending": self.max_pending,
+                "flushes": self.flushes,
+                "flushed_events": self.flushed_events,
+                "failures": self.failures,
+            }
+
+
+async def run_flusher(buffer: CounterBuffer, interval: float) -> None:
+    """Background task: flush buffered counters every ``interval`` seconds,
+    or sooner when ``record`` finds the buffer full."""
+    loop = asyncio.get_running_loop()
+    full = asyncio.Event()
+    buffer._wake = lambda: loop.call_soon_threadsafe(full.set)
+    try:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(full.wait(), interval)
+            full.clear()
+            try:
+                await asyncio.to_thread(buffer.flush)
+            except Exception as e:
+                logger.error(f"Flushing buffered counters failed: {e}")
+    finally:
+        buffer._wake = None
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+# Crockford base32, as used by ULID
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+# Shared with legacy ``pub_<epoch ms>`` IDs, which remain valid
+ITEM_ID_PREFIX = "pub_"
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, rem = divmod(value, 32)
+        chars.append(_ALPHABET[rem])
+    return "".join(reversed(chars))
+
+
+class UlidGenerator:
+    """Monotonic ULIDs: 48-bit millisecond timestamp + 80 random bits.
+
+    Within one millisecond (or if the clock steps back) the random part is
+    incremented instead of redrawn, so IDs from one process are strictly
+    increasing and sort in creation order.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._last_random = 0
+
+    def new(self) -> str:
+        with self._lock:
+            now_ms = int(time.time() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            elif self._last_random < _RANDOM_MAX:
+                self._last_random += 1
+            else:
+                # Random space for this millisecond exhausted: borrow the next one
+                self._last_ms += 1
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            return _encode(self._last_ms, 10) + _encode(self._last_random, 16)
+
+
+_generator = UlidGenerator()
+
+
+def new_item_id() -> str:
+    """A collision-free, time-sortable ID for a published item (``pub_<ULID>``)."""
+    return f"{ITEM_ID_PREFIX}{_generator.new()}"
+
+
+def new_job_id() -> str:
+    """A time-sortable ID for a background job (``job_<ULID>``)."""
+    return f"job_{_generator.new()}"
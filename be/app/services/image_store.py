@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+from starlette.staticfiles import StaticFiles
+
+from app.core.config import settings
+from app.services.openai_client import client
+from app.services.rate_limiter import call_limited, image_limiter
+from app.services.singleflight import SingleFlight
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Longest edge per variant; "full" caps the original at the provider size
+VARIANT_SIZES = {
+    "thumbnail": 320,
+    "card": 640,
+    "full": 1024,
+}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF8", "gif"),
+)
+
+
+class ImagePipelineError(Exception):
+    """The provider image could not be fetched or stored."""
+
+
+def _sniff_extension(data: bytes) -> str:
+    for magic, extension in _MAGIC:
+        if data.startswith(magic):
+            return extension
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    raise ImagePipelineError("Downloaded file is not a supported image")
+
+
+def _parse_size(size: str) -> Tuple[int, int]:
+    width, _, height = size.partition("x")
+    return int(width), int(height or width)
+
+
+def _placeholder_png(seed: bytes, width: int, height: int) -> bytes:
+    """A vertical two-colour gradient PNG, deterministic for ``seed``."""
+    top, bottom = seed[:3], seed[3:6]
+    rows = []
+    for y in range(height):
+        t = y / max(height - 1, 1)
+        pixel = bytes(round(a + (b - a) * t) for a, b in zip(top, bottom))
+        rows.append(b"\x00" + pixel * width)
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"".join(rows), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+class ImageBackend(ABC):
+    """Produces the original image bytes for a prompt."""
+
+    name = "base"
+
+    @abstractmethod
+    async def generate(self, prompt: str, size: str) -> bytes:
+        ...
+
+    async def close(self) -> None:
+        return None
+
+
+class OpenAIImageBackend(ImageBackend):
+    """DALL-E via the shared OpenAI client; the temporary URL is fetched once."""
+
+    name = "openai"
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.openai_image_timeout, connect=settings.openai_connect_timeout),
+                follow_redirects=True,
+            )
+        return self._http
+
+    async def generate(self, prompt: str, size: str) -> bytes:
+        response = await call_limited(image_limiter, 0, lambda: client.images.generate(
+            prompt=prompt,
+            n=1,
+            size=size,
+            model="dall-e-3",
+            timeout=settings.openai_image_timeout,
+        ))
+        return await self.download(response.data[0].url)
+
+    async def download(self, url: str) -> bytes:
+        chunks = []
+        received = 0
+        try:
+            async with self._client().stream("GET", url) as response:
+                if response.status_code != 200:
+                    raise ImagePipelineError(f"Image download failed with HTTP {response.status_code}")
+                async for chunk in response.aiter_bytes():
+                    received += len(chunk)
+                    if received > self.max_bytes:
+                        raise ImagePipelineError(f"Image larger than {self.max_bytes} bytes")
+                    chunks.append(chunk)
+        except httpx.HTTPError as e:
+            raise ImagePipelineError(f"Image download failed: {e}") from e
+        return b"".join(chunks)
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class FakeImageBackend(ImageBackend):
+    """Renders a placeholder PNG locally, so the pipeline runs without network or API key."""
+
+    name = "fake"
+
+    async def generate(self, prompt: str, size: str) -> bytes:
+        width, height = _parse_size(size)
+        seed = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return await asyncio.to_thread(_placeholder_png, seed, width, height)
+
+
+def create_image_backend(name: str) -> ImageBackend:
+    if name == "openai":
+        return OpenAIImageBackend(max_bytes=settings.image_download_max_bytes)
+    if name == "fake":
+        return FakeImageBackend()
+    raise ValueError(f"Unknown IMAGE_BACKEND '{name}' (expected 'openai' or 'fake')")
+
+
+@dataclass
+class StoredImage:
+    """A stored image; URLs are paths under the pipeline's url_prefix."""
+
+    digest: str
+    original_url: str
+    variants: Dict[str, str]
+
+    @property
+    def url(self) -> str:
+        return self.variants["full"]
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _unlink_quietly(tmp_path)
+        raise
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _render_variant(source_path: str, target_path: str, max_edge: int, quality: int) -> None:
+    """Resize ``source_path`` to fit ``max_edge`` and save it as JPEG (runs in the worker pool)."""
+    with Image.open(source_path) as opened:
+        image = ImageOps.exif_transpose(opened)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_path), suffix=".tmp")
+        os.close(fd)
+        try:
+            image.save(tmp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(tmp_path, target_path)
+        except BaseException:
+            _unlink_quietly(tmp_path)
+            raise
+
+
+class ImagePipeline:
+    """Content-addressed storage for generated images plus resized variants.
+
+    Originals are stored once under ``<root>/<aa>/<sha256>.<ext>``, so the
+    same bytes are never written or resized twice and concurrent stores of
+    one image share a single job. Variants (``VARIANT_SIZES``) are rendered
+    as JPEG in a bounded thread pool next to the original; file names never
+    change content, so they are served with an immutable cache policy.
+    Without Pillow every variant URL points at the original.
+
+    Stored URLs are paths (``<url_prefix>/<aa>/<file>``) so persisted
+    content survives a host change; ``public_url`` adds ``base_url`` when
+    a response is built.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        url_prefix: str,
+        backend: ImageBackend,
+        workers: int = 2,
+        base_url: str = "",
+        jpeg_quality: int = 85,
+    ) -> None:
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.base_url = base_url.rstrip("/")
+        self.backend = backend
+        self.jpeg_quality = jpeg_quality
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="image-variants")
+        self._flight = SingleFlight()
+        self.stored = 0
+        self.deduplicated = 0
+        self.variants_rendered = 0
+        self.failures = 0
+        os.makedirs(root, exist_ok=True)
+        if Image is None:
+            logger.warning("Pillow is not installed; image variants fall back to the original image")
+
+    def _url(self, relative_path: str) -> str:
+        return f"{self.url_prefix}/{relative_path}"
+
+    def public_url(self, url: Optional[str]) -> Optional[str]:
+        """Absolute URL for a stored image path; other URLs are returned unchanged."""
+        if url and url.startswith(self._url("")):
+            return f"{self.base_url}{url}"
+        return url
+
+    def public_variants(self, variants: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        if not variants:
+            return variants
+        return {name: self.public_url(url) for name, url in variants.items()}
+
+    def stored_url(self, url: Optional[str]) -> Optional[str]:
+        """Path form of a public URL this pipeline served; other URLs are returned unchanged."""
+        if url and self.base_url and url.startswith(f"{self.base_url}{self._url('')}"):
+            return url[len(self.base_url):]
+        return url
+
+    def stored_variants(self, variants: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        if not variants:
+            return variants
+        return {name: self.stored_url(url) for name, url in variants.items()}
+
+    async def generate(self, prompt: str, size: str = "1024x1024") -> StoredImage:
+        """Generate an image with the configured backend and store it."""
+        data = await self.backend.generate(prompt, size)
+        return await self.store(data)
+
+    async def store(self, data: bytes) -> StoredImage:
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            return await self._flight.do(digest, lambda: self._store(digest, data))
+        except Exception:
+            self.failures += 1
+            raise
+
+    async def _store(self, digest: str, data: bytes) -> StoredImage:
+        extension = _sniff_extension(data)
+        directory = os.path.join(self.root, digest[:2])
+        original = os.path.join(directory, f"{digest}.{extension}")
+        if os.path.exists(original):
+            self.deduplicated += 1
+        else:
+            os.makedirs(directory, exist_ok=True)
+            await asyncio.to_thread(_write_atomic, original, data)
+            self.stored += 1
+
+        original_url = self._url(f"{digest[:2]}/{digest}.{extension}")
+        if Image is None:
+            return StoredImage(digest, original_url, {name: original_url for name in VARIANT_SIZES})
+
+        loop = asyncio.get_running_loop()
+        pending = []
+        variants: Dict[str, str] = {}
+        for name, max_edge in VARIANT_SIZES.items():
+            filename = f"{digest}-{name}.jpg"
+            target = os.path.join(directory, filename)
+            variants[name] = self._url(f"{digest[:2]}/{filename}")
+            if not os.path.exists(target):
+                pending.append(loop.run_in_executor(
+                    self._executor, _render_variant, original, target, max_edge, self.jpeg_quality,
+                ))
+        if pending:
+            await asyncio.gather(*pending)
+            self.variants_rendered += len(pending)
+        return StoredImage(digest, original_url, variants)
+
+    def variants_for_url(self, url: Optional[str]) -> Optional[Dict[str, str]]:
+        """Variant paths for an image URL (path or public URL) this pipeline produced, else None."""
+        url = self.stored_url(url)
+        if not url or not url.startswith(self._url("")):
+            return None
+        filename = url.rsplit("/", 1)[-1]
+        digest = filename.split("-", 1)[0].split(".", 1)[0]
+        if len(digest) != 64:
+            return None
+        if Image is None:
+            return {name: url for name in VARIANT_SIZES}
+        return {name: self._url(f"{digest[:2]}/{digest}-{name}.jpg") for name in VARIANT_SIZES}
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": self.backend.name,
+            "variants_enabled": Image is not None,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "variants_rendered": self.variants_rendered,
+            "failures": self.failures,
+            **self._flight.stats(),
+        }
+
+    async def close(self) -> None:
+        await self.backend.close()
+        self._executor.shutdown(wait=True)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed files: cache for a year, never revalidate."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+image_pipeline = ImagePipeline(
+    root=settings.image_storage_dir,
+    url_prefix=settings.image_url_prefix,
+    backend=create_image_backend(settings.image_backend),
+    workers=settings.image_variant_workers,
+    base_url=settings.image_public_base_url,
+    jpeg_quality=settings.image_jpeg_quality,
+)
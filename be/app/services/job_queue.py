@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.services.ids import new_job_id
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Too many jobs are waiting; the caller should retry later."""
+
+
+@dataclass
+class Job:
+    id: str
+    key: str
+    run: Callable[[], Awaitable[Any]] = field(repr=False)
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    # Caller context reported alongside the status (e.g. the image prompt)
+    meta: Dict[str, Any] = field(default_factory=dict)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+
+class JobQueue:
+    """Deduplicating background job queue drained by a fixed worker pool.
+
+    ``submit`` returns immediately. A job whose key matches one that is
+    queued or running is not enqueued again; the caller gets the existing
+    job. Succeeded jobs are also reused for ``reuse_seconds`` (0 disables
+    this so repeated requests produce fresh results). At most
+    ``concurrency`` jobs run at once, and at most ``max_pending`` wait.
+    Finished jobs stay queryable for ``retention_seconds``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        max_pending: int,
+        retention_seconds: float,
+        reuse_seconds: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max(1, max_pending)
+        self.retention_seconds = retention_seconds
+        self.reuse_seconds = reuse_seconds
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_key: Dict[str, Job] = {}
+        self._queue: Optional["asyncio.Queue[Job]"] = None
+        self._workers: List["asyncio.Task[None]"] = []
+        self.submitted = 0
+        self.deduplicated = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        # Jobs still queued will never run; finish them so waiters wake up
+        while self._queue is not None and not self._queue.empty():
+            self._cancel(self._queue.get_nowait())
+
+    @staticmethod
+    def _cancel(job: Job) -> None:
+        job.status = FAILED
+        job.error = "Cancelled"
+        job.finished_at = time.time()
+        job.done.set()
+
+    def _reusable(self, job: Job, now: float) -> bool:
+        if not job.finished:
+            return True
+        return job.status == SUCCEEDED and now - job.finished_at < self.reuse_seconds
+
+    def submit(
+        self,
+        key: str,
+        run: Callable[[], Awaitable[Any]],
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Job, bool]:
+        """Enqueue ``run`` under ``key``; returns (job, deduplicated)."""
+        if self._queue is None:
+            raise RuntimeError(f"Job queue '{self.name}' is not started")
+        now = time.time()
+        self._prune(now)
+        existing = self._by_key.get(key)
+        if existing is not None and self._reusable(existing, now):
+            self.deduplicated += 1
+            return existing, True
+        if self._queue.qsize() >= self.max_pending:
+            self.rejected += 1
+            raise QueueFullError(f"{self._queue.qsize()} {self.name} jobs already waiting")
+        job = Job(id=new_job_id(), key=key, run=run, meta=meta or {})
+        self._jobs[job.id] = job
+        self._by_key[key] = job
+        self._queue.put_nowait(job)
+        self.submitted += 1
+        return job, False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune(time.time())
+        return self._jobs.get(job_id)
+
+    def _prune(self, now: float) -> None:
+        # Jobs are ordered by creation. Unfinished ones are skipped, not a
+        # reason to stop; the scan ends at jobs too young to have expired
+        expired = []
+        for job in self._jobs.values():
+            if now - job.created_at < self.retention_seconds:
+                break
+            if job.finished and now - job.finished_at >= self.retention_seconds:
+                expired.append(job)
+        for job in expired:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                job.result = await job.run()
+                job.status = SUCCEEDED
+                self.succeeded += 1
+            except asyncio.CancelledError:
+                self._cancel(job)
+                raise
+            except Exception as e:
+                logger.error(f"{self.name} job {job.id} failed: {e}")
+                job.status = FAILED
+                job.error = str(e) or type(e).__name__
+                self.failed += 1
+            job.finished_at = time.time()
+            job.done.set()
+            self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        running = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+        return {
+            "concurrency": self.concurrency,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": running,
+            "retained": len(self._jobs),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Characters that can change the parser state; everything else is skipped
+_STRUCTURAL = re.compile(r'["\\{}\[\]]')
+
+
+class ArrayStreamParser:
+    """Incrementally extract objects from a top-level JSON array as text streams in.
+
+    Feed it model output chunk by chunk; every object inside the array stored
+    under ``key`` of the top-level object (or inside a bare top-level array)
+    is returned from ``feed`` as soon as its closing brace arrives. Text
+    outside the top-level value (markdown fences, stray prose) is ignored.
+
+    Each chunk is scanned once; only the text of an unfinished object (or
+    top-level key) is kept between chunks.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Pieces of the top-level string being read, then the last one read
+        self._key: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        # Pieces of the array element being read
+        self._object: Optional[List[str]] = None
+        self._emitted = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        objects: List[Dict[str, Any]] = []
+        if self.done or not chunk:
+            return objects
+        # Unfinished pieces continue from the start of this chunk
+        object_start = key_start = pos = 0
+        if self._escape:
+            self._escape = False
+            pos = 1
+
+        while (match := _STRUCTURAL.search(chunk, pos)) is not None:
+            i = match.start()
+            ch = chunk[i]
+            pos = i + 1
+            if self._in_string:
+                if ch == "\\":
+                    # Skip the escaped character, possibly in the next chunk
+                    if pos < len(chunk):
+                        pos += 1
+                    else:
+                        self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key is not None:
+                        self._key.append(chunk[key_start:i])
+                        self._last_key = "".join(self._key)
+                        self._key = None
+                continue
+
+            if ch == '"':
+                if self._depth > 0:
+                    self._in_string = True
+                    if self._depth == 1 and self._array_depth is None:
+                        self._key = []
+                        key_start = pos
+            elif ch in "{[":
+                if ch == "[" and self._array_depth is None and (
+                    self._depth == 0 or (self._depth == 1 and self._last_key == self.key)
+                ):
+                    self._array_depth = self._depth + 1
+                elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._object = []
+                    object_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    continue
+                self._depth -= 1
+                if self._array_depth is None:
+                    continue
+                if ch == "}" and self._depth == self._array_depth and self._object is not None:
+                    self._object.append(chunk[object_start:pos])
+                    raw = "".join(self._object)
+                    self._object = None
+                    try:
+                        parsed = json.loads(raw)
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping unparsable streamed object: {e}")
+                        continue
+                    if isinstance(parsed, dict):
+                        objects.append(parsed)
+                        self._emitted += 1
+                elif ch == "]" and self._depth == self._array_depth - 1:
+                    if self._depth == 0 and not self._emitted:
+                        # Brackets in prose before the answer, e.g. "[1]"
+                        self._array_depth = None
+                        continue
+                    self.done = True
+                    break
+
+        if not self.done:
+            if self._object is not None:
+                self._object.append(chunk[object_start:])
+            if self._key is not None:
+                self._key.append(chunk[key_start:])
+        return objects
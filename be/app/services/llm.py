@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from openai import NotFoundError, RateLimitError
+
+from app.core.config import settings
+from app.services.metrics import counters
+from app.services.model_router import ModelRouter
+from app.services.openai_client import client
+from app.services.rate_limiter import RateLimitTimeout, call_limited, chat_limiter
+from app.services.tokens import estimate_request_tokens
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Account-wide throttling: trying another model would not help
+RATE_LIMITED = (RateLimitError, RateLimitTimeout)
+
+model_router = ModelRouter(
+    [settings.openai_model, *settings.openai_fallback_models],
+    failure_threshold=settings.circuit_failure_threshold,
+    cooldown_seconds=settings.circuit_cooldown_seconds,
+    not_found_cooldown_seconds=settings.circuit_not_found_cooldown_seconds,
+)
+
+
+class LLMOutputError(ValueError):
+    """The model answered but its output could not be used."""
+
+
+class AllModelsFailedError(RuntimeError):
+    """Every candidate model failed; ``last_error`` holds the final cause."""
+
+    def __init__(self, last_error: Exception | None) -> None:
+        super().__init__(f"All models failed. Last error: {last_error}")
+        self.last_error = last_error
+
+
+async def _attempt(
+    model: str,
+    messages: List[Dict[str, str]],
+    parse: Callable[[str, str], T],
+    operation: str,
+    params: Dict[str, Any],
+    prompt_tokens: Optional[int] = None,
+) -> T:
+    """Run one completion on ``model`` and record the outcome with the router.
+
+    The caller must have reserved the attempt with ``model_router.acquire``.
+    """
+    started = time.perf_counter()
+    max_tokens = params.get("max_tokens") or 0
+    if prompt_tokens is None:
+        reserved = estimate_request_tokens(messages, max_tokens)
+    else:
+        reserved = prompt_tokens + max_tokens
+    try:
+        logger.info(f"Attempting {operation} with model: {model}")
+        response = await call_limited(
+            chat_limiter,
+            reserved,
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=settings.openai_chat_timeout,
+                **params,
+            ),
+            usage=lambda r: r.usage.total_tokens if r.usage else None,
+            prompt_tokens=reserved - max_tokens,
+        )
+        if response.usage:
+            details = getattr(response.usage, "prompt_tokens_details", None)
+            record_usage(
+                operation,
+                model,
+                prompt_tokens=response.usage.prompt_tokens,
+                completion_tokens=response.usage.completion_tokens,
+                max_tokens=max_tokens,
+                cached_tokens=getattr(details, "cached_tokens", None) or 0,
+            )
+        content = (response.choices[0].message.content or "").strip()
+        logger.info(f"Received {operation} response from model {model}, content length: {len(content)}")
+        result = parse(content, model)
+    except NotFoundError as e:
+        logger.warning(f"Model {model} not found: {e}")
+        model_router.record_failure(model, permanent=True)
+        raise
+    except RATE_LIMITED:
+        model_router.release(model)
+        raise
+    except LLMOutputError as e:
+        # The model is up; a bad answer must not open its circuit
+        logger.warning(f"Unusable output from model {model}: {e}")
+        model_router.record_output_error(model)
+        raise
+    except Exception as e:
+        logger.error(f"Error with model {model}: {e}")
+        model_router.record_failure(model)
+        raise
+    except BaseException:
+        # Cancelled (client went away or lost a hedge race): no verdict on the model
+        model_router.release(model)
+        raise
+    model_router.record_success(model, time.perf_counter() - started)
+    return result
+
+
+def _acquired(models: List[str]) -> Iterator[str]:
+    for model in models:
+        if model_router.acquire(model):
+            yield model
+
+
+def _hedge_delay(model: str) -> float:
+    delay = model_router.latency_percentile(
+        model, settings.llm_hedge_percentile, min_samples=settings.llm_hedge_min_samples
+    )
+    if delay is None:
+        delay = settings.llm_hedge_default_delay
+    return min(max(delay, settings.llm_hedge_min_delay), settings.llm_hedge_max_delay)
+
+
+async def complete_with_fallback(
+    messages: List[Dict[str, str]],
+    parse: Callable[[str, str], T],
+    *,
+    operation: str,
+    hedge: bool = False,
+    prompt_tokens: Optional[int] = None,
+    **params: Any,
+) -> T:
+    """Run a chat completion on the healthiest model, falling back on failure.
+
+    ``parse(content, model)`` turns the raw completion text into the result
+    and raises (e.g. ``LLMOutputError``) to move on to the next model.
+    Rate limiting (``RateLimitError`` after retries, or ``RateLimitTimeout``
+    from the client-side limiter) is account-wide, so it propagates.
+    With ``hedge`` (and LLM_HEDGING_ENABLED) a slow primary is raced against
+    the next candidate; see ``_complete_hedged``. ``prompt_tokens`` (e.g.
+    from a rendered ``Prompt``) replaces the length-based estimate when
+    reserving rate-limit capacity.
+    """
+    models = _acquired(model_router.candidates())
+    if hedge and settings.llm_hedging_enabled:
+        return await _complete_hedged(models, messages, parse, operation, params, prompt_tokens)
+
+    last_error: Exception | None = None
+    for model in models:
+        try:
+            return await _attempt(model, messages, parse, operation, params, prompt_tokens)
+        except RATE_LIMITED:
+            raise
+        except Exception as e:
+            last_error = e
+    raise AllModelsFailedError(last_error)
+
+
+async def _complete_hedged(
+    models: Iterator[str],
+    messages: List[Dict[str, str]],
+    parse: Callable[[str, str], T],
+    operation: str,
+    params: Dict[str, Any],
+    prompt_tokens: Optional[int] = None,
+) -> T:
+    """Start a backup model if the primary outlives its latency percentile.
+
+    At most one hedge is fired per request. Whichever attempt returns a parsed
+    result first wins and the other is cancelled; a failed attempt falls back
+    to the next candidate as in the sequential path.
+    """
+    pending: Dict["asyncio.Task[T]", str] = {}
+    launched: Dict["asyncio.Task[T]", float] = {}
+    last_error: Exception | None = None
+    hedged = False
+    won = False
+    backup_task: Optional["asyncio.Task[T]"] = None
+    counters.incr("llm.hedge.requests")
+
+    def _launch() -> Optional["asyncio.Task[T]"]:
+        model = next(models, None)
+        if model is None:
+            return None
+        task = asyncio.ensure_future(_attempt(model, messages, parse, operation, params, prompt_tokens))
+        pending[task] = model
+        launched[task] = time.perf_counter()
+        return task
+
+    try:
+        _launch()
+        while pending:
+            timeout = None
+            if not hedged:
+                timeout = _hedge_delay(next(iter(pending.values())))
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                hedged = True
+                backup_task = _launch()
+                if backup_task is not None:
+                    logger.info(f"Hedging {operation}: primary exceeded {timeout:.1f}s, starting {pending[backup_task]}")
+                    counters.incr("llm.hedge.fired")
+                continue
+
+            for task in done:
+                pending.pop(task)
+                error = task.exception()
+                if error is None:
+                    if backup_task is not None:
+                        counters.incr("llm.hedge.backup_wins" if task is backup_task else "llm.hedge.primary_wins")
+                    won = True
+                    return task.result()
+                if isinstance(error, RATE_LIMITED):
+                    raise error
+                last_error = error
+
+            if not pending:
+                _launch()
+    finally:
+        now = time.perf_counter()
+        for task, model in pending.items():
+            if task.done():
+                task.exception()
+            else:
+                task.cancel()
+                if won:
+                    # The loser would have taken at least this long
+                    model_router.record_abandoned(model, now - launched[task])
+
+    raise AllModelsFailedError(last_error)
+
+
+def hedge_stats() -> Dict[str, Any]:
+    requests = counters.get("llm.hedge.requests")
+    fired = counters.get("llm.hedge.fired")
+    backup_wins = counters.get("llm.hedge.backup_wins")
+    return {
+        "requests": requests,
+        "hedges_fired": fired,
+        "hedge_rate": round(fired / requests, 4) if requests else 0.0,
+        "backup_wins": backup_wins,
+        "primary_wins": counters.get("llm.hedge.primary_wins"),
+        "backup_win_rate": round(backup_wins / fired, 4) if fired else 0.0,
+    }
+
+
+def record_usage(
+    operation: str,
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    max_tokens: int = 0,
+    cached_tokens: int = 0,
+    estimated: bool = False,
+) -> None:
+    """Log and count the tokens one completion used.
+
+    ``cached_tokens`` is the part of the prompt served from the provider's
+    prompt cache, where reported. ``estimated`` marks counts computed
+    locally because the API reported none (streamed completions).
+    """
+    logger.info(
+        f"{operation} on {model}: {prompt_tokens} prompt tokens ({cached_tokens} cached), "
+        f"{completion_tokens} completion tokens of {max_tokens or 'unlimited'} allowed"
+        f"{' (estimated)' if estimated else ''}"
+    )
+    prefix = f"llm.usage.{operation}"
+    counters.incr(f"{prefix}.requests")
+    counters.incr(f"{prefix}.prompt_tokens", prompt_tokens)
+    counters.incr(f"{prefix}.cached_prompt_tokens", cached_tokens)
+    counters.incr(f"{prefix}.completion_tokens", completion_tokens)
+    if estimated:
+        counters.incr(f"{prefix}.estimated_requests")
+    if max_tokens:
+        counters.incr(f"{prefix}.max_tokens", max_tokens)
+        counters.incr(f"{prefix}.capped_requests")
+
+
+def usage_stats() -> Dict[str, Dict[str, Any]]:
+    """Token usage per operation, with averages and how much of max_tokens was used."""
+    totals: Dict[str, Dict[str, float]] = {}
+    for name, value in counters.snapshot().items():
+        if name.startswith("llm.usage."):
+            operation, field = name[len("llm.usage."):].rsplit(".", 1)
+            totals.setdefault(operation, {})[field] = value
+    stats: Dict[str, Dict[str, Any]] = {}
+    for operation, entry in totals.items():
+        requests = entry.get("requests", 0)
+        capped = entry.get("capped_requests", 0)
+        max_tokens = entry.get("max_tokens", 0)
+        stats[operation] = {
+            "requests": int(requests),
+            "prompt_tokens": int(entry.get("prompt_tokens", 0)),
+            "cached_prompt_tokens": int(entry.get("cached_prompt_tokens", 0)),
+            "completion_tokens": int(entry.get("completion_tokens", 0)),
+            "avg_prompt_tokens": round(entry.get("prompt_tokens", 0) / requests, 1) if requests else 0.0,
+            "avg_completion_tokens": round(entry.get("completion_tokens", 0) / requests, 1) if requests else 0.0,
+            "avg_max_tokens": round(max_tokens / capped, 1) if capped else None,
+            "estimated_requests": int(entry.get("estimated_requests", 0)),
+        }
+    return stats
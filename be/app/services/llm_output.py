@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.json_stream import ArrayStreamParser
+from app.services.llm import LLMOutputError
+from app.services.metrics import counters
+
+logger = logging.getLogger(__name__)
+
+CLEAN = "clean"
+REPAIRED = "repaired"
+SALVAGED = "salvaged"
+FAILED = "failed"
+OUTCOMES = (CLEAN, REPAIRED, SALVAGED, FAILED)
+
+_FENCE_RE = re.compile(r"```[A-Za-z0-9_-]*\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+# Python-style literals models sometimes emit
+_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_VALUE_END = ",:}]"
+_VALID_ESCAPES = set('"\\/bfnrtu')
+# A quote followed by what looks like the next key closes the string (comma missing)
+_NEXT_KEY_RE = re.compile(r'\s*"[^"\\]*"\s*:')
+# ...as does one followed by a key cut off by the end of the output
+_PARTIAL_KEY_RE = re.compile(r'\s*("[^"\\]*)?\Z')
+_VALUE_START = set('"{[-0123456789')
+_LITERAL_WORDS = ("true", "false", "null", *_LITERALS)
+
+
+def _extract(text: str) -> str:
+    """The JSON part of a reply: inside a markdown fence if any, from the first bracket on."""
+    fenced = _FENCE_RE.search(text)
+    if fenced and any(ch in fenced.group(1) for ch in "{["):
+        text = fenced.group(1)
+    starts = [pos for pos in (text.find("{"), text.find("[")) if pos >= 0]
+    return text[min(starts):].strip() if starts else text.strip()
+
+
+def _next_significant(text: str, i: int) -> str:
+    n = len(text)
+    while i < n and text[i].isspace():
+        i += 1
+    return text[i] if i < n else ""
+
+
+def _closes_string(text: str, i: int, in_object: bool) -> bool:
+    """Whether the quote at ``text[i]`` ends the string rather than sitting inside it.
+
+    A closing quote is followed by ``:``, ``}``, ``]``, the end of the text,
+    the next key, or a comma and then something that can follow a comma
+    here: a key inside an object, a value inside an array. So the inner
+    quote in ``"b is "great", really"`` stays in the string.
+    """
+    j = i + 1
+    follower = _next_significant(text, j)
+    if not follower or follower in ":}]":
+        return True
+    if follower == '"':
+        return _NEXT_KEY_RE.match(text, j) is not None
+    if follower != ",":
+        return False
+    j = text.index(",", j) + 1
+    after = _next_significant(text, j)
+    if not after or after in "}]":
+        return True
+    if in_object:
+        return _NEXT_KEY_RE.match(text, j) is not None or _PARTIAL_KEY_RE.match(text, j) is not None
+    rest = text[j:].lstrip()
+    return after in _VALUE_START or rest.startswith(_LITERAL_WORDS)
+
+
+def repair_json(text: str) -> Tuple[str, List[str], bool]:
+    """Rewrite almost-JSON into JSON.
+
+    Returns ``(json_text, repairs, truncated)``. Fixes trailing and missing
+    commas, unescaped quotes and raw newlines inside strings, Python
+    literals, and prose after the top-level value. Output cut off mid-way
+    (e.g. by ``max_tokens``) is rolled back to the last complete array
+    element or object member and the open brackets are closed, so every
+    complete object survives and the partial one is dropped.
+
+    A quote counts as closing only where valid JSON could continue after it
+    (see ``_closes_string``). Prose that itself looks like JSON, such as
+    ``"a "b", "c": d"``, is still split at the inner quote.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    expect_key: List[bool] = []
+    repairs: List[str] = []
+    # Per nesting depth: (output length, open brackets) after the last
+    # complete child of the innermost open container at that depth
+    checkpoints: Dict[int, Tuple[int, List[str]]] = {}
+    pending_comma = False
+    need_comma = False
+    in_string = False
+    string_is_key = False
+    n = len(text)
+    i = 0
+
+    def note(repair: str) -> None:
+        if repair not in repairs:
+            repairs.append(repair)
+
+    def value_done() -> None:
+        nonlocal need_comma
+        need_comma = bool(stack)
+        if stack:
+            checkpoints[len(stack)] = (len(out), list(stack))
+
+    def before_value() -> None:
+        nonlocal pending_comma, need_comma
+        if pending_comma:
+            out.append(",")
+        elif need_comma:
+            out.append(",")
+            note("missing comma")
+        pending_comma = need_comma = False
+
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if ch == "\\" and i + 1 < n:
+                if text[i + 1] in _VALID_ESCAPES:
+                    out.append(text[i:i + 2])
+                else:
+                    # e.g. \' : keep the character, drop the bad escape
+                    out.append(text[i + 1])
+                    note("invalid escape")
+                i += 2
+                continue
+            if ch == '"':
+                if not _closes_string(text, i, bool(stack) and stack[-1] == "{"):
+                    out.append('\\"')
+                    note("unescaped quote")
+                else:
+                    out.append('"')
+                    in_string = False
+                    if string_is_key:
+                        need_comma = False
+                    else:
+                        value_done()
+            elif ch in _CONTROL_ESCAPES:
+                out.append(_CONTROL_ESCAPES[ch])
+                note("control character in string")
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch.isspace():
+            i += 1
+            continue
+        if not stack and out:
+            # A complete top-level scalar; anything after it is prose
+            break
+        if ch == '"':
+            string_is_key = bool(stack) and stack[-1] == "{" and expect_key[-1]
+            before_value()
+            out.append('"')
+            in_string = True
+        elif ch in "{[":
+            before_value()
+            out.append(ch)
+            stack.append(ch)
+            expect_key.append(ch == "{")
+            # An empty container is a valid rollback point for its children
+            for depth in [d for d in checkpoints if d >= len(stack)]:
+                del checkpoints[depth]
+            checkpoints[len(stack)] = (len(out), list(stack))
+        elif ch in "}]":
+            if not stack:
+                break
+            if pending_comma:
+                note("trailing comma")
+                pending_comma = False
+            out.append("}" if stack[-1] == "{" else "]")
+            stack.pop()
+            expect_key.pop()
+            value_done()
+            if not stack:
+                # Top-level value complete: drop trailing prose
+                if text[i + 1:].strip():
+                    note("text after JSON")
+                i = n
+                break
+        elif ch == ",":
+            if stack:
+                if pending_comma:
+                    note("duplicate comma")
+                pending_comma = True
+                need_comma = False
+                if stack[-1] == "{":
+                    expect_key[-1] = True
+        elif ch == ":":
+            out.append(":")
+            need_comma = False
+            if expect_key:
+                expect_key[-1] = False
+        else:
+            end = i
+            while end < n and not text[end].isspace() and text[end] not in _VALUE_END + '"{[':
+                end += 1
+            token = text[i:end]
+            if end >= n:
+                # A number or literal cut off at the end may be incomplete
+                break
+            before_value()
+            if token in _LITERALS:
+                token = _LITERALS[token]
+                note("python literal")
+            out.append(token)
+            value_done()
+            i = end
+            continue
+        i += 1
+
+    truncated = in_string or bool(stack)
+    if truncated:
+        if not stack:
+            raise LLMOutputError("output was cut off before any complete value")
+        # Roll back to the last whole element of the outermost open array,
+        # dropping the partial object; without arrays, to the last member
+        depth = stack.index("[") + 1 if "[" in stack else len(stack)
+        length, stack = checkpoints[depth]
+        del out[length:]
+        out.extend("}" if bracket == "{" else "]" for bracket in reversed(stack))
+        note("truncated output")
+    return "".join(out), repairs, truncated
+
+
+def _record(kind: str, outcome: str) -> None:
+    counters.incr(f"llm.output.{kind}.{outcome}")
+
+
+def parse_llm_json(text: str, *, kind: str, list_key: Optional[str] = None) -> Any:
+    """Parse model output as JSON, repairing or salvaging it before giving up.
+
+    Tries, in order: the text as-is; the fenced/bracketed JSON part; that
+    part after ``repair_json``; and, when ``list_key`` is given, every
+    complete object that can be pulled out of the ``list_key`` array (as
+    ``{list_key: [...]}``). Raises ``LLMOutputError`` only when nothing is
+    usable, which is the caller's cue to ask another model. Outcomes are
+    counted per ``kind`` (see ``output_stats``).
+    """
+    try:
+        data = json.loads(text)
+        _record(kind, CLEAN)
+        return data
+    except json.JSONDecodeError:
+        pass
+
+    candidate = _extract(text)
+    try:
+        data = json.loads(candidate)
+        _record(kind, REPAIRED)
+        logger.info(f"Parsed {kind} output after stripping fences/prose")
+        return data
+    except json.JSONDecodeError as e:
+        error: Exception = e
+
+    try:
+        repaired, repairs, truncated = repair_json(candidate)
+        data = json.loads(repaired)
+        _record(kind, SALVAGED if truncated else REPAIRED)
+        logger.info(f"Repaired {kind} output: {', '.join(repairs) or 'no changes'}")
+        return data
+    except (LLMOutputError, json.JSONDecodeError) as e:
+        error = e
+
+    if list_key is not None:
+        parser = ArrayStreamParser(list_key)
+        items = parser.feed(candidate)
+        if items:
+            _record(kind, SALVAGED)
+            logger.info(f"Salvaged {len(items)} complete {list_key} object(s) from malformed {kind} output")
+            return {list_key: items}
+
+    _record(kind, FAILED)
+    raise LLMOutputError(f"unrecoverable {kind} output: {error}") from error
+
+
+def output_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-kind outcome counts with repair and salvage rates."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for name, value in counters.snapshot().items():
+        if not name.startswith("llm.output."):
+            continue
+        kind, outcome = name[len("llm.output."):].rsplit(".", 1)
+        stats.setdefault(kind, {o: 0 for o in OUTCOMES})[outcome] = int(value)
+    for entry in stats.values():
+        total = sum(entry[o] for o in OUTCOMES)
+        entry["repair_rate"] = round(entry[REPAIRED] / total, 4) if total else 0.0
+        entry["salvage_rate"] = round(entry[SALVAGED] / total, 4) if total else 0.0
+    return stats
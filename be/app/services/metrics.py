@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Counters:
+    """Thread-safe named counters reported on ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._values: Dict[str, float] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[name] += amount
+
+    def get(self, name: str) -> float:
+        return self._values.get(name, 0)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(sorted(self._values.items()))
+
+
+counters = Counters()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Weight of the newest observation in the moving averages
+EWMA_ALPHA = 0.2
+# Closed models whose success average falls below this are tried last
+DEGRADED_SUCCESS_RATE = 0.5
+# Closed models slower on average than this multiple of the fastest one
+# are tried after the others, ahead of degraded ones
+SLOW_LATENCY_FACTOR = 2.0
+# Recent latencies kept per model for percentile estimates
+LATENCY_WINDOW = 200
+
+
+@dataclass
+class ModelHealth:
+    name: str
+    priority: int
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    cooldown: float = 0.0
+    probe_in_flight: bool = False
+    success_rate: float = 1.0
+    latency: Optional[float] = None
+    successes: int = 0
+    failures: int = 0
+    # Answered, but the output was unusable: a quality problem, not an outage
+    output_errors: int = 0
+    # Successes, plus the running time of attempts abandoned for a faster
+    # hedge (lower bounds), so the tail is not estimated from winners only
+    recent_latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "priority": self.priority,
+            "success_rate": round(self.success_rate, 4),
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "successes": self.successes,
+            "failures": self.failures,
+            "output_errors": self.output_errors,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class ModelRouter:
+    """Order candidate models by health and keep failing ones out of the way.
+
+    Each model has a circuit breaker: after ``failure_threshold`` consecutive
+    failures (or a single "model not found") it opens and the model is skipped
+    until its cooldown elapses. It then goes half-open and exactly one request
+    is allowed through as a probe; success closes it, failure re-opens it.
+
+    Available models are ordered closed before half-open, then healthy
+    before degraded (low success average), then normal before slow
+    (average latency over ``SLOW_LATENCY_FACTOR`` times the fastest closed
+    model's), and finally by configured priority.
+    """
+
+    def __init__(
+        self,
+        models: List[str],
+        failure_threshold: int,
+        cooldown_seconds: float,
+        not_found_cooldown_seconds: float,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.not_found_cooldown_seconds = not_found_cooldown_seconds
+        self._models: Dict[str, ModelHealth] = {}
+        for model in models:
+            if model and model not in self._models:
+                self._models[model] = ModelHealth(name=model, priority=len(self._models))
+
+    def candidates(self) -> List[str]:
+        """Return models to try for one request, healthiest first."""
+        now = time.monotonic()
+        available: List[ModelHealth] = []
+        for health in self._models.values():
+            if health.state == OPEN and now - health.opened_at >= health.cooldown:
+                health.state = HALF_OPEN
+                logger.info(f"Circuit for model {health.name} is half-open")
+            if health.state == CLOSED or (health.state == HALF_OPEN and not health.probe_in_flight):
+                available.append(health)
+        if not available:
+            # Every circuit is open: still try something rather than fail outright
+            return [h.name for h in sorted(self._models.values(), key=lambda h: h.priority)]
+        latencies = [h.latency for h in available if h.state == CLOSED and h.latency is not None]
+        slow_after = SLOW_LATENCY_FACTOR * min(latencies) if latencies else None
+        available.sort(key=lambda h: (
+            h.state != CLOSED,
+            h.success_rate < DEGRADED_SUCCESS_RATE,
+            slow_after is not None and h.latency is not None and h.latency > slow_after,
+            h.priority,
+        ))
+        return [h.name for h in available]
+
+    def acquire(self, model: str) -> bool:
+        """Reserve an attempt on ``model``; False if its half-open probe is taken."""
+        health = self._models.get(model)
+        if health is None or health.state != HALF_OPEN:
+            return True
+        if health.probe_in_flight:
+            return False
+        health.probe_in_flight = True
+        return True
+
+    def release(self, model: str) -> None:
+        """Give back a reserved attempt that ended without a verdict."""
+        health = self._models.get(model)
+        if health is not None:
+            health.probe_in_flight = False
+
+    def record_success(self, model: str, latency: float) -> None:
+        health = self._models.get(model)
+        if health is None:
+            return
+        health.successes += 1
+        health.consecutive_failures = 0
+        health.probe_in_flight = False
+        health.success_rate += EWMA_ALPHA * (1.0 - health.success_rate)
+        health.latency = latency if health.latency is None else health.latency + EWMA_ALPHA * (latency - health.latency)
+        health.recent_latencies.append(latency)
+        if health.state != CLOSED:
+            logger.info(f"Circuit for model {model} closed")
+            health.state = CLOSED
+
+    def record_output_error(self, model: str) -> None:
+        """Count an answer that could not be parsed; leaves the breaker alone."""
+        health = self._models.get(model)
+        if health is None:
+            return
+        health.output_errors += 1
+        health.probe_in_flight = False
+
+    def record_abandoned(self, model: str, elapsed: float) -> None:
+        """Count an attempt cancelled after ``elapsed`` seconds because another model answered first."""
+        health = self._models.get(model)
+        if health is not None:
+            health.recent_latencies.append(elapsed)
+
+    def record_failure(self, model: str, permanent: bool = False) -> None:
+        """Count a failed attempt; ``permanent`` (e.g. model not found) opens immediately."""
+        health = self._models.get(model)
+        if health is None:
+            return
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.probe_in_flight = False
+        health.success_rate -= EWMA_ALPHA * health.success_rate
+        if permanent or health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+            health.state = OPEN
+            health.opened_at = time.monotonic()
+            health.cooldown = self.not_found_cooldown_seconds if permanent else self.cooldown_seconds
+            logger.warning(f"Circuit for model {model} opened for {health.cooldown:.0f}s")
+
+    def latency_percentile(self, model: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Nearest-rank percentile of recent latencies, if enough samples.
+
+        Abandoned attempts count with the time they ran, which
+        underestimates them but keeps slow runs that lost a hedge race in.
+        """
+        health = self._models.get(model)
+        if health is None or len(health.recent_latencies) < max(1, min_samples):
+            return None
+        ordered = sorted(health.recent_latencies)
+        rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: health.snapshot() for name, health in self._models.items()}
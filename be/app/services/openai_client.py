@@ -0,0 +1,32 @@
+import httpx
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    """Create the pooled HTTP transport shared by every OpenAI call."""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive_connections,
+            keepalive_expiry=settings.openai_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(settings.openai_chat_timeout, connect=settings.openai_connect_timeout),
+    )
+
+
+# Single async client for the whole process so concurrent requests reuse
+# keep-alive connections instead of blocking the event loop. The SDK's own
+# retries are off: call_limited retries under the shared rate limiter, so
+# every attempt is counted and 429s back off together.
+client = AsyncOpenAI(
+    api_key=settings.openai_api_key,
+    http_client=_build_http_client(),
+    max_retries=0,
+)
+
+
+async def close_client() -> None:
+    """Release pooled connections on application shutdown."""
+    await client.close()
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.tokens import MESSAGE_OVERHEAD_TOKENS, count_tokens, tokenizer_name
+
+# Expected words per piece, by content type keyword (first match wins)
+CONTENT_WORD_RANGES: Dict[str, Tuple[str, int, int]] = {
+    "instagram": ("Instagram", 35, 60),
+    "facebook": ("Facebook", 60, 100),
+    "blog": ("Blog", 80, 130),
+}
+DEFAULT_CONTENT_WORDS = CONTENT_WORD_RANGES["blog"]
+CONTENT_SUGGESTIONS = 3
+# JSON keys plus the short fields around "content" (title, tags,
+# highlights, spots, ...) in one suggestion
+SUGGESTION_OVERHEAD_TOKENS = 240
+# Places are 15-25 fixed-shape objects regardless of the query
+PLACES_MAX_TOKENS = 3000
+
+# "a 500-word guide", "in 300 words"
+_REQUESTED_WORDS_RE = re.compile(r"(\d{2,5})[\s-]*words?\b", re.IGNORECASE)
+
+_WORD_COUNTS = ", ".join(f"{label} {low}–{high}" for label, low, high in CONTENT_WORD_RANGES.values())
+
+# Each template is a static system message (identical on every request, so
+# provider prompt caching can reuse it) followed by a user message holding
+# only the request's fields
+CONTENT_SYSTEM = (
+    'You are a senior travel editor (think Time Out / Eater / FT Weekend). '
+    'Write vivid, useful copy grounded ONLY in provided inputs. No fabrication.\n\n'
+    'VOICE & STYLE\n'
+    '- Lead with a concrete hook (what it is + why now).\n'
+    '- Use specific nouns, short sensory details, and service info.\n'
+    '- Prefer verbs over adjectives. No hype, no exclamation marks, no rhetorical questions.\n'
+    '- Active voice. Mix sentence lengths. British English if destination/language implies it.\n\n'
+    'CONTENT RULES (hard)\n'
+    '- Facts must come from inputs. If unknown, use tempered phrasing ("often", "typically", "many vendors")—never invent brand names, dates, or schedules.\n'
+    '- Anchor each suggestion to ONE clear PLACE/event/venue (from title → recommended_spots → neighborhoods → destination).\n'
+    '- Include at least one micro-itinerary action sequence (arrive → do → eat/see → where to stand/sit).\n'
+    '- Include 1–2 practical tips (timing, crowd avoidance, payment, seating, nearest area).\n'
+    '- Include seasonal/temporal cues ONLY if present or safely inferable (e.g., "late summer" → summer).\n'
+    '- Numbers only if present in inputs; otherwise use qualitative ranges (e.g., "£", "moderate").\n'
+    '- Ban clichés & filler: hidden gem, bustling, vibrant, picturesque, must-see, must-try, rich tapestry, iconic, enchanting, unforgettable, culinary journey, delectable, mouthwatering, gem.\n\n'
+    'PRICE RULES:\n'
+    '- For price_range: Use descriptive terms like "Free", "Budget-friendly", "Moderate", "Premium", "Luxury" or specific ranges like "£5-15", "€20-50"\n'
+    '- NEVER use just "$", "$$", "$$$" symbols\n'
+    '- If price is unknown, set price_range to null\n'
+    '- Be specific about what the price covers (entry fee, meal, activity, etc.)\n\n'
+    'OUTPUT (JSON only; no markdown, no extra keys):\n'
+    '{\n'
+    '  "suggestions": [{\n'
+    '    "title": str,                  // concrete + specific\n'
+    '    "content": str,                // 35–60 words IG, 60–100 FB, 80–130 Blog\n'
+    '    "type": str,                   // content type\n'
+    '    "reading_time": str,           // e.g., "45 sec" or "3 min"\n'
+    '    "quality": "High" | "Medium",\n'
+    '    "tags": [str],\n'
+    '    "highlights": [str],           // 3–5 terse bullets; concrete (things to do/eat/see)\n'
+    '    "neighborhoods": [str],\n'
+    '    "recommended_spots": [str],    // venues/landmarks actually referenced in content\n'
+    '    "price_range": str | null,     // descriptive price info or null if unknown\n'
+    '    "best_times": str | null,      // only if in inputs or safely inferred\n'
+    '    "cautions": str | null         // e.g., crowds, queues, cashless\n'
+    '  }]\n'
+    '}\n\n'
+    'VALIDATION (before output)\n'
+    '- The PLACE referenced in content MUST appear in recommended_spots or neighborhoods.\n'
+    '- Each highlight must be a tangible action/item (not generic praise).\n'
+    '- Remove banned words. If any remain, rewrite once then output.\n'
+    '- Price_range must be descriptive, not just symbols.\n\n'
+    'TASK\n'
+    'Create the requested number of tailored suggestion(s) as if filed by a reporter on the ground. Choose ONE specific PLACE per suggestion (title → recommended_spots → neighborhoods → destination). Use only input-safe facts; otherwise hedge.\n\n'
+    'FOR EACH SUGGESTION\n'
+    '- Hook sentence: what it is + why go now (seasonal cue if provided).\n'
+    '- 1–2 sentences with concrete, sensory specifics taken from inputs (e.g., named dishes, stall types, river views, arches).\n'
+    '- Micro-itinerary: arrive timing (if present/safe), do → eat/see → where to sit/stand (e.g., waterfront tables, shaded arcade).\n'
+    '- One practical tip: crowds/payment/seating/weather/transport (generic if not provided, e.g., "arrive early to secure a table").\n'
+    '- Keep copy tight; avoid brand/vendor names unless they appear in inputs.\n'
+    f'- Word count by type: {_WORD_COUNTS}.\n\n'
+    'STRUCTURE\n'
+    '- Fill all schema fields.\n'
+    '- "quality": set to High if copy includes hook + micro-itinerary + practical tip + concrete nouns; else Medium.\n'
+    '- "best_times": only if in inputs or safely inferred (e.g., "late mornings" → "morning", "Saturdays August–September" → "summer weekends").\n'
+    '- "price_range": $, ££, etc. if present; else null.\n'
+    '- "cautions": crowding/queues/weather if hinted; else null.\n\n'
+    'CHECKS\n'
+    '- No invented facts, dates, or exact times.\n'
+    '- No clichés or banned words.\n'
+    '- British vs US spelling must match Language/Destination context.\n'
+    '- Output ONLY valid JSON per schema.'
+)
+
+CONTENT_USER = (
+    'Destination: {destination}\n'
+    'Dates: {start_date} to {end_date}\n'
+    'Preferred content type: {content_type}\n'
+    'Language: {language}\n'
+    'Tone: {tone}\n'
+    'Suggestions: {count}'
+)
+
+PLACES_SYSTEM = (
+    'You are a travel expert and geographer. Your task is to find ALL relevant places based on user search queries.\n\n'
+    'SEARCH RULES:\n'
+    '- Interpret the user query broadly and find ALL relevant places\n'
+    '- Include cities, regions, landmarks, neighborhoods, and points of interest\n'
+    '- For regions like "Transilvania", include major cities, smaller towns, castles, monasteries, natural attractions, museums, and cultural sites\n'
+    '- For specific queries like "Paris cafes", include relevant neighborhoods, districts, and areas\n'
+    '- Provide comprehensive geographical coverage\n'
+    '- Include both well-known and lesser-known places\n'
+    '- For regions, cover different areas and types of attractions\n'
+    '- IMPORTANT: Only return places that are DIRECTLY related to the search query\n'
+    '- Do NOT return generic or unrelated places\n\n'
+    'PRICE RULES:\n'
+    '- For price_range: Use descriptive terms like "Free", "Budget-friendly", "Moderate", "Premium", "Luxury" or specific ranges like "£5-15", "€20-50"\n'
+    '- NEVER use just "$", "$$", "$$$" symbols\n'
+    '- If price is unknown, set price_range to null\n'
+    '- Be specific about what the price covers (entry fee, meal, activity, etc.)\n\n'
+    'OUTPUT FORMAT (JSON only):\n'
+    '{\n'
+    '  "places": [\n'
+    '    {\n'
+    '      "name": "Place Name",\n'
+    '      "type": "city|region|landmark|neighborhood|town|village|monastery|castle|museum|park|natural_site",\n'
+    '      "country": "Country Name",\n'
+    '      "description": "Detailed description (2-3 sentences) with key features, history, and what makes it special",\n'
+    '      "highlights": ["Highlight 1", "Highlight 2", "Highlight 3", "Highlight 4", "Highlight 5"],\n'
+    '      "categories": ["category1", "category2", "category3"]\n'
+    '    }\n'
+    '  ]\n'
+    '}\n\n'
+    'CATEGORIES: culture, nature, food, history, architecture, entertainment, shopping, outdoor, religious, modern, traditional, adventure, relaxation, education, nightlife\n'
+    'HIGHLIGHTS: 5-7 specific attractions, landmarks, activities, or unique features\n'
+    'DESCRIPTION: Detailed but concise, mentioning key features, historical significance, and unique characteristics\n'
+    'Return 15-25 relevant places based on the search query to provide comprehensive coverage.\n\n'
+    'Find ONLY places that are DIRECTLY related to the search query. Do not return generic or unrelated places. Focus on locations, attractions, and points of interest that are specifically associated with the search term.'
+)
+
+PLACES_USER = "Search query: '{query}'\nLanguage: {language}"
+
+CUSTOM_SYSTEM = (
+    'You are a senior travel editor and content creator. Your task is to generate high-quality travel content based on the user\'s custom prompt.\n\n'
+    'CONTENT RULES:\n'
+    '- Follow the user\'s custom prompt EXACTLY as specified\n'
+    '- Generate content that matches the requested content type and style\n'
+    '- Ensure all content is accurate and relevant to the destination\n'
+    '- Include practical information, tips, and recommendations\n'
+    '- Make the content engaging, informative, and useful for travelers\n'
+    '- If existing content is provided, improve or modify it according to the prompt\n\n'
+    'PRICE RULES:\n'
+    '- For price_range: Use descriptive terms like "Free", "Budget-friendly", "Moderate", "Premium", "Luxury" or specific ranges like "£5-15", "€20-50"\n'
+    '- NEVER use just "$", "$$", "$$$" symbols\n'
+    '- If price is unknown, set price_range to null\n'
+    '- Be specific about what the price covers (entry fee, meal, activity, etc.)\n\n'
+    'OUTPUT FORMAT (JSON only):\n'
+    '{\n'
+    '  "title": "Engaging title based on the prompt",\n'
+    '  "content": "Content generated according to the custom prompt",\n'
+    '  "type": "Content type (Blog Post, Instagram Post, etc.)",\n'
+    '  "reading_time": "Estimated reading time (e.g., 3 min)",\n'
+    '  "quality": "High",\n'
+    '  "tags": ["relevant", "tags", "for", "content"],\n'
+    '  "highlights": ["Key highlight 1", "Key highlight 2", "Key highlight 3"],\n'
+    '  "neighborhoods": ["Relevant neighborhoods or areas"],\n'
+    '  "recommended_spots": ["Specific places, venues, or attractions"],\n'
+    '  "price_range": "Descriptive price info or null",\n'
+    '  "best_times": "Best times to visit if relevant",\n'
+    '  "cautions": "Important notes or warnings if relevant"\n'
+    '}\n\n'
+    'IMPORTANT: The content must directly address and fulfill the user\'s custom prompt requirements. Price_range must be descriptive, not just symbols.\n\n'
+    'The content should be tailored to the destination and content type requested.'
+)
+
+CUSTOM_USER = (
+    'Custom Prompt: {prompt}\n\n'
+    'Destination: {destination}\n'
+    'Content Type: {content_type}\n'
+    'Language: {language}\n'
+    '{existing}'
+)
+
+
+def content_words(content_type: Optional[str]) -> int:
+    """Upper end of the expected word count for ``content_type``."""
+    kind = (content_type or "").lower()
+    for keyword, (_, _, most) in CONTENT_WORD_RANGES.items():
+        if keyword in kind:
+            return most
+    return DEFAULT_CONTENT_WORDS[2]
+
+
+def custom_words(prompt: str, content_type: Optional[str], existing_content: Optional[str]) -> int:
+    """Expected length of a custom piece: the type's range, or more if the prompt
+    asks for a word count or there is existing content to rework."""
+    words = content_words(content_type)
+    for match in _REQUESTED_WORDS_RE.finditer(prompt):
+        words = max(words, int(match.group(1)))
+    if existing_content:
+        words = max(words, len(existing_content.split()))
+    return words
+
+
+def completion_budget(words: int, items: int = 1, language: str = "en", item_overhead: int = SUGGESTION_OVERHEAD_TOKENS) -> int:
+    """``max_tokens`` for ``items`` JSON objects of about ``words`` words each."""
+    per_word = settings.llm_tokens_per_word
+    if not language.lower().startswith("en"):
+        # Most other languages tokenize into noticeably more tokens per word
+        per_word *= 2
+    tokens = math.ceil(items * (words * per_word + item_overhead) * settings.llm_completion_headroom)
+    return max(settings.llm_min_completion_tokens, min(settings.llm_max_completion_tokens, tokens))
+
+
+@dataclass
+class PromptTemplate:
+    name: str
+    system: str
+    # str.format template for the per-request user message
+    user: str
+    prefix_tokens: Optional[int] = field(default=None, init=False)
+
+
+@dataclass(frozen=True)
+class Prompt:
+    messages: List[Dict[str, str]]
+    prompt_tokens: int
+    max_tokens: int
+
+    @property
+    def request_tokens(self) -> int:
+        """Prompt plus completion cap, as reserved against rate limits and budgets."""
+        return self.prompt_tokens + self.max_tokens
+
+
+class PromptRegistry:
+    """Named prompt templates with their static prefixes tokenized once.
+
+    ``load`` (run at startup, or on first use) counts each system prefix
+    with the tokenizer; ``render`` then only has to count the short user
+    message to know the prompt size. Prefixes counted before the tokenizer
+    was loaded are estimates; ``load`` again recounts them.
+    """
+
+    def __init__(self, templates: List[PromptTemplate]) -> None:
+        self._templates = {template.name: template for template in templates}
+        self._counted_with: Optional[str] = None
+        self.rendered = 0
+
+    def load(self) -> None:
+        tokenizer = tokenizer_name()
+        for template in self._templates.values():
+            if template.prefix_tokens is None or tokenizer != self._counted_with:
+                template.prefix_tokens = count_tokens(template.system) + MESSAGE_OVERHEAD_TOKENS
+        self._counted_with = tokenizer
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, max_tokens: int, **fields: Any) -> Prompt:
+        template = self._templates[name]
+        if template.prefix_tokens is None:
+            self.load()
+        user = template.user.format(**fields)
+        self.rendered += 1
+        return Prompt(
+            messages=[
+                {"role": "system", "content": template.system},
+                {"role": "user", "content": user},
+            ],
+            prompt_tokens=template.prefix_tokens + count_tokens(user) + MESSAGE_OVERHEAD_TOKENS,
+            max_tokens=max_tokens,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tokenizer": tokenizer_name(),
+            "rendered": self.rendered,
+            "prefix_tokens": {name: template.prefix_tokens for name, template in self._templates.items()},
+        }
+
+
+prompt_registry = PromptRegistry([
+    PromptTemplate("content", CONTENT_SYSTEM, CONTENT_USER),
+    PromptTemplate("places", PLACES_SYSTEM, PLACES_USER),
+    PromptTemplate("custom", CUSTOM_SYSTEM, CUSTOM_USER),
+])
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.cache import normalize_text
+
+SORT_FIELDS = ("created_at", "views", "shares", "engagement_rate")
+FILTER_FIELDS = ("destination", "status", "type", "tag")
+
+# Below this fraction of the catalog, sorting the filtered ids beats walking
+# the global order and skipping non-matches
+SMALL_RESULT_RATIO = 0.25
+
+
+class InvalidCursorError(ValueError):
+    """The pagination cursor is malformed or belongs to another sort."""
+
+
+@dataclass
+class PublishedPage:
+    items: List[Dict[str, Any]]
+    total: int
+    next_cursor: Optional[str] = None
+
+
+def created_key(value: Optional[str]) -> str:
+    """Normalize ``created_at`` (ISO or legacy MM/DD/YYYY) to a sortable ISO string."""
+    if not value:
+        return ""
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value, "%m/%d/%Y").isoformat()
+    except ValueError:
+        return value
+
+
+def _encode_cursor(sort: str, key: Tuple[Any, ...]) -> str:
+    raw = json.dumps([sort, list(key)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(sort: str, cursor: str) -> Tuple[Any, ...]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, key = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+    if cursor_sort != sort or not isinstance(key, list):
+        raise InvalidCursorError("Cursor does not match the requested sort")
+    counted = sort != "created_at"
+    if len(key) != 2 + counted or not all(isinstance(v, str) for v in key[-2:]) or (
+        counted and (isinstance(key[0], bool) or not isinstance(key[0], (int, float)))
+    ):
+        # Keys are ([counter,] created_at, id); others would not compare with the index
+        raise InvalidCursorError("Malformed cursor")
+    return tuple(key)
+
+
+class PublishIndex:
+    """Secondary indexes over published items, maintained incrementally.
+
+    Keeps an id set per filter value (destination, status, type, tag) and a
+    sorted key list per sort field, so a listing page is served by walking a
+    precomputed order from the cursor instead of scanning the catalog.
+    Sort keys end in (created_at, id), which makes cursors stable.
+    """
+
+    def __init__(self) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        self._filters: Dict[str, Dict[str, Set[str]]] = {f: defaultdict(set) for f in FILTER_FIELDS}
+        self._orders: Dict[str, List[Tuple[Any, ...]]] = {s: [] for s in SORT_FIELDS}
+        self._entries: Dict[str, Tuple[Dict[str, List[str]], Dict[str, Tuple[Any, ...]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _filter_values(item: Dict[str, Any]) -> Dict[str, List[str]]:
+        return {
+            "destination": [normalize_text(item.get("destination") or "")],
+            "status": [normalize_text(item.get("status") or "")],
+            "type": [normalize_text(item.get("type") or "")],
+            "tag": list({normalize_text(tag) for tag in item.get("tags") or []}),
+        }
+
+    @staticmethod
+    def _sort_keys(item: Dict[str, Any]) -> Dict[str, Tuple[Any, ...]]:
+        created = created_key(item.get("created_at") or item.get("date"))
+        item_id = item["id"]
+        return {
+            "created_at": (created, item_id),
+            "views": (item.get("views", 0), created, item_id),
+            "shares": (item.get("shares", 0), created, item_id),
+            "engagement_rate": (item.get("engagement_rate", 0.0), created, item_id),
+        }
+
+    def rebuild(self, items: List[Dict[str, Any]]) -> None:
+        self._reset()
+        for item in items:
+            values, keys = self._filter_values(item), self._sort_keys(item)
+            self._entries[item["id"]] = (values, keys)
+            self._index_values(item["id"], values)
+            for sort, key in keys.items():
+                self._orders[sort].append(key)
+        for order in self._orders.values():
+            order.sort()
+
+    def add(self, item: Dict[str, Any]) -> None:
+        """Index a new item or re-index a changed one."""
+        item_id = item["id"]
+        values, keys = self._filter_values(item), self._sort_keys(item)
+        previous = self._entries.get(item_id)
+        if previous is not None:
+            old_values, old_keys = previous
+            if old_values != values:
+                self._unindex_values(item_id, old_values)
+                self._index_values(item_id, values)
+            for sort, key in keys.items():
+                if old_keys[sort] != key:
+                    self._remove_key(sort, old_keys[sort])
+                    insort(self._orders[sort], key)
+        else:
+            self._index_values(item_id, values)
+            for sort, key in keys.items():
+                insort(self._orders[sort], key)
+        self._entries[item_id] = (values, keys)
+
+    def remove(self, item_id: str) -> None:
+        previous = self._entries.pop(item_id, None)
+        if previous is None:
+            return
+        values, keys = previous
+        self._unindex_values(item_id, values)
+        for sort, key in keys.items():
+            self._remove_key(sort, key)
+
+    def _index_values(self, item_id: str, values: Dict[str, List[str]]) -> None:
+        for field, field_values in values.items():
+            for value in field_values:
+                self._filters[field][value].add(item_id)
+
+    def _unindex_values(self, item_id: str, values: Dict[str, List[str]]) -> None:
+        for field, field_values in values.items():
+            for value in field_values:
+                ids = self._filters[field].get(value)
+                if ids is not None:
+                    ids.discard(item_id)
+                    if not ids:
+                        del self._filters[field][value]
+
+    def _remove_key(self, sort: str, key: Tuple[Any, ...]) -> None:
+        order = self._orders[sort]
+        pos = bisect_left(order, key)
+        if pos < len(order) and order[pos] == key:
+            del order[pos]
+
+    def query(
+        self,
+        items: Dict[str, Dict[str, Any]],
+        *,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None,
+        sort: str = "created_at",
+        descending: bool = True,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> PublishedPage:
+        """Return one page of ``items`` (the id -> item map this index covers)."""
+        if sort not in self._orders:
+            raise ValueError(f"Unsupported sort field: {sort}")
+        order = self._orders[sort]
+        created_order = self._orders["created_at"]
+
+        # Candidate ids from the filter indexes, smallest set first
+        matching: Optional[Set[str]] = None
+        filter_sets = []
+        for field, value in (filters or {}).items():
+            if value is None or value == "":
+                continue
+            filter_sets.append(self._filters[field].get(normalize_text(value), set()))
+        if filter_sets:
+            filter_sets.sort(key=len)
+            matching = set(filter_sets[0]).intersection(*filter_sets[1:])
+
+        lo_key = (created_key(created_from),) if created_from else None
+        hi_key = None
+        if created_to:
+            hi = created_key(created_to)
+            # A bare date includes the whole day
+            hi_key = (hi[:10] + "\uffff",) if len(created_to) <= 10 else (hi, "\uffff")
+        lo, hi = 0, len(order)
+        if lo_key or hi_key:
+            range_lo = bisect_left(created_order, lo_key) if lo_key else 0
+            range_hi = bisect_left(created_order, hi_key) if hi_key else len(created_order)
+            if sort == "created_at" and matching is None:
+                lo, hi = range_lo, range_hi
+            else:
+                in_range = {key[-1] for key in created_order[range_lo:range_hi]}
+                matching = in_range if matching is None else matching & in_range
+
+        seq = order
+        if matching is not None and len(matching) < SMALL_RESULT_RATIO * len(order):
+            seq = sorted(self._entries[item_id][1][sort] for item_id in matching)
+            lo, hi = 0, len(seq)
+            matching = None
+            total = len(seq)
+        else:
+            total = len(matching) if matching is not None else hi - lo
+
+        if descending:
+            pos = bisect_left(seq, _decode_cursor(sort, cursor), lo, hi) - 1 if cursor else hi - 1
+            step, stop = -1, lo - 1
+        else:
+            pos = bisect_right(seq, _decode_cursor(sort, cursor), lo, hi) if cursor else lo
+            step, stop = 1, hi
+
+        page: List[Dict[str, Any]] = []
+        last_key = None
+        next_cursor = None
+        while pos != stop:
+            key = seq[pos]
+            pos += step
+            if matching is not None and key[-1] not in matching:
+                continue
+            if limit is not None and len(page) == limit:
+                next_cursor = _encode_cursor(sort, last_key)
+                break
+            page.append(items[key[-1]])
+            last_key = key
+        return PublishedPage(items=page, total=total, next_cursor=next_cursor)
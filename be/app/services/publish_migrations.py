@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+Items = List[Dict[str, Any]]
+
+
+def _backfill_analytics(items: Items) -> Items:
+    """v1: drop items without id/title and add the analytics fields."""
+    valid_items = []
+    for item in items:
+        # Skip items that are missing essential fields
+        if not item.get("id") or not item.get("title"):
+            logger.warning(f"Skipping invalid item: {item}")
+            continue
+        item.setdefault("views", 0)
+        item.setdefault("shares", 0)
+        item.setdefault("engagement_rate", 0.0)
+        item.setdefault("growth_rate", 0.0)
+        item.setdefault("created_at", item.get("date", ""))
+        item.setdefault("last_viewed", None)
+        valid_items.append(item)
+    return valid_items
+
+
+# Every field PublishedContentItem needs, so responses can be built as-is
+_RESPONSE_DEFAULTS: Dict[str, Any] = {
+    "content": "",
+    "type": "",
+    "reading_time": "",
+    "quality": "",
+    "tags": [],
+    "highlights": [],
+    "neighborhoods": [],
+    "recommended_spots": [],
+    "price_range": None,
+    "best_times": None,
+    "cautions": None,
+    "destination": None,
+    "image_url": None,
+    "status": "Published",
+    "location": None,
+    "date": "",
+    "time": "",
+}
+
+
+def _backfill_response_fields(items: Items) -> Items:
+    """v2: fill every response field and fall back created_at to the publish date."""
+    for item in items:
+        for field, default in _RESPONSE_DEFAULTS.items():
+            if field not in item:
+                item[field] = list(default) if isinstance(default, list) else default
+        if not item.get("created_at"):
+            item["created_at"] = item.get("date", "")
+    return items
+
+
+def _backfill_image_variants(items: Items) -> Items:
+    """v3: add image_variants (None until an image is stored locally)."""
+    for item in items:
+        item.setdefault("image_variants", None)
+    return items
+
+
+# A stored image behind a public base URL: <scheme>://<host><prefix>/<aa>/<sha256>[-variant].<ext>
+_ABSOLUTE_IMAGE_URL_RE = re.compile(r"^https?://[^/]+(/(?:[^/]+/)*[0-9a-f]{2}/[0-9a-f]{64}(?:-[a-z]+)?\.[a-z0-9]+)$")
+
+
+def _relative_image_url(url: Any) -> Any:
+    match = _ABSOLUTE_IMAGE_URL_RE.match(url) if isinstance(url, str) else None
+    return match.group(1) if match else url
+
+
+def _relativize_image_urls(items: Items) -> Items:
+    """v4: store locally saved images as paths; the public base URL is added per response."""
+    for item in items:
+        item["image_url"] = _relative_image_url(item.get("image_url"))
+        variants = item.get("image_variants")
+        if isinstance(variants, dict):
+            item["image_variants"] = {name: _relative_image_url(url) for name, url in variants.items()}
+    return items
+
+
+# Ordered (version, migration) pairs; append new steps, never edit old ones
+MIGRATIONS: List[Tuple[int, Callable[[Items], Items]]] = [
+    (1, _backfill_analytics),
+    (2, _backfill_response_fields),
+    (3, _backfill_image_variants),
+    (4, _relativize_image_urls),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate_store(data: Dict[str, Any]) -> bool:
+    """Upgrade a ``{"schema_version", "items"}`` document in place.
+
+    Runs every migration newer than the document's version, in order, and
+    records the new version. Returns whether anything ran. Documents
+    without a version predate versioning and get every migration.
+    """
+    version = int(data.get("schema_version", 0))
+    pending = [(v, migration) for v, migration in MIGRATIONS if v > version]
+    if not pending:
+        return False
+    items = data.get("items") or []
+    for v, migration in pending:
+        before = len(items)
+        items = migration(items)
+        logger.info(f"Applied publish store migration v{v}: {before} -> {len(items)} items")
+    data["items"] = items
+    data["schema_version"] = SCHEMA_VERSION
+    return True
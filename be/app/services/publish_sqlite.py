@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services import codec
+from app.services.publish_index import PublishedPage, PublishIndex
+from app.services.publish_migrations import SCHEMA_VERSION, migrate_store
+from app.services.publish_store import CounterDelta, PublishStore, recompute_rates
+from app.services.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS published_items (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    destination TEXT,
+    status TEXT,
+    type TEXT,
+    created_at TEXT,
+    views INTEGER NOT NULL DEFAULT 0,
+    shares INTEGER NOT NULL DEFAULT 0,
+    engagement_rate REAL NOT NULL DEFAULT 0,
+    growth_rate REAL NOT NULL DEFAULT 0,
+    last_viewed TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_published_items_destination ON published_items(destination);
+CREATE INDEX IF NOT EXISTS idx_published_items_status ON published_items(status);
+CREATE INDEX IF NOT EXISTS idx_published_items_created_at ON published_items(created_at);
+CREATE TABLE IF NOT EXISTS published_tags (
+    item_id TEXT NOT NULL REFERENCES published_items(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (item_id, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_published_tags_tag ON published_tags(tag);
+"""
+
+# Statements are module constants so sqlite3's statement cache reuses the
+# prepared form on every call.
+_COLUMNS = "data, views, shares, engagement_rate, growth_rate, last_viewed"
+SELECT_ALL = f"SELECT {_COLUMNS} FROM published_items ORDER BY seq DESC"
+SELECT_ONE = f"SELECT {_COLUMNS} FROM published_items WHERE id = ?"
+COUNT = "SELECT COUNT(*) FROM published_items"
+INSERT = (
+    "INSERT INTO published_items "
+    "(id, destination, status, type, created_at, views, shares, engagement_rate, growth_rate, last_viewed, data) "
+    "VALUES (:id, :destination, :status, :type, :created_at, :views, :shares, :engagement_rate, :growth_rate, :last_viewed, :data)"
+)
+INSERT_IGNORE = INSERT.replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+UPDATE = (
+    "UPDATE published_items SET destination = :destination, status = :status, type = :type, "
+    "created_at = :created_at, views = :views, shares = :shares, engagement_rate = :engagement_rate, "
+    "growth_rate = :growth_rate, last_viewed = :last_viewed, data = :data WHERE id = :id"
+)
+INCREMENT = (
+    "UPDATE published_items SET views = views + ?, shares = shares + ?, "
+    "last_viewed = COALESCE(?, last_viewed) WHERE id = ?"
+)
+UPDATE_RATES = "UPDATE published_items SET engagement_rate = ?, growth_rate = ? WHERE id = ?"
+DELETE = "DELETE FROM published_items WHERE id = ?"
+DELETE_TAGS = "DELETE FROM published_tags WHERE item_id = ?"
+INSERT_TAG = "INSERT OR IGNORE INTO published_tags (item_id, tag) VALUES (?, ?)"
+
+
+def _row_to_item(row: sqlite3.Row) -> Dict[str, Any]:
+    item = codec.loads(row["data"])
+    # Counter columns are authoritative over the JSON document
+    item["views"] = row["views"]
+    item["shares"] = row["shares"]
+    item["engagement_rate"] = row["engagement_rate"]
+    item["growth_rate"] = row["growth_rate"]
+    item["last_viewed"] = row["last_viewed"]
+    return item
+
+
+def _item_params(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": item["id"],
+        "destination": item.get("destination"),
+        "status": item.get("status"),
+        "type": item.get("type"),
+        "created_at": item.get("created_at"),
+        "views": item.get("views", 0),
+        "shares": item.get("shares", 0),
+        "engagement_rate": item.get("engagement_rate", 0.0),
+        "growth_rate": item.get("growth_rate", 0.0),
+        "last_viewed": item.get("last_viewed"),
+        "data": codec.dumps(item).decode("utf-8"),
+    }
+
+
+class SQLitePublishStore(PublishStore):
+    """Published content stored in SQLite (WAL mode, transactional writes).
+
+    Filterable columns (destination, status, created_at) and tags are indexed;
+    the full item is kept as a JSON document alongside them. When the database
+    is created fresh and ``import_from`` names an existing JSON store, that
+    file is migrated in once.
+
+    The data schema version lives in ``PRAGMA user_version``; older
+    databases are upgraded through the migration registry in one
+    transaction when opened.
+
+    Parsed items are cached in memory and writes go through the cache; it is
+    reloaded only when ``PRAGMA data_version`` shows another connection
+    committed changes.
+    """
+
+    def __init__(self, path: str, import_from: Optional[str] = None) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        self._migrate()
+        # Insertion ordered oldest -> newest, like the log store
+        self._cache: Optional[Dict[str, Dict[str, Any]]] = None
+        self._data_version: Optional[int] = None
+        self._index = PublishIndex()
+        self._search = SearchIndex()
+        if import_from and len(self) == 0 and os.path.exists(import_from):
+            imported = self.import_items(_load_json_items(import_from))
+            logger.info(f"Imported {imported} published items from {import_from} into {path}")
+        # Load the cache and search index now rather than on the first request
+        with self._lock:
+            self._cached()
+
+    def _migrate(self) -> None:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        rows = self._conn.execute(SELECT_ALL).fetchall()
+        with self._conn:
+            if rows:
+                data = {"schema_version": version, "items": [_row_to_item(row) for row in rows]}
+                migrate_store(data)
+                kept = {item["id"] for item in data["items"]}
+                for item in data["items"]:
+                    self._conn.execute(UPDATE, _item_params(item))
+                for item_id in {codec.loads(row["data"]).get("id") for row in rows} - kept:
+                    self._conn.execute(DELETE, (item_id,))
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if rows:
+            logger.info(f"Migrated {self.path} to publish schema v{SCHEMA_VERSION}")
+
+    def _cached(self) -> Dict[str, Dict[str, Any]]:
+        """The item cache, reloaded if another connection wrote (lock held)."""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._cache is None or data_version != self._data_version:
+            rows = self._conn.execute(SELECT_ALL).fetchall()
+            self._cache = {item["id"]: item for item in map(_row_to_item, reversed(rows))}
+            self._index.rebuild(list(self._cache.values()))
+            # Only new or changed items are re-analyzed on a reload
+            self._search.sync(list(self._cache.values()))
+            self._data_version = data_version
+            self._touch(os.path.getmtime(self.path) if self._version == 0 else None)
+        return self._cache
+
+    def list_items(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._cached().values()))
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._cached().get(item_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._cache is None:
+                return self._conn.execute(COUNT).fetchone()[0]
+            return len(self._cached())
+
+    def query(self, **params: Any) -> PublishedPage:
+        with self._lock:
+            return self._index.query(self._cached(), **params)
+
+    def version(self, counts: bool = True) -> int:
+        with self._lock:
+            self._cached()
+            return self._versions(counts)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Tuple[Dict[str, Any], float]], int]:
+        with self._lock:
+            cache = self._cached()
+            hits, total = self._search.search(query, limit=limit, offset=offset)
+            return [(cache[item_id], score) for item_id, score in hits], total
+
+    def _write_tags(self, item: Dict[str, Any]) -> None:
+        self._conn.execute(DELETE_TAGS, (item["id"],))
+        self._conn.executemany(INSERT_TAG, [(item["id"], tag) for tag in item.get("tags") or []])
+
+    def insert(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            cache = self._cached()
+            with self._conn:
+                self._conn.execute(INSERT, _item_params(item))
+                self._write_tags(item)
+            cache[item["id"]] = item
+            self._index.add(item)
+            self._search.add(item)
+            self._touch()
+        return item
+
+    def import_items(self, items: Iterable[Dict[str, Any]]) -> int:
+        """Insert items (given most recent first) in one transaction, skipping known ids."""
+        imported = 0
+        with self._lock:
+            with self._conn:
+                for item in reversed(list(items)):
+                    cursor = self._conn.execute(INSERT_IGNORE, _item_params(item))
+                    if cursor.rowcount:
+                        self._write_tags(item)
+                        imported += 1
+            self._cache = None
+        return imported
+
+    def update(self, item_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cache = self._cached()
+            current = cache.get(item_id)
+            if current is None:
+                return None
+            item = {**current, **fields, "id": item_id}
+            with self._conn:
+                self._conn.execute(UPDATE, _item_params(item))
+                if "tags" in fields:
+                    self._write_tags(item)
+            cache[item_id] = item
+            self._index.add(item)
+            self._search.add(item)
+            self._touch()
+        return item
+
+    def delete(self, item_id: str) -> bool:
+        with self._lock:
+            cache = self._cached()
+            with self._conn:
+                deleted = self._conn.execute(DELETE, (item_id,)).rowcount > 0
+            cache.pop(item_id, None)
+            self._index.remove(item_id)
+            self._search.remove(item_id)
+            if deleted:
+                self._touch()
+        return deleted
+
+    def increment(
+        self,
+        item_id: str,
+        views: int = 0,
+        shares: int = 0,
+        last_viewed: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cache = self._cached()
+            with self._conn:
+                if self._conn.execute(INCREMENT, (views, shares, last_viewed, item_id)).rowcount == 0:
+                    return None
+                item = _row_to_item(self._conn.execute(SELECT_ONE, (item_id,)).fetchone())
+                recompute_rates(item)
+                self._conn.execute(UPDATE_RATES, (item["engagement_rate"], item["growth_rate"], item_id))
+            cache[item_id] = item
+            self._index.add(item)
+            self._touch(counts_only=True)
+        return item
+
+    def increment_many(self, deltas: Dict[str, CounterDelta]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            cache = self._cached()
+            known = [item_id for item_id in deltas if item_id in cache]
+            if not known:
+                return {}
+            updated = {}
+            with self._conn:
+                self._conn.executemany(INCREMENT, [
+                    (deltas[i].views, deltas[i].shares, deltas[i].last_viewed, i) for i in known
+                ])
+                for item_id in known:
+                    row = self._conn.execute(SELECT_ONE, (item_id,)).fetchone()
+                    if row is not None:
+                        item = _row_to_item(row)
+                        recompute_rates(item)
+                        updated[item_id] = item
+                self._conn.executemany(UPDATE_RATES, [
+                    (item["engagement_rate"], item["growth_rate"], item_id) for item_id, item in updated.items()
+                ])
+            for item_id, item in updated.items():
+                cache[item_id] = item
+                self._index.add(item)
+            self._touch(counts_only=True)
+        return updated
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+
+
+def _load_json_items(path: str) -> List[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        data = codec.loads(f.read())
+    migrate_store(data)
+    return data["items"]
+
+
+def migrate_json_to_sqlite(json_path: str, db_path: str) -> int:
+    """One-shot migration of a JSON publish store into a SQLite database."""
+    store = SQLitePublishStore(db_path)
+    try:
+        return store.import_items(_load_json_items(json_path))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    # python -m app.services.publish_sqlite <published_content.json> <published_content.db>
+    if len(sys.argv) != 3:
+        print("usage: python -m app.services.publish_sqlite <json_path> <db_path>")
+        sys.exit(2)
+    logging.basicConfig(level=logging.INFO)
+    count = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f"Migrated {count} item(s) into {sys.argv[2]}")
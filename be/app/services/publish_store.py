@@ -0,0 +1,523 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services import codec
+from app.services.publish_index import PublishedPage, PublishIndex
+from app.services.publish_migrations import SCHEMA_VERSION, migrate_store
+from app.services.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+def recompute_rates(item: Dict[str, Any]) -> None:
+    """Refresh the derived engagement and growth rates from the raw counters."""
+    # Engagement rate (simplified: views + shares / total possible)
+    total_interactions = item.get("views", 0) + item.get("shares", 0)
+    if total_interactions > 0:
+        item["engagement_rate"] = round((total_interactions / (total_interactions + 10)) * 100, 1)
+
+    # Growth rate (simplified: based on recent activity)
+    if item.get("views", 0) > 10:
+        item["growth_rate"] = round(min(25.0, (item.get("views", 0) / 10) * 5), 1)
+
+
+@dataclass
+class CounterDelta:
+    """Accumulated counter changes for one item."""
+
+    views: int = 0
+    shares: int = 0
+    last_viewed: Optional[str] = None
+
+    def add(self, views: int = 0, shares: int = 0, last_viewed: Optional[str] = None) -> None:
+        self.views += views
+        self.shares += shares
+        if last_viewed and (self.last_viewed is None or last_viewed > self.last_viewed):
+            self.last_viewed = last_viewed
+
+    def apply_to(self, item: Dict[str, Any]) -> None:
+        """Add the deltas to ``item`` in place and refresh its derived rates."""
+        item["views"] = item.get("views", 0) + self.views
+        item["shares"] = item.get("shares", 0) + self.shares
+        if self.last_viewed:
+            item["last_viewed"] = self.last_viewed
+        recompute_rates(item)
+
+
+class PublishStore(ABC):
+    """Storage backend for published content items.
+
+    Items are plain dicts shaped like ``PublishedContentItem``; listings are
+    most recent first.
+    """
+
+    # Bumped by ``_touch`` on every mutation, including reloads from disk,
+    # except writes that only add to counters (``_counts_version``)
+    _version = 0
+    _counts_version = 0
+    last_modified = 0.0
+    # Set when durable storage could not be read; the store then refuses to
+    # overwrite it so the damaged data can still be recovered
+    degraded = False
+
+    @abstractmethod
+    def list_items(self) -> List[Dict[str, Any]]:
+        """All items, most recent first. Callers must not mutate them."""
+
+    @abstractmethod
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def query(self, **params: Any) -> PublishedPage:
+        """One filtered, sorted page of items; see ``PublishIndex.query``."""
+
+    @abstractmethod
+    def version(self, counts: bool = True) -> int:
+        """A counter that changes whenever the items change; reads no items.
+
+        With ``counts=False`` it ignores writes that only add to view/share
+        counters (buffered counts are already visible through the overlay).
+        """
+
+    def _touch(self, when: Optional[float] = None, counts_only: bool = False) -> None:
+        if counts_only:
+            self._counts_version += 1
+            return
+        self._version += 1
+        self.last_modified = when if when is not None else time.time()
+
+    def _versions(self, counts: bool) -> int:
+        # Both only grow, so the sum changes whenever either does
+        return self._version + self._counts_version if counts else self._version
+
+    @abstractmethod
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Tuple[Dict[str, Any], float]], int]:
+        """Full-text search: ((item, score) page best first, total matches)."""
+
+    @abstractmethod
+    def insert(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def update(self, item_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Overwrite ``fields`` on an item; None if it does not exist."""
+
+    @abstractmethod
+    def delete(self, item_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def increment(
+        self,
+        item_id: str,
+        views: int = 0,
+        shares: int = 0,
+        last_viewed: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Add counter deltas to an item and refresh its derived rates."""
+
+    @abstractmethod
+    def increment_many(self, deltas: Dict[str, CounterDelta]) -> Dict[str, Dict[str, Any]]:
+        """Apply counter deltas to many items at once (all or nothing).
+
+        Rates are recomputed once per item. Returns the updated items by id;
+        unknown ids are skipped and absent from the result.
+        """
+
+    @property
+    def log_records(self) -> int:
+        """Records written since the last compaction (0 if not log based)."""
+        return 0
+
+    def compact(self) -> None:
+        """Fold pending log records into durable storage, if applicable."""
+
+    def close(self) -> None:
+        ...
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class LogPublishStore(PublishStore):
+    """Published content held in memory and persisted as an append-only log.
+
+    On disk the store is a snapshot (``snapshot_path``, the same
+    ``{"items": [...]}`` JSON file used for import/export) plus an NDJSON log
+    of upserts, deletes and counter increments written since that snapshot.
+    Every record carries a sequence number and the snapshot records the last
+    one it includes, so replaying the log after a crash never double-applies.
+    ``compact()`` folds the log into a fresh snapshot via atomic rename.
+    The snapshot also records its ``schema_version``; an older one is
+    upgraded through the migration registry once, on load, and written back.
+
+    Reads are served from memory (writes go through it). Each access compares
+    the files' mtime/size with what this process last wrote, so edits made
+    by another process or by hand are picked up with a reload.
+
+    An unreadable snapshot leaves the store ``degraded``: it serves what the
+    log holds and keeps appending to it, but never rewrites the snapshot
+    (no compaction, no migration write-back) until the file is repaired.
+    """
+
+    def __init__(self, snapshot_path: str, fsync: bool = False, compact_json: bool = False) -> None:
+        self.snapshot_path = snapshot_path
+        self.log_path = f"{os.path.splitext(snapshot_path)[0]}.log"
+        self._rotated_log_path = f"{self.log_path}.1"
+        self.fsync = fsync
+        self.compact_json = compact_json
+        # Insertion ordered oldest -> newest; listings are newest first
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._index = PublishIndex()
+        self._search = SearchIndex()
+        self._seq = 0
+        self._log_records = 0
+        self._log_file = None
+        self._stamps: Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]] = (None, None)
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self.load()
+
+    @property
+    def log_records(self) -> int:
+        return self._log_records
+
+    # Loading
+
+    def load(self) -> None:
+        """Rebuild in-memory state from the snapshot and replay the log."""
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        with self._lock:
+            self._load()
+
+    def _load(self) -> None:
+        if self._log_file is not None:
+            self._log_file.close()
+        self.degraded = False
+        snapshot = self._read_snapshot()
+        if migrate_store(snapshot) and not self.degraded:
+            # Persist the upgrade so it never runs again
+            self._write_snapshot(snapshot, self.snapshot_path)
+        self._items = {item["id"]: item for item in reversed(snapshot["items"])}
+        self._seq = snapshot_seq = int(snapshot.get("seq", 0))
+        self._log_records = 0
+        for path in (self._rotated_log_path, self.log_path):
+            self._log_records += self._replay(path, snapshot_seq)
+        if self.degraded:
+            # The unreadable snapshot's seq is unknown. Number new records past
+            # any it could hold (ms clock) so they replay once it is restored
+            self._seq = max(self._seq, time.time_ns() // 1_000_000)
+        self._index.rebuild(list(self._items.values()))
+        # Only new or changed items are re-analyzed on a reload
+        self._search.sync(list(self._items.values()))
+        self._log_file = open(self.log_path, "ab")
+        self._stamps = (_file_stamp(self.snapshot_path), _file_stamp(self.log_path))
+        mtimes = [stamp[0] / 1e9 for stamp in self._stamps if stamp is not None]
+        self._touch(max(mtimes) if mtimes else None)
+        logger.info(f"Loaded {len(self._items)} published items ({self._log_records} log records replayed)")
+
+    def _reload_if_changed(self) -> None:
+        """Reload if the files changed behind our back (lock held)."""
+        current = (_file_stamp(self.snapshot_path), _file_stamp(self.log_path))
+        if current != self._stamps:
+            logger.info("Publish store changed on disk; reloading")
+            self._load()
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        if not os.path.exists(self.snapshot_path):
+            return {"schema_version": SCHEMA_VERSION, "items": []}
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                data = codec.loads(f.read())
+        except Exception as e:
+            logger.error(f"Unreadable publish snapshot {self.snapshot_path}, store degraded: {e}")
+            self.degraded = True
+            return {"schema_version": SCHEMA_VERSION, "items": []}
+        if not isinstance(data, dict) or not isinstance(data.get("items"), list):
+            logger.error(f"Publish snapshot {self.snapshot_path} has no items list, store degraded")
+            self.degraded = True
+            return {"schema_version": SCHEMA_VERSION, "items": []}
+        return data
+
+    def _replay(self, path: str, snapshot_seq: int) -> int:
+        if not os.path.exists(path):
+            return 0
+        replayed = 0
+        with open(path, "rb") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = codec.loads(line)
+                except (codec.JSONDecodeError, UnicodeDecodeError):
+                    # A torn final line from a crash mid-append
+                    logger.warning(f"Skipping corrupt record at {path}:{line_no}")
+                    continue
+                seq = record.get("seq", 0)
+                if seq <= snapshot_seq:
+                    continue
+                # The index is rebuilt once after replay
+                self._apply(record, reindex=False)
+                self._seq = max(self._seq, seq)
+                replayed += 1
+        return replayed
+
+    def _apply(self, record: Dict[str, Any], reindex: bool = True) -> Optional[Dict[str, Any]]:
+        op = record.get("op")
+        if op == "upsert":
+            item = record["item"]
+            self._items[item["id"]] = item
+            if reindex:
+                self._index.add(item)
+                self._search.add(item)
+            return item
+        if op == "delete":
+            self._items.pop(record["id"], None)
+            if reindex:
+                self._index.remove(record["id"])
+                self._search.remove(record["id"])
+            return None
+        # Counter records replace the item with an updated copy: readers may
+        # hold the old dict outside the lock (e.g. while a flush runs)
+        if op == "incr":
+            item = self._items.get(record["id"])
+            if item is None:
+                return None
+            item = self._items[record["id"]] = dict(item)
+            CounterDelta(record.get("views", 0), record.get("shares", 0), record.get("last_viewed")).apply_to(item)
+            if reindex:
+                self._index.add(item)
+            return item
+        if op == "incr_many":
+            # One record per batch, so a torn write drops the whole batch
+            updated = {}
+            for item_id, delta in record["deltas"].items():
+                item = self._items.get(item_id)
+                if item is None:
+                    continue
+                item = self._items[item_id] = dict(item)
+                CounterDelta(**delta).apply_to(item)
+                if reindex:
+                    self._index.add(item)
+                updated[item_id] = item
+            return updated
+        logger.warning(f"Ignoring unknown publish log op: {op}")
+        return None
+
+    def _append(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply a record to memory and append it to the log (lock held)."""
+        self._seq += 1
+        record["seq"] = self._seq
+        self._log_file.write(codec.dumps(record) + b"\n")
+        self._log_file.flush()
+        if self.fsync:
+            os.fsync(self._log_file.fileno())
+        st = os.fstat(self._log_file.fileno())
+        self._stamps = (self._stamps[0], (st.st_mtime_ns, st.st_size))
+        self._log_records += 1
+        result = self._apply(record)
+        self._touch(counts_only=record["op"] in ("incr", "incr_many"))
+        return result
+
+    # Reads
+
+    def list_items(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._reload_if_changed()
+            return list(reversed(self._items.values()))
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._reload_if_changed()
+            return self._items.get(item_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._reload_if_changed()
+            return len(self._items)
+
+    def query(self, **params: Any) -> PublishedPage:
+        with self._lock:
+            self._reload_if_changed()
+            return self._index.query(self._items, **params)
+
+    def version(self, counts: bool = True) -> int:
+        with self._lock:
+            self._reload_if_changed()
+            return self._versions(counts)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Tuple[Dict[str, Any], float]], int]:
+        with self._lock:
+            self._reload_if_changed()
+            hits, total = self._search.search(query, limit=limit, offset=offset)
+            return [(self._items[item_id], score) for item_id, score in hits], total
+
+    # Writes
+
+    def insert(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._reload_if_changed()
+            return self._append({"op": "upsert", "item": item})
+
+    def update(self, item_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._reload_if_changed()
+            current = self._items.get(item_id)
+            if current is None:
+                return None
+            return self._append({"op": "upsert", "item": {**current, **fields}})
+
+    def delete(self, item_id: str) -> bool:
+        with self._lock:
+            self._reload_if_changed()
+            if item_id not in self._items:
+                return False
+            self._append({"op": "delete", "id": item_id})
+            return True
+
+    def increment(
+        self,
+        item_id: str,
+        views: int = 0,
+        shares: int = 0,
+        last_viewed: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._reload_if_changed()
+            if item_id not in self._items:
+                return None
+            record: Dict[str, Any] = {"op": "incr", "id": item_id, "views": views, "shares": shares}
+            if last_viewed:
+                record["last_viewed"] = last_viewed
+            return self._append(record)
+
+    def increment_many(self, deltas: Dict[str, CounterDelta]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._reload_if_changed()
+            known = {
+                item_id: {"views": d.views, "shares": d.shares, "last_viewed": d.last_viewed}
+                for item_id, d in deltas.items()
+                if item_id in self._items
+            }
+            if not known:
+                return {}
+            return self._append({"op": "incr_many", "deltas": known})
+
+    # Compaction and import/export
+
+    def compact(self) -> None:
+        """Fold the log into a new snapshot without blocking writers for long.
+
+        The live log is rotated aside and state copied under the lock; the
+        snapshot is then written to a temp file and atomically renamed into
+        place, after which the rotated log is no longer needed.
+        """
+        with self._compact_lock:
+            with self._lock:
+                self._reload_if_changed()
+                if self._log_records == 0:
+                    return
+                if self.degraded:
+                    # The snapshot would be replaced by the log's items alone
+                    logger.error(f"Not compacting: publish snapshot {self.snapshot_path} is unreadable; repair or restore it")
+                    return
+                self._log_file.close()
+                if os.path.exists(self._rotated_log_path):
+                    # A previous compaction died before its snapshot landed
+                    with open(self._rotated_log_path, "ab") as rotated, \
+                            open(self.log_path, "rb") as live:
+                        rotated.write(live.read())
+                    os.remove(self.log_path)
+                else:
+                    os.replace(self.log_path, self._rotated_log_path)
+                self._log_file = open(self.log_path, "ab")
+                self._stamps = (self._stamps[0], _file_stamp(self.log_path))
+                compacted = self._log_records
+                self._log_records = 0
+                seq = self._seq
+                items = [dict(item) for item in reversed(self._items.values())]
+
+            self._write_snapshot({"schema_version": SCHEMA_VERSION, "seq": seq, "items": items}, self.snapshot_path)
+            with self._lock:
+                self._stamps = (_file_stamp(self.snapshot_path), self._stamps[1])
+            os.remove(self._rotated_log_path)
+            logger.info(f"Compacted {compacted} publish log records into {self.snapshot_path}")
+
+    def _write_snapshot(self, data: Dict[str, Any], path: str) -> None:
+        if self.degraded and os.path.abspath(path) == os.path.abspath(self.snapshot_path):
+            raise RuntimeError(f"Refusing to overwrite unreadable publish snapshot {path}")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(codec.dumps(data, indent=not self.compact_json))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def export_json(self, path: str) -> None:
+        """Write the current items as a plain ``{"items": [...]}`` JSON file."""
+        self._write_snapshot({"schema_version": SCHEMA_VERSION, "items": self.list_items()}, path)
+
+    def import_json(self, path: str) -> int:
+        """Upsert every item from a ``{"items": [...]}`` JSON file."""
+        with open(path, "rb") as f:
+            data = codec.loads(f.read())
+        migrate_store(data)
+        with self._lock:
+            self._reload_if_changed()
+            for item in reversed(data["items"]):
+                self._append({"op": "upsert", "item": item})
+        return len(data["items"])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+
+def create_publish_store(
+    backend: str,
+    snapshot_path: str,
+    sqlite_path: str,
+    fsync: bool = False,
+    compact_json: bool = False,
+) -> PublishStore:
+    """Build the configured publish store backend ("log" or "sqlite")."""
+    if backend == "sqlite":
+        from app.services.publish_sqlite import SQLitePublishStore
+
+        return SQLitePublishStore(sqlite_path, import_from=snapshot_path)
+    if backend != "log":
+        raise ValueError(f"Unknown publish store backend: {backend}")
+    return LogPublishStore(snapshot_path, fsync=fsync, compact_json=compact_json)
+
+
+async def run_compaction(store: PublishStore, interval: float, threshold: int) -> None:
+    """Background task: compact the store whenever its log grows past ``threshold``."""
+    while True:
+        await asyncio.sleep(interval)
+        if store.log_records < threshold:
+            continue
+        try:
+            await asyncio.to_thread(store.compact)
+        except Exception as e:
+            logger.error(f"Publish store compaction failed: {e}")
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Worth another attempt on the same model (includes APITimeoutError)
+TRANSIENT_ERRORS = (APIConnectionError, InternalServerError)
+
+
+class RateLimitTimeout(Exception):
+    """A call could not get rate-limit capacity before its deadline."""
+
+
+class TokenBucket:
+    """Token bucket refilling at ``per_minute`` units, holding at most one minute's worth.
+
+    Kept as a virtual clock (GCRA): ``tat`` is when the bucket would be full
+    again, so reservations are computed without sleeping or locking and
+    later callers are always scheduled after earlier ones.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tat = 0.0
+
+    def available_at(self, amount: float, now: float) -> float:
+        """Earliest time ``amount`` can be taken (capped at the bucket size)."""
+        amount = min(amount, self.capacity)
+        return max(now, self.tat - (self.capacity - amount) / self.rate)
+
+    def take(self, amount: float, at: float) -> None:
+        self.tat = max(self.tat, at) + min(amount, self.capacity) / self.rate
+
+    def give(self, amount: float, now: float) -> None:
+        if self.tat > now:
+            self.tat = max(now, self.tat - amount / self.rate)
+
+    def empty_at(self, when: float) -> None:
+        self.tat = max(self.tat, when + self.capacity / self.rate)
+
+    def level(self, now: float) -> float:
+        return self.capacity - max(0.0, self.tat - now) * self.rate
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget for upstream calls.
+
+    Callers reserve one request plus an estimated token cost (prompt plus
+    ``max_tokens``) before calling upstream and hand back the unused part
+    with ``settle`` once real usage is known. Each reservation is scheduled
+    after every earlier one (a fair FIFO queue), so a large request is not
+    starved by small ones; a caller that would not be served within
+    ``max_wait`` seconds fails at once with ``RateLimitTimeout`` instead of
+    queueing. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, max_wait: float) -> None:
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_wait = max_wait
+        self._paused_until = 0.0
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.upstream_limited = 0
+        self.retries = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    async def acquire(self, tokens: int) -> None:
+        now = time.monotonic()
+        start = max(now, self._paused_until)
+        if self.requests is not None:
+            start = max(start, self.requests.available_at(1, now))
+        if self.tokens is not None:
+            start = max(start, self.tokens.available_at(tokens, now))
+        if start - now > self.max_wait:
+            self.timeouts += 1
+            raise RateLimitTimeout(f"{self.name}: next capacity in {start - now:.1f}s, over the {self.max_wait:.0f}s limit")
+        if self.requests is not None:
+            self.requests.take(1, start)
+        if self.tokens is not None:
+            self.tokens.take(tokens, start)
+        self.acquired += 1
+        try:
+            if start > now:
+                self.waited += 1
+                self.wait_seconds += start - now
+                await asyncio.sleep(start - now)
+            # An upstream 429 while we slept pauses callers already scheduled too
+            while (remaining := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(remaining)
+        except asyncio.CancelledError:
+            # Never reached upstream: free the slot for later callers
+            now = time.monotonic()
+            if self.requests is not None:
+                self.requests.give(1, now)
+            if self.tokens is not None:
+                self.tokens.give(tokens, now)
+            raise
+
+    def settle(self, reserved: int, used: Optional[int]) -> None:
+        """Return the unused part of a token reservation (all of it for ``used=0``)."""
+        if self.tokens is not None and used is not None and used < reserved:
+            self.tokens.give(reserved - used, time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        """Upstream rejected us: hold every caller for ``seconds``, then ramp up from empty."""
+        now = time.monotonic()
+        self.upstream_limited += 1
+        self._paused_until = max(self._paused_until, now + seconds)
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.empty_at(self._paused_until)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "rpm_available": round(self.requests.level(now), 1) if self.requests is not None else None,
+            "tpm_available": round(self.tokens.level(now)) if self.tokens is not None else None,
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "avg_wait_seconds": round(self.wait_seconds / self.waited, 3) if self.waited else 0.0,
+            "timeouts": self.timeouts,
+            "upstream_rate_limited": self.upstream_limited,
+            "retries": self.retries,
+        }
+
+
+def _retry_after(error: RateLimitError) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def _never_sent(error: BaseException) -> bool:
+    """True if ``error`` shows the request never reached upstream (connect failure)."""
+    return isinstance(error, APIConnectionError) and not isinstance(error, APITimeoutError)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+async def call_limited(
+    limiter: RateLimiter,
+    tokens: int,
+    call: Callable[[], Awaitable[T]],
+    usage: Optional[Callable[[T], Optional[int]]] = None,
+    prompt_tokens: Optional[int] = None,
+) -> T:
+    """Run ``call`` under ``limiter``, retrying upstream 429s with jittered backoff.
+
+    A 429 pauses the whole limiter for the backoff delay (or Retry-After),
+    then the retry queues again behind earlier callers. Exhausted quota
+    (``insufficient_quota``) is not retried. Connection errors, timeouts
+    and 5xx responses are retried up to OPENAI_MAX_RETRIES times after a
+    backoff of their own. Every retry goes back through the limiter; the
+    client does no retries of its own.
+
+    The reservation is refunded only when upstream never got the request
+    (a 429 rejection or a connect error). Once it may have been sent
+    (timeouts, 5xx, other errors, cancellation mid-call) the prompt is
+    assumed consumed: ``prompt_tokens`` stay charged, or the whole
+    reservation when that is not given.
+    """
+    attempt = 0
+    failures = 0
+    while True:
+        await limiter.acquire(tokens)
+        try:
+            result = await call()
+        except RateLimitError as e:
+            # A rejected call used no tokens; refund before pausing so the
+            # pause still empties the bucket
+            limiter.settle(tokens, 0)
+            if getattr(e, "code", None) == "insufficient_quota":
+                raise
+            retry_after = _retry_after(e)
+            delay = backoff_delay(attempt, settings.openai_backoff_base, settings.openai_backoff_max)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            # Everyone waits, not just this caller, so the burst does not repeat
+            limiter.pause(delay)
+            if attempt >= settings.openai_rate_limit_retries:
+                raise
+            attempt += 1
+            limiter.retries += 1
+            logger.warning(f"{limiter.name}: upstream rate limited, retry {attempt} in {delay:.1f}s")
+            continue
+        except TRANSIENT_ERRORS as e:
+            limiter.settle(tokens, 0 if _never_sent(e) else prompt_tokens)
+            if failures >= settings.openai_max_retries:
+                raise
+            delay = backoff_delay(failures, settings.openai_backoff_base, settings.openai_backoff_max)
+            failures += 1
+            logger.warning(f"{limiter.name}: {type(e).__name__}, retry {failures} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Other errors and cancellation mid-call: upstream may already
+            # be processing the prompt
+            limiter.settle(tokens, prompt_tokens)
+            raise
+        limiter.settle(tokens, usage(result) if usage is not None else None)
+        return result
+
+
+chat_limiter = RateLimiter(
+    "chat",
+    rpm=settings.openai_rpm_limit,
+    tpm=settings.openai_tpm_limit,
+    max_wait=settings.openai_rate_limit_max_wait,
+)
+image_limiter = RateLimiter(
+    "images",
+    rpm=settings.openai_image_rpm_limit,
+    tpm=0,
+    max_wait=settings.openai_rate_limit_max_wait,
+)
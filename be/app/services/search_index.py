@@ -0,0 +1,462 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.cache import normalize_text
+
+# Per-field weights applied to term frequency and document length (BM25F style)
+FIELD_BOOSTS = {
+    "title": 3.0,
+    "destination": 2.0,
+    "tags": 2.0,
+    "highlights": 1.5,
+    "neighborhoods": 1.5,
+    "recommended_spots": 1.5,
+    "content": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# The last query word also matches vocabulary terms it prefixes
+PREFIX_MIN_LENGTH = 2
+PREFIX_MAX_EXPANSIONS = 10
+PREFIX_WEIGHT = 0.6
+# Length normalization is cached per document and recomputed when the
+# average document length drifts by more than this fraction
+AVGDL_DRIFT = 0.1
+# A frequent term's postings are split into impact tiers at these
+# fractions of its ranked list (top 0.5%, next to 2%, ...), each with a
+# cached slot bitmap. Rarer terms are one tier, built per query
+TIER_FRACTIONS = (0.005, 0.02, 0.06, 0.15, 0.35)
+TIER_MIN_POSTINGS = 512
+# Bitmaps with at most this many bits set are decoded bit by bit
+SPARSE_MASK_BITS = 32
+
+_TOKEN_RE = re.compile(r"\w+")
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, accent-folded word tokens."""
+    # Most text is ASCII and needs no decomposition
+    folded = text.lower() if text.isascii() else normalize_text(text)
+    return _TOKEN_RE.findall(folded)
+
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return str(value or "")
+
+
+@dataclass
+class _Ranking:
+    """A term's item ids by descending impact, split into impact tiers."""
+
+    ids: List[str]
+    # Sort-key value (negated impact) where each tier but the last ends
+    edges: List[float]
+    # Slot bitmap per tier, cached for frequent terms
+    masks: Optional[List[int]] = None
+
+    def tier(self, key: float) -> int:
+        return bisect_left(self.edges, key)
+
+
+class SearchIndex:
+    """In-process inverted index over published items with BM25 ranking.
+
+    Postings hold a boost-weighted term frequency per item, so a title hit
+    counts more than a body hit. Items are (re)indexed one at a time on
+    publish/update and removed on delete; when the owning store reloads
+    from disk, ``sync`` re-analyzes only the items whose text changed.
+
+    Queries do not score every posting. On first use a term's postings
+    are ranked by impact (length-normalized tf) and split into impact
+    tiers, each with a bitmap of item slots. ``search`` scores the top
+    of every ranked list to get a k-th best score, then scores only the
+    items of tier combinations (one tier per query word, or none) whose
+    upper bound can still beat it, best bound first. The result is the
+    exact top k; the match count is the popcount of the OR of bitmaps.
+    """
+
+    def __init__(self) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_keys: Dict[str, Tuple[Any, ...]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        self._norms: Dict[str, float] = {}
+        self._norm_avgdl = 0.0
+        # Built per term on first query and kept up to date afterwards
+        self._rankings: Dict[str, _Ranking] = {}
+        self._slots: Dict[str, int] = {}
+        self._slot_ids: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    @staticmethod
+    def _doc_key(item: Dict[str, Any]) -> Tuple[Any, ...]:
+        """The indexed text of an item, compared to skip unchanged items."""
+        # Lists are copied so in-place edits still register as changes
+        return tuple([tuple(v) if v.__class__ is list else v for v in map(item.get, FIELD_BOOSTS)])
+
+    @staticmethod
+    def _analyze(item: Dict[str, Any]) -> Tuple[Dict[str, float], float]:
+        weights: Dict[str, float] = {}
+        length = 0.0
+        for field, boost in FIELD_BOOSTS.items():
+            tokens = tokenize(_field_text(item.get(field)))
+            length += boost * len(tokens)
+            for token, count in Counter(tokens).items():
+                weights[token] = weights.get(token, 0.0) + boost * count
+        return weights, length
+
+    def rebuild(self, items: List[Dict[str, Any]]) -> None:
+        self._reset()
+        for item in items:
+            self._insert(item["id"], self._doc_key(item), *self._analyze(item))
+        self._vocabulary = sorted(self._postings)
+        self._refresh_norms()
+
+    def sync(self, items: List[Dict[str, Any]]) -> None:
+        """Make the index cover exactly ``items``, re-analyzing only new or changed ones."""
+        ids = {item["id"] for item in items}
+        removed = [item_id for item_id in self._doc_terms if item_id not in ids]
+        changed = []
+        for item in items:
+            key = self._doc_key(item)
+            if self._doc_keys.get(item["id"]) == key:
+                # Equal but new objects: drop the reference to the old text
+                self._doc_keys[item["id"]] = key
+            else:
+                changed.append(item)
+        if len(removed) + len(changed) > len(items) // 2:
+            self.rebuild(items)
+            return
+        for item_id in removed:
+            self.remove(item_id)
+        for item in changed:
+            self.add(item)
+
+    def add(self, item: Dict[str, Any]) -> None:
+        """Index a new item or re-index a changed one."""
+        item_id = item["id"]
+        key = self._doc_key(item)
+        if self._doc_keys.get(item_id) == key:
+            return
+        terms, length = self._analyze(item)
+        self.remove(item_id)
+        for term in terms:
+            if term not in self._postings:
+                insort(self._vocabulary, term)
+        self._insert(item_id, key, terms, length)
+        self._norms[item_id] = self._norm(length)
+        slot = self._slots[item_id]
+        for term in terms:
+            ranking = self._rankings.get(term)
+            if ranking is not None:
+                impact_key = self._impact_key(term)
+                insort(ranking.ids, item_id, key=impact_key)
+                if ranking.masks is not None:
+                    ranking.masks[ranking.tier(impact_key(item_id)[0])] |= 1 << slot
+
+    def _insert(self, item_id: str, key: Tuple[Any, ...], terms: Dict[str, float], length: float) -> None:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._slot_ids[slot] = item_id
+        else:
+            slot = len(self._slot_ids)
+            self._slot_ids.append(item_id)
+        self._slots[item_id] = slot
+        postings = self._postings
+        for term, weight in terms.items():
+            term_postings = postings.get(term)
+            if term_postings is None:
+                postings[term] = {item_id: weight}
+            else:
+                term_postings[item_id] = weight
+        self._doc_terms[item_id] = terms
+        self._doc_keys[item_id] = key
+        self._doc_lengths[item_id] = length
+        self._total_length += length
+
+    def remove(self, item_id: str) -> None:
+        terms = self._doc_terms.pop(item_id, None)
+        if terms is None:
+            return
+        slot = self._slots.pop(item_id)
+        for term in terms:
+            ranking = self._rankings.get(term)
+            if ranking is not None:
+                impact_key = self._impact_key(term)
+                key = impact_key(item_id)
+                del ranking.ids[bisect_left(ranking.ids, key, key=impact_key)]
+                if ranking.masks is not None:
+                    ranking.masks[ranking.tier(key[0])] &= ~(1 << slot)
+            postings = self._postings[term]
+            del postings[item_id]
+            if not postings:
+                del self._postings[term]
+                self._rankings.pop(term, None)
+                pos = bisect_left(self._vocabulary, term)
+                if pos < len(self._vocabulary) and self._vocabulary[pos] == term:
+                    del self._vocabulary[pos]
+        self._slot_ids[slot] = None
+        self._free_slots.append(slot)
+        del self._doc_keys[item_id]
+        self._total_length -= self._doc_lengths.pop(item_id)
+        self._norms.pop(item_id, None)
+
+    def _avgdl(self) -> float:
+        return self._total_length / len(self._doc_terms) if self._doc_terms else 0.0
+
+    def _norm(self, length: float) -> float:
+        avgdl = self._norm_avgdl or 1.0
+        return BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+
+    def _refresh_norms(self) -> None:
+        self._norm_avgdl = self._avgdl()
+        self._norms = {item_id: self._norm(length) for item_id, length in self._doc_lengths.items()}
+        # Impacts depend on the norms; rankings are rebuilt on next use
+        self._rankings.clear()
+
+    def _impact_key(self, term: str) -> Callable[[str], Tuple[float, str]]:
+        """Sort key of ranked ids: highest impact tf / (tf + norm) first, then id."""
+        postings = self._postings[term]
+        norms = self._norms
+
+        def impact_key(item_id: str) -> Tuple[float, str]:
+            tf = postings[item_id]
+            return -tf / (tf + norms[item_id]), item_id
+
+        return impact_key
+
+    def _ranking(self, term: str) -> _Ranking:
+        ranking = self._rankings.get(term)
+        if ranking is None:
+            norms = self._norms
+            pairs = sorted((-tf / (tf + norms[item_id]), item_id) for item_id, tf in self._postings[term].items())
+            ids = [item_id for _, item_id in pairs]
+            ranking = self._rankings[term] = _Ranking(ids, [])
+            if len(ids) >= TIER_MIN_POSTINGS:
+                # Tiers are runs of the sorted ids, so the bitmaps cost one pass
+                slots = self._slots
+                start = 0
+                ends = [int(len(ids) * fraction) for fraction in TIER_FRACTIONS] + [len(ids)]
+                masks = []
+                for end in ends:
+                    if end < len(ids):
+                        edge = pairs[end][0]
+                        if ranking.edges and edge <= ranking.edges[-1]:
+                            continue
+                        # Ties with the edge belong to the tier it ends
+                        end = bisect_right(pairs, (edge, "\uffff"), lo=end)
+                        ranking.edges.append(edge)
+                    bits = bytearray(len(self._slot_ids) // 8 + 1)
+                    for i in range(start, end):
+                        slot = slots[ids[i]]
+                        bits[slot >> 3] |= 1 << (slot & 7)
+                    masks.append(int.from_bytes(bits, "little"))
+                    start = end
+                ranking.masks = masks
+        return ranking
+
+    def _tier_masks(self, term: str) -> List[int]:
+        """Slot bitmap of each impact tier of ``term``."""
+        ranking = self._ranking(term)
+        if ranking.masks is None and len(ranking.ids) >= TIER_MIN_POSTINGS:
+            # Grew past the threshold since it was ranked: split it into tiers
+            del self._rankings[term]
+            ranking = self._ranking(term)
+        if ranking.masks is not None:
+            return ranking.masks
+        slots = self._slots
+        bits = bytearray(len(self._slot_ids) // 8 + 1)
+        for item_id in ranking.ids:
+            slot = slots[item_id]
+            bits[slot >> 3] |= 1 << (slot & 7)
+        return [int.from_bytes(bits, "little")]
+
+    def _ids(self, mask: int) -> List[str]:
+        """Item ids of the slots set in ``mask``."""
+        slot_ids = self._slot_ids
+        if mask.bit_count() <= SPARSE_MASK_BITS:
+            # Peel off the highest bit: cheaper than scanning every byte
+            ids = []
+            while mask:
+                slot = mask.bit_length() - 1
+                ids.append(slot_ids[slot])
+                mask ^= 1 << slot
+            return ids
+        bits = mask.to_bytes(mask.bit_length() // 8 + 1, "little")
+        ids = []
+        for match in _NONZERO_BYTE.finditer(bits):
+            base = match.start() << 3
+            byte = bits[match.start()]
+            while byte:
+                low = byte & -byte
+                ids.append(slot_ids[base + low.bit_length() - 1])
+                byte ^= low
+        return ids
+
+    def _expand(self, token: str, prefix: bool) -> List[Tuple[str, float]]:
+        """Vocabulary terms a query token matches, with their weight."""
+        matches = [(token, 1.0)] if token in self._postings else []
+        if prefix and len(token) >= PREFIX_MIN_LENGTH:
+            start = bisect_left(self._vocabulary, token)
+            expansions = []
+            vocabulary = self._vocabulary
+            # Index from start: slicing (or islice) would cost O(vocabulary)
+            for i in range(start, len(vocabulary)):
+                term = vocabulary[i]
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    expansions.append(term)
+            # Keep the most common completions when the prefix is short
+            if len(expansions) > PREFIX_MAX_EXPANSIONS:
+                expansions = heapq.nlargest(PREFIX_MAX_EXPANSIONS, expansions, key=lambda t: len(self._postings[t]))
+            matches.extend((term, PREFIX_WEIGHT) for term in expansions)
+        return matches
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Tuple[str, float]], int]:
+        """Rank items against ``query``; returns ((id, score) page, total matches)."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._doc_terms:
+            return [], 0
+        avgdl = self._avgdl()
+        if abs(avgdl - self._norm_avgdl) > AVGDL_DRIFT * max(self._norm_avgdl, 1.0):
+            self._refresh_norms()
+
+        doc_count = len(self._doc_terms)
+        # One (term, BM25 factor) list per query word
+        words = []
+        for position, token in enumerate(tokens):
+            word = []
+            for term, weight in self._expand(token, prefix=position == len(tokens) - 1):
+                postings = self._postings[term]
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                word.append((term, weight * idf * (BM25_K1 + 1)))
+            if word:
+                words.append(word)
+        if not words:
+            return [], 0
+        terms = {term for word in words for term, _ in word}
+        if len(terms) == 1:
+            top = self._top(words, offset + limit, {})
+            return [(item_id, round(score, 4)) for score, item_id in top[offset:]], len(self._postings[terms.pop()])
+        tier_masks = {term: self._tier_masks(term) for term in terms}
+        union = 0
+        for masks in tier_masks.values():
+            for mask in masks:
+                union |= mask
+        top = self._top(words, offset + limit, tier_masks)
+        return [(item_id, round(score, 4)) for score, item_id in top[offset:]], union.bit_count()
+
+    def _top(
+        self,
+        words: List[List[Tuple[str, float]]],
+        k: int,
+        tier_masks: Dict[str, List[int]],
+    ) -> List[Tuple[float, str]]:
+        """The ``k`` best (score, id) pairs, best first."""
+        if k <= 0:
+            return []
+        norms = self._norms
+        scoring = [[(factor, self._postings[term]) for term, factor in word] for word in words]
+
+        def score(item_id: str) -> float:
+            norm = norms[item_id]
+            total = 0.0
+            for word in scoring:
+                # Best-matching term per word, so one word cannot score twice
+                best = 0.0
+                for factor, postings in word:
+                    tf = postings.get(item_id)
+                    if tf is not None:
+                        value = factor * tf / (tf + norm)
+                        if value > best:
+                            best = value
+                total += best
+            return total
+
+        heap: List[Tuple[float, str]] = []
+        seen = set()
+
+        def consider(item_id: str) -> None:
+            seen.add(item_id)
+            entry = (score(item_id), item_id)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        # The k highest impacts of every term. Exact for a single word (its
+        # score is its best term's), and fewer than k items only when every
+        # posting was read
+        for word in words:
+            for term, _ in word:
+                for item_id in self._ranking(term).ids[:k]:
+                    if item_id not in seen:
+                        consider(item_id)
+        if len(heap) < k or len(words) == 1:
+            return sorted(heap, reverse=True)
+
+        # Per word, (bound, bitmap) of its terms' tiers; a prefix word's tiers
+        # are merged (closest bounds first) down to one term's tier count
+        options = []
+        for word in words:
+            tiers = []
+            for term, factor in word:
+                ranking = self._ranking(term)
+                top_impact = -self._impact_key(term)(ranking.ids[0])[0]
+                bounds = [top_impact] + [-edge for edge in ranking.edges]
+                tiers.extend((factor * bound, mask) for bound, mask in zip(bounds, tier_masks[term]) if mask)
+            tiers.sort(key=lambda tier: tier[0], reverse=True)
+            while len(tiers) > len(TIER_FRACTIONS) + 1:
+                pos = max(range(1, len(tiers)), key=lambda i: tiers[i][0] / tiers[i - 1][0])
+                tiers[pos - 1:pos + 1] = [(tiers[pos - 1][0], tiers[pos - 1][1] | tiers[pos][1])]
+            options.append(tiers)
+        options.sort(key=lambda word_options: word_options[0][0], reverse=True)
+
+        # Best-first over tier combinations (one tier per word, or none).
+        # A partial combination's priority is its bound plus the best the
+        # remaining words can add, so complete ones come out in descending
+        # bound order; stop once none can beat the k-th score.
+        rest = [0.0] * (len(options) + 1)
+        for word in range(len(options) - 1, -1, -1):
+            rest[word] = rest[word + 1] + options[word][0][0]
+        order = itertools.count()
+        frontier: List[Tuple[float, int, int, Optional[int], float]] = [(-rest[0], next(order), 0, None, 0.0)]
+        while frontier:
+            priority, _, word, mask, reach = heapq.heappop(frontier)
+            if -priority <= heap[0][0]:
+                break
+            if word == len(options):
+                for item_id in self._ids(mask):
+                    if item_id not in seen:
+                        consider(item_id)
+                continue
+            remaining = rest[word + 1]
+            if reach + remaining > heap[0][0]:
+                heapq.heappush(frontier, (-(reach + remaining), next(order), word + 1, mask, reach))
+            for bound, tier_mask in options[word]:
+                if reach + bound + remaining <= heap[0][0]:
+                    break
+                narrowed = tier_mask if mask is None else mask & tier_mask
+                if narrowed:
+                    heapq.heappush(frontier, (-(reach + bound + remaining), next(order), word + 1, narrowed, reach + bound))
+        return sorted(heap, reverse=True)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key onto one in-flight task.
+
+    The shared task is shielded so a caller that disconnects does not cancel
+    the upstream call for everyone else awaiting the same key; it is
+    cancelled once the last caller awaiting it is cancelled.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self._waiters: Dict["asyncio.Future[Any]", int] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.started += 1
+
+            def _done(t: "asyncio.Future[Any]") -> None:
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                # Mark the exception retrieved even if every waiter went away
+                if not t.cancelled():
+                    t.exception()
+
+            task.add_done_callback(_done)
+        else:
+            self.coalesced += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                # Nobody is left to receive the result
+                task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
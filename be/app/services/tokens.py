@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional exact token counts
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a chat message envelope (role, separators) in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+# English prose averages about four characters per token
+CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text`` without a tokenizer."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+# Set by load_tokenizer; counts are estimated until then
+_encoding: Optional[Any] = None
+
+
+def load_tokenizer() -> bool:
+    """Load the tiktoken encoding; True if exact counts are now available.
+
+    The first load may download the encoding's BPE file, so this blocks:
+    run it in a worker thread, never on the event loop.
+    """
+    global _encoding
+    if _encoding is not None:
+        return True
+    if tiktoken is None:
+        return False
+    if settings.tokenizer_cache_dir:
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", settings.tokenizer_cache_dir)
+    try:
+        _encoding = tiktoken.get_encoding(settings.tokenizer_encoding)
+    except Exception as e:
+        # Unknown encoding, or its BPE file cannot be fetched (offline)
+        logger.warning(f"Tokenizer '{settings.tokenizer_encoding}' unavailable, estimating token counts: {e}")
+        return False
+    return True
+
+
+def tokenizer_name() -> str:
+    return settings.tokenizer_encoding if _encoding is not None else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    """Token count of ``text``: exact once ``load_tokenizer`` succeeded, else ``estimate_tokens``."""
+    encoding = _encoding
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Upper-bound token cost of a chat completion: prompt plus the completion cap."""
+    prompt = sum(estimate_tokens(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages)
+    return prompt + max_tokens
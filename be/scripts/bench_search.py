@@ -0,0 +1,123 @@
+"""Benchmark the published-content search index on a synthetic catalog.
+
+Run from be/:  python -m scripts.bench_search [sizes...]
+
+Items draw their words from a Zipf-distributed vocabulary (a few very
+common words, a long tail of rare ones), so queries mix terms that match
+most of the catalog with selective ones. Reports the index build time,
+the time to sync a reload that changed a few items, and per-query
+latency for a fixed query set including prefix-expanded last words: the
+first (cold) run, which ranks each term it touches, then median and p95
+over repeated runs.
+"""
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.services.search_index import SearchIndex  # noqa: E402
+
+VOCABULARY_SIZE = 40_000
+CONTENT_WORDS = 120
+QUERIES = [
+    "food",
+    "market food tour",
+    "temple",
+    "ancient temple walk",
+    "sunset beach bars",
+    "hidden",
+    "best street food in",
+    "ta",
+    "mu",
+    "tokyo ramen",
+    "lisbon tram viewpoint",
+    "quiet garden tea ceremony",
+]
+COMMON_WORDS = (
+    "the and of to in a is for with on at by from this best food market tour walk city "
+    "old street local beach sunset temple garden museum night bars coffee hidden view "
+    "ancient quiet tea ceremony ramen tram viewpoint river park harbour square"
+).split()
+DESTINATIONS = ["Tokyo", "Lisbon", "Kyoto", "Oaxaca", "Marrakesh", "Hanoi", "Porto", "Seville", "Istanbul", "Cusco"]
+TAGS = ["Food", "Culture", "Nightlife", "Nature", "History", "Markets", "Beaches", "Art", "Budget", "Luxury"]
+
+
+def _vocabulary(rng: random.Random) -> List[str]:
+    letters = "abcdefghijklmnoprstuvy"
+    words = set(COMMON_WORDS)
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    rest = sorted(words - set(COMMON_WORDS))
+    rng.shuffle(rest)
+    return COMMON_WORDS + rest
+
+
+def make_items(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng)
+    # Zipf weights: rank r is drawn with probability ~ 1 / r
+    cumulative = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1.0 / rank
+        cumulative.append(total)
+
+    def words(n: int) -> str:
+        return " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=n))
+
+    return [
+        {
+            "id": f"pub_{i:07d}",
+            "title": words(7).capitalize(),
+            "destination": rng.choice(DESTINATIONS),
+            "tags": rng.sample(TAGS, 3),
+            "highlights": [words(5), words(5)],
+            "neighborhoods": [words(2)],
+            "recommended_spots": [words(3), words(3)],
+            "content": words(CONTENT_WORDS),
+        }
+        for i in range(count)
+    ]
+
+
+def main(sizes: List[int], repeat: int = 20) -> None:
+    for size in sizes:
+        items = make_items(size)
+        index = SearchIndex()
+        started = time.perf_counter()
+        index.rebuild(items)
+        build_ms = (time.perf_counter() - started) * 1000
+        print(f"{size} items: rebuild {build_ms:.0f} ms")
+        print(f"  {'query':<28} | {'matches':>8} | {'cold ms':>8} | {'median ms':>9} | {'p95 ms':>7}")
+        all_timings = []
+        for query in QUERIES:
+            timings = []
+            for _ in range(repeat + 1):
+                started = time.perf_counter()
+                _, total = index.search(query, limit=20)
+                timings.append((time.perf_counter() - started) * 1000)
+            cold = timings.pop(0)
+            timings.sort()
+            all_timings.extend(timings)
+            p95 = timings[int(0.95 * (len(timings) - 1))]
+            print(f"  {query:<28} | {total:>8} | {cold:>8.1f} | {statistics.median(timings):>9.2f} | {p95:>7.2f}")
+        all_timings.sort()
+        print(f"  {'all queries (warm)':<28} | {'':>8} | {'':>8} | {statistics.median(all_timings):>9.2f} | "
+              f"{all_timings[int(0.95 * (len(all_timings) - 1))]:>7.2f}")
+        # A reload as another process sees it: fresh objects, 50 edits, 50 deletes
+        reloaded = [dict(item) for item in items[50:]]
+        for item in reloaded[:50]:
+            item["title"] += " updated"
+        started = time.perf_counter()
+        index.sync(reloaded)
+        print(f"  sync after reload: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
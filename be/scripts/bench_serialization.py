@@ -0,0 +1,116 @@
+"""Benchmark publish store and /published serialization, old path vs new.
+
+Run from be/:  python -m scripts.bench_serialization [sizes...]
+
+"before" is stdlib json with indent=2 (store) and Pydantic models plus
+FastAPI's default encoding (responses); "after" is app.services.codec
+(orjson when installed) and the projected-dict response path. The
+summary row compares a full listing with ``fields=summary``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Importing the routes opens the publish store: keep it off the real data
+_data_dir = tempfile.mkdtemp(prefix="be-bench-")
+os.environ.setdefault("PUBLISH_STORE_PATH", os.path.join(_data_dir, "published_content.json"))
+os.environ.setdefault("PUBLISH_SQLITE_PATH", os.path.join(_data_dir, "published_content.db"))
+os.environ.setdefault("IMAGE_STORAGE_DIR", os.path.join(_data_dir, "images"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.api.v1.routes.content import SUMMARY_FIELDS  # noqa: E402
+from app.schemas.content import PublishedContentItem, PublishedContentResponse  # noqa: E402
+from app.services import codec  # noqa: E402
+from app.services.publish_migrations import SCHEMA_VERSION  # noqa: E402
+
+FIELDS = tuple(PublishedContentItem.model_fields)
+
+
+def make_items(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": f"pub_{1757000000000 + i}",
+            "title": f"Savour the flavours of Tsukiji, stop {i}",
+            "content": "Wander the outer market stalls for tamagoyaki, fresh uni and matcha. " * 8,
+            "type": "Blog Post",
+            "reading_time": "4 min",
+            "quality": "High",
+            "tags": ["Food", "Markets", "Tokyo"],
+            "highlights": ["Arrive before 9am", "Bring cash"],
+            "neighborhoods": ["Tsukiji", "Ginza"],
+            "recommended_spots": ["Tsukiji Outer Market", "Namiyoke Shrine"],
+            "price_range": "¥1,000–3,000",
+            "best_times": "Weekday mornings",
+            "cautions": None,
+            "destination": "Tōkyō",
+            "image_url": None,
+            "status": "Published",
+            "location": "Tōkyō",
+            "date": "09/05/2025",
+            "time": "03:11 PM",
+            "views": i % 500,
+            "shares": i % 40,
+            "engagement_rate": 12.5,
+            "growth_rate": 3.0,
+            "created_at": "2025-09-05T15:11:25.044356",
+            "last_viewed": None,
+        }
+        for i in range(count)
+    ]
+
+
+def best_of(fn: Callable[[], Any], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def response_before(items: List[Dict[str, Any]]) -> bytes:
+    model = PublishedContentResponse(items=[PublishedContentItem(**item) for item in items], total=len(items))
+    return json.dumps(jsonable_encoder(model), ensure_ascii=False).encode("utf-8")
+
+
+def response_after(items: List[Dict[str, Any]], fields: tuple = FIELDS) -> bytes:
+    projected = [{field: item.get(field) for field in fields} for item in items]
+    return codec.dumps({"items": projected, "total": len(items), "next_cursor": None})
+
+
+def main(sizes: List[int]) -> None:
+    print(f"codec backend: {codec.backend}")
+    header = f"{'items':>7} | {'case':<26} | {'before ms':>10} | {'after ms':>10} | {'speedup':>7}"
+    print(header)
+    print("-" * len(header))
+    for size in sizes:
+        items = make_items(size)
+        store = {"schema_version": SCHEMA_VERSION, "seq": size, "items": items}
+        indented = json.dumps(store, ensure_ascii=False, indent=2)
+        compact = codec.dumps(store)
+        cases = [
+            ("store write (indented)", lambda: json.dumps(store, ensure_ascii=False, indent=2),
+             lambda: codec.dumps(store, indent=True)),
+            ("store write (compact)", lambda: json.dumps(store, ensure_ascii=False, indent=2),
+             lambda: codec.dumps(store)),
+            ("store read", lambda: json.loads(indented), lambda: codec.loads(compact)),
+            ("/published response", lambda: response_before(items), lambda: response_after(items)),
+            ("/published full -> summary", lambda: response_after(items),
+             lambda: response_after(items, SUMMARY_FIELDS)),
+        ]
+        for name, before, after in cases:
+            before_ms, after_ms = best_of(before), best_of(after)
+            print(f"{size:>7} | {name:<26} | {before_ms:>10.1f} | {after_ms:>10.1f} | {before_ms / after_ms:>6.1f}x")
+        print(f"{size:>7} | size indented {len(indented.encode()) / 1e6:.1f} MB, compact {len(compact) / 1e6:.1f} MB, "
+              f"summary response {len(response_after(items, SUMMARY_FIELDS)) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000])
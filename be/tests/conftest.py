@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# Settings require a key at import time; tests never call the API
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+# Importing the routes opens the publish store: keep it off the checked-in data
+_data_dir = tempfile.mkdtemp(prefix="be-tests-")
+os.environ.setdefault("PUBLISH_STORE_PATH", os.path.join(_data_dir, "published_content.json"))
+os.environ.setdefault("PUBLISH_SQLITE_PATH", os.path.join(_data_dir, "published_content.db"))
+os.environ.setdefault("IMAGE_STORAGE_DIR", os.path.join(_data_dir, "images"))
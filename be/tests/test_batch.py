@@ -0,0 +1,101 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.v1.routes import content
+from app.schemas.content import ContentRequest, ContentResponse
+from app.services import batch
+from app.services.batch import Budget, BudgetExceededError
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Replace the completion with a fake that records each destination."""
+    calls = []
+    state = SimpleNamespace(calls=calls, hold=None, cancelled=0)
+
+    async def fake_generate(payload):
+        calls.append(payload.destination)
+        if state.hold is not None:
+            try:
+                await state.hold.wait()
+            except asyncio.CancelledError:
+                state.cancelled += 1
+                raise
+        return ContentResponse(suggestions=[])
+
+    monkeypatch.setattr(content, "_generate_content", fake_generate)
+    monkeypatch.setattr(content, "_content_prompt", lambda payload: SimpleNamespace(request_tokens=100))
+    return state
+
+
+def _run_batch(destinations, budget):
+    async def collect():
+        requests = [ContentRequest(destination=d) for d in destinations]
+        return [json.loads(line) async for line in content._batch_lines(requests, 4, budget)]
+
+    lines = asyncio.run(collect())
+    return lines[:-1], lines[-1]
+
+
+def test_duplicate_items_share_one_reservation_and_completion(upstream):
+    budget = Budget()
+    results, summary = _run_batch(["Lisbon", "Porto", "lisbon "], budget)
+    assert sorted(upstream.calls) == ["Lisbon", "Porto"]
+    assert [r["status"] for r in results] == ["ok"] * 3
+    assert summary["budget"]["requests"] == 2
+    assert summary["budget"]["tokens"] == 200
+
+
+def test_spent_batch_budget_reports_items_without_calling_upstream(upstream):
+    results, summary = _run_batch(["Lisbon", "Porto", "Kyoto"], Budget(max_tokens=250))
+    errors = [r["error"] for r in results if r["status"] == "error"]
+    assert len(upstream.calls) == 2
+    assert errors == [{"status": 429, "message": "Not started: batch token budget of 250 spent (200 reserved)"}]
+    assert summary["succeeded"] == 2 and summary["failed"] == 1
+
+
+def test_global_budget_caps_every_batch(upstream):
+    shared = Budget(max_requests=3, name="global")
+    _run_batch(["Lisbon", "Porto"], Budget(parent=shared))
+    results, summary = _run_batch(["Kyoto", "Hanoi"], Budget(parent=shared))
+    assert len(upstream.calls) == 3
+    assert [r["error"]["message"] for r in results if r["status"] == "error"] == [
+        "Not started: global request budget of 3 spent"
+    ]
+    # The refused item is not charged to its batch either
+    assert summary["budget"]["requests"] == 1
+
+
+def test_budget_resets_each_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(batch.time, "monotonic", lambda: now[0])
+    budget = Budget(max_requests=1, window=60)
+    budget.reserve(10)
+    with pytest.raises(BudgetExceededError):
+        budget.reserve(10)
+    now[0] += 60
+    budget.reserve(10)
+    assert budget.stats()["requests"] == 1
+
+
+def test_closing_a_batch_cancels_its_upstream_calls(upstream):
+    async def scenario():
+        upstream.hold = asyncio.Event()
+        lines = content._batch_lines([ContentRequest(destination="Lisbon")], 4, Budget())
+        first = asyncio.ensure_future(lines.__anext__())
+        while not upstream.calls:
+            await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await lines.aclose()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        # Checked before asyncio.run cancels whatever is left
+        assert upstream.cancelled == 1
+        assert content.generate_flight.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
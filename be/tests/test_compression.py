@@ -0,0 +1,88 @@
+import gzip
+from types import SimpleNamespace
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.services import compression
+from app.services.compression import CompressionMiddleware
+
+BODY = b'{"items": "' + b"x" * 4096 + b'"}'
+
+
+def _json(request):
+    return Response(BODY, media_type="application/json")
+
+
+def _not_modified(request):
+    return Response(status_code=304, headers={"ETag": '"v1"'})
+
+
+def _stream(request):
+    async def chunks():
+        yield BODY
+        yield BODY
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[Route("/json", _json), Route("/304", _not_modified), Route("/stream", _stream)])
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+
+@pytest.fixture
+def fake_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", SimpleNamespace(compress=lambda body, quality: b"br:" + body[:8]))
+
+
+def _choose(header):
+    return CompressionMiddleware(None)._choose_encoding({"type": "http", "headers": [(b"accept-encoding", header.encode())]})
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0.5, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("*;q=0.1, br;q=0", "gzip"),
+    ("*, gzip;q=0, br;q=0", None),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("", None),
+])
+def test_accept_encoding_negotiation(fake_brotli, header, expected):
+    assert _choose(header) == expected
+
+
+def test_brotli_is_skipped_when_not_installed(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert _choose("br") is None
+    assert _choose("br, *;q=0.5") == "gzip"
+
+
+def test_complete_body_is_compressed(client):
+    response = client.get("/json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.content == BODY  # decoded by the client
+    assert int(response.headers["content-length"]) == len(gzip.compress(BODY, compresslevel=6, mtime=0))
+
+
+def test_not_modified_passes_through(client):
+    response = client.get("/304", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 304
+    assert "content-encoding" not in response.headers
+    assert response.content == b""
+
+
+def test_streamed_response_passes_through(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.content == BODY * 2
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.services.counter_buffer import CounterBuffer, run_flusher
+from app.services.publish_store import LogPublishStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LogPublishStore(str(tmp_path / "published.json"))
+    store.insert({"id": "pub_1", "title": "Item", "content": "text", "views": 0, "shares": 0})
+    yield store
+    store.close()
+
+
+def test_failed_flush_keeps_pending_deltas(store, monkeypatch):
+    buffer = CounterBuffer(store, max_pending=100)
+    buffer.record("pub_1", views=1)
+    buffer.record("pub_1", views=1, shares=1)
+
+    def fail(deltas):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "increment_many", fail)
+    with pytest.raises(OSError):
+        buffer.flush()
+    assert buffer.stats()["pending_events"] == 2
+    assert buffer.stats()["failures"] == 1
+    # Still overlaid on reads, then written by the next flush
+    assert buffer.overlay(store.get("pub_1"))["views"] == 2
+
+    monkeypatch.undo()
+    assert buffer.flush() == 2
+    assert store.get("pub_1")["views"] == 2
+    assert store.get("pub_1")["shares"] == 1
+
+
+def test_full_buffer_wakes_the_flusher_instead_of_writing_inline(store, monkeypatch):
+    buffer = CounterBuffer(store, max_pending=2)
+    written = []
+    increment_many = store.increment_many
+    monkeypatch.setattr(store, "increment_many", lambda deltas: written.append(len(deltas)) or increment_many(deltas))
+
+    async def scenario():
+        flusher = asyncio.create_task(run_flusher(buffer, interval=60))
+        await asyncio.sleep(0)
+        buffer.record("pub_1", views=1)
+        buffer.record("pub_1", views=1)
+        assert written == []  # record returned without writing
+        for _ in range(100):
+            if written:
+                break
+            await asyncio.sleep(0.01)
+        flusher.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flusher
+
+    asyncio.run(scenario())
+    assert written == [1]
+    assert store.get("pub_1")["views"] == 2
+
+
+def test_flush_replaces_items_instead_of_mutating_them(store):
+    buffer = CounterBuffer(store, max_pending=100)
+    before = store.get("pub_1")
+    buffer.record("pub_1", views=3)
+    buffer.flush()
+    assert before["views"] == 0
+    assert store.get("pub_1")["views"] == 3
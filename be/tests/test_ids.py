@@ -0,0 +1,43 @@
+from app.services import ids
+from app.services.ids import UlidGenerator
+
+
+def _frozen_clock(monkeypatch, ms):
+    now = [ms]
+    monkeypatch.setattr(ids.time, "time", lambda: now[0] / 1000)
+    return now
+
+
+def _random(ulid):
+    value = 0
+    for char in ulid[10:]:
+        value = value * 32 + ids._ALPHABET.index(char)
+    return value
+
+
+def test_ids_within_one_millisecond_increase(monkeypatch):
+    _frozen_clock(monkeypatch, 1_700_000_000_000)
+    generator = UlidGenerator()
+    generated = [generator.new() for _ in range(1000)]
+    assert generated == sorted(generated) and len(set(generated)) == 1000
+    assert {ulid[:10] for ulid in generated} == {generated[0][:10]}
+    randoms = [_random(ulid) for ulid in generated]
+    assert randoms == list(range(randoms[0], randoms[0] + 1000))
+
+
+def test_clock_stepping_back_keeps_order(monkeypatch):
+    now = _frozen_clock(monkeypatch, 1_700_000_000_000)
+    generator = UlidGenerator()
+    first = generator.new()
+    now[0] -= 5000
+    assert generator.new() > first
+
+
+def test_exhausted_millisecond_borrows_the_next(monkeypatch):
+    _frozen_clock(monkeypatch, 1_700_000_000_000)
+    generator = UlidGenerator()
+    first = generator.new()
+    generator._last_random = ids._RANDOM_MAX
+    second = generator.new()
+    assert second > first
+    assert second[:10] == ids._encode(1_700_000_000_001, 10)
@@ -0,0 +1,37 @@
+import asyncio
+
+from app.services.image_store import FakeImageBackend, ImagePipeline
+from app.services.publish_migrations import migrate_store
+
+
+def _pipeline(tmp_path, base_url):
+    return ImagePipeline(str(tmp_path), "/static/images", FakeImageBackend(), base_url=base_url)
+
+
+def test_stored_urls_survive_a_host_change(tmp_path):
+    pipeline = _pipeline(tmp_path, "http://localhost:8000")
+    stored = asyncio.run(pipeline.generate("harbour at dusk"))
+    assert stored.url.startswith("/static/images/")
+    # A client sends back the public URL it was given; it is stored as a path
+    path = pipeline.stored_url(pipeline.public_url(stored.url))
+    assert path == stored.url
+    assert pipeline.variants_for_url(path) == stored.variants
+
+    moved = _pipeline(tmp_path, "https://cdn.example.com")
+    assert moved.public_url(path) == f"https://cdn.example.com{path}"
+    assert moved.public_url("https://example.com/a.jpg") == "https://example.com/a.jpg"
+    assert moved.stored_url("https://example.com/a.jpg") == "https://example.com/a.jpg"
+
+
+def test_migration_strips_the_host_from_stored_images():
+    digest = "ab" + "0" * 62
+    absolute = f"http://localhost:8000/static/images/ab/{digest}-full.jpg"
+    data = {"schema_version": 3, "items": [
+        {"id": "a", "title": "A", "image_url": absolute, "image_variants": {"full": absolute}},
+        {"id": "b", "title": "B", "image_url": "https://example.com/a.jpg", "image_variants": None},
+    ]}
+    assert migrate_store(data)
+    first, second = data["items"]
+    assert first["image_url"] == f"/static/images/ab/{digest}-full.jpg"
+    assert first["image_variants"] == {"full": f"/static/images/ab/{digest}-full.jpg"}
+    assert second["image_url"] == "https://example.com/a.jpg"
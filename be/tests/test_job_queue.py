@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.routes import content
+from app.schemas.content import ImageGenerationRequest
+from app.services.job_queue import FAILED, SUCCEEDED, JobQueue, QueueFullError
+
+
+def _queue(**overrides):
+    options = {"concurrency": 1, "max_pending": 2, "retention_seconds": 60}
+    return JobQueue("test", **{**options, **overrides})
+
+
+def _gate():
+    """A job body that runs until the returned event is set."""
+    release = asyncio.Event()
+
+    async def run():
+        await release.wait()
+        return "done"
+
+    return release, run
+
+
+def test_identical_keys_share_one_job():
+    async def scenario():
+        queue = _queue()
+        queue.start()
+        release, run = _gate()
+        job, deduplicated = queue.submit("k", run)
+        again, deduplicated_again = queue.submit("k", run)
+        assert (deduplicated, deduplicated_again) == (False, True)
+        assert again is job
+        release.set()
+        await job.done.wait()
+        assert (job.status, job.result) == (SUCCEEDED, "done")
+        # reuse_seconds=0: a finished job is not handed out again
+        fresh, deduplicated = queue.submit("k", run)
+        assert fresh is not job and not deduplicated
+        await queue.stop()
+        assert queue.stats()["deduplicated"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_new_keys():
+    async def scenario():
+        queue = _queue(max_pending=1)
+        queue.start()
+        release, run = _gate()
+        queue.submit("running", run)
+        await asyncio.sleep(0)  # the worker picks it up
+        queue.submit("waiting", run)
+        with pytest.raises(QueueFullError):
+            queue.submit("rejected", run)
+        # A duplicate of a waiting job is still served
+        assert queue.submit("waiting", run)[1]
+        release.set()
+        await queue.stop()
+        assert queue.stats()["rejected"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_image_queue_is_a_503(monkeypatch):
+    async def scenario():
+        queue = _queue(max_pending=1)
+        monkeypatch.setattr(content, "image_jobs", queue)
+        queue.start()
+        release, run = _gate()
+        queue.submit("running", run)
+        await asyncio.sleep(0)
+        queue.submit("waiting", run)
+        payload = ImageGenerationRequest(
+            title="Tram 28", content="Ride early", destination="Lisbon",
+            tags=[], neighborhoods=["Alfama"], recommended_spots=["Miradouro"],
+        )
+        with pytest.raises(HTTPException) as raised:
+            content._submit_image_job(payload)
+        assert raised.value.status_code == 503
+        assert raised.value.headers["Retry-After"] == "10"
+        release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_finished_jobs_are_pruned_past_unfinished_ones():
+    async def scenario():
+        queue = _queue(concurrency=2, max_pending=5, retention_seconds=0.05)
+        queue.start()
+        stuck_release, stuck = _gate()
+        quick_release, quick = _gate()
+        quick_release.set()
+        slow, _ = queue.submit("slow", stuck)
+        fast, _ = queue.submit("fast", quick)
+        await fast.done.wait()
+
+        await asyncio.sleep(0.06)
+        # The older, still running job does not shield the expired one behind it
+        assert queue.get(fast.id) is None
+        assert queue.get(slow.id) is slow
+        assert not queue.submit("fast", quick)[1]
+        stuck_release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stop_finishes_queued_and_running_jobs():
+    async def scenario():
+        queue = _queue()
+        queue.start()
+        _, run = _gate()
+        running, _ = queue.submit("running", run)
+        await asyncio.sleep(0)
+        waiting, _ = queue.submit("waiting", run)
+        await queue.stop()
+        for job in (running, waiting):
+            assert job.done.is_set()
+            assert (job.status, job.error) == (FAILED, "Cancelled")
+
+    asyncio.run(scenario())
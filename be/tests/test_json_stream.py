@@ -0,0 +1,51 @@
+import json
+import random
+
+import pytest
+
+from app.services.json_stream import ArrayStreamParser
+
+SUGGESTIONS = [
+    {"title": 'Tram "28"', "content": "Ride {early} [or late] \\ avoid queues", "tags": ["a", "b"]},
+    {"title": "Pastéis", "content": "Belém\nbakery", "spots": [{"name": "x"}]},
+    {"title": "Miradouro", "content": "\\\"quoted\\\"", "tags": []},
+]
+
+
+def _feed_in_chunks(parser, text, sizes):
+    objects = []
+    pos = 0
+    while pos < len(text):
+        size = next(sizes)
+        objects.extend(parser.feed(text[pos:pos + size]))
+        pos += size
+    return objects
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_objects_survive_any_chunking(seed):
+    text = "```json\n" + json.dumps({"intro": "[x]", "suggestions": SUGGESTIONS, "after": [1]}) + "\n```"
+    rng = random.Random(seed)
+    sizes = iter(lambda: rng.randint(1, 7), None)
+    parser = ArrayStreamParser("suggestions")
+    assert _feed_in_chunks(parser, text, sizes) == SUGGESTIONS
+    assert parser.done
+
+
+def test_bare_top_level_array():
+    parser = ArrayStreamParser("suggestions")
+    text = "Here you go: " + json.dumps(SUGGESTIONS)
+    assert _feed_in_chunks(parser, text, iter(lambda: 5, None)) == SUGGESTIONS
+    assert parser.done
+
+
+def test_brackets_in_leading_prose_are_not_the_answer():
+    parser = ArrayStreamParser("suggestions")
+    text = "Sources [1] and [2]: " + json.dumps({"suggestions": SUGGESTIONS[:1]})
+    assert parser.feed(text) == SUGGESTIONS[:1]
+
+
+def test_only_the_unfinished_object_is_kept():
+    parser = ArrayStreamParser("suggestions")
+    parser.feed('{"suggestions": [' + json.dumps(SUGGESTIONS[0]) + ", " + '{"title": "par')
+    assert "".join(parser._object) == '{"title": "par'
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import llm
+from app.services.model_router import ModelRouter
+
+
+@pytest.fixture
+def router(monkeypatch):
+    router = ModelRouter(["primary", "backup"], failure_threshold=3, cooldown_seconds=30, not_found_cooldown_seconds=600)
+    monkeypatch.setattr(llm, "model_router", router)
+    monkeypatch.setattr(llm, "_hedge_delay", lambda model: 0.05)
+    return router
+
+
+def _fake_attempts(monkeypatch, delays):
+    """Each model answers with its own name after its delay; records cancellations."""
+    cancelled = []
+
+    async def attempt(model, messages, parse, operation, params, prompt_tokens=None):
+        try:
+            await asyncio.sleep(delays[model])
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return model
+
+    monkeypatch.setattr(llm, "_attempt", attempt)
+    return cancelled
+
+
+def _hedged(models):
+    return asyncio.run(llm._complete_hedged(iter(models), [], None, "test", {}))
+
+
+def test_fast_primary_wins_without_a_hedge(router, monkeypatch):
+    cancelled = _fake_attempts(monkeypatch, {"primary": 0.01, "backup": 0.01})
+    assert _hedged(["primary", "backup"]) == "primary"
+    assert cancelled == []
+    assert router.latency_percentile("primary", 95) is None
+
+
+def test_slow_primary_loses_to_the_backup_and_is_recorded(router, monkeypatch):
+    cancelled = _fake_attempts(monkeypatch, {"primary": 5, "backup": 0.01})
+    assert _hedged(["primary", "backup"]) == "backup"
+    assert cancelled == ["primary"]
+    # The cancelled primary still counts, with at least the time it ran
+    assert router.latency_percentile("primary", 95) >= 0.05
+
+
+def test_primary_can_still_win_after_the_hedge_fires(router, monkeypatch):
+    cancelled = _fake_attempts(monkeypatch, {"primary": 0.1, "backup": 5})
+    assert _hedged(["primary", "backup"]) == "primary"
+    assert cancelled == ["backup"]
+    assert router.latency_percentile("backup", 95) >= 0.04
+
+
+def test_unparsable_output_does_not_open_the_circuit(router, monkeypatch):
+    response = SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content="not json"))])
+
+    async def call_limited(limiter, tokens, call, usage=None, prompt_tokens=None):
+        return response
+
+    def parse(content, model):
+        raise llm.LLMOutputError("unrecoverable output")
+
+    monkeypatch.setattr(llm, "call_limited", call_limited)
+    for _ in range(5):
+        assert router.acquire("primary")
+        with pytest.raises(llm.LLMOutputError):
+            asyncio.run(llm._attempt("primary", [], parse, "test", {}))
+    stats = router.stats()["primary"]
+    assert (stats["state"], stats["failures"], stats["output_errors"]) == ("closed", 0, 5)
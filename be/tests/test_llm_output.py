@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from app.services.llm import LLMOutputError
+from app.services.llm_output import parse_llm_json, repair_json
+
+
+def _repaired(text):
+    fixed, repairs, truncated = repair_json(text)
+    return json.loads(fixed), repairs, truncated
+
+
+def test_unescaped_quote_before_comma_stays_in_string():
+    data, repairs, _ = _repaired('{"a": "b is "great", really", "c": 1}')
+    assert data == {"a": 'b is "great", really', "c": 1}
+    assert "unescaped quote" in repairs
+
+
+def test_unescaped_quote_before_comma_in_array():
+    data, _, _ = _repaired('["x "y", z", "w"]')
+    assert data == ['x "y", z', "w"]
+
+
+def test_unescaped_quotes_before_next_key():
+    data, _, _ = _repaired('{"title": "The "Best" bar", "content": "ok"}')
+    assert data == {"title": 'The "Best" bar', "content": "ok"}
+
+
+def test_trailing_commas_and_python_literals():
+    data, repairs, truncated = _repaired('{"tags": ["x", "y",], "price": None,}')
+    assert data == {"tags": ["x", "y"], "price": None}
+    assert not truncated
+    assert {"trailing comma", "python literal"} <= set(repairs)
+
+
+def test_truncated_output_keeps_complete_elements():
+    text = '{"suggestions": [{"title": "a"}, {"title": "b"}, {"title": "c", "content": "thr'
+    data, _, truncated = _repaired(text)
+    assert truncated
+    assert data == {"suggestions": [{"title": "a"}, {"title": "b"}]}
+
+
+def test_truncated_inside_first_element_leaves_empty_list():
+    # Callers must treat this as unusable, not as an empty answer
+    data = parse_llm_json('{"places": [{"name": "x", "count": 12', kind="test", list_key="places")
+    assert data == {"places": []}
+
+
+def test_fenced_reply_with_prose():
+    text = 'Here you go:\n```json\n{"places": [{"name": "A"}]}\n```\nEnjoy!'
+    assert parse_llm_json(text, kind="test") == {"places": [{"name": "A"}]}
+
+
+def test_unrecoverable_output_raises():
+    with pytest.raises(LLMOutputError):
+        parse_llm_json("I cannot help with that.", kind="test", list_key="places")
@@ -0,0 +1,73 @@
+import pytest
+
+from app.services import model_router as router_module
+from app.services.model_router import CLOSED, HALF_OPEN, OPEN, ModelRouter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(router_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _router():
+    return ModelRouter(["primary", "backup"], failure_threshold=2, cooldown_seconds=30, not_found_cooldown_seconds=600)
+
+
+def _state(router, model):
+    return router.stats()[model]["state"]
+
+
+def test_breaker_opens_then_probes_then_closes(clock):
+    router = _router()
+    router.record_failure("primary")
+    assert _state(router, "primary") == CLOSED
+    router.record_failure("primary")
+    assert _state(router, "primary") == OPEN
+    assert router.candidates() == ["backup"]
+
+    clock[0] += 30
+    assert router.candidates() == ["backup", "primary"]
+    assert _state(router, "primary") == HALF_OPEN
+    # Exactly one probe at a time
+    assert router.acquire("primary")
+    assert not router.acquire("primary")
+    assert router.candidates() == ["backup"]
+
+    router.record_success("primary", 0.5)
+    assert _state(router, "primary") == CLOSED
+    assert router.candidates()[0] == "primary"
+
+
+def test_failed_probe_reopens(clock):
+    router = _router()
+    router.record_failure("primary", permanent=True)
+    clock[0] += 600
+    router.candidates()
+    assert router.acquire("primary")
+    router.record_failure("primary")
+    assert _state(router, "primary") == OPEN
+    clock[0] += 29
+    assert router.candidates() == ["backup"]
+
+
+def test_released_probe_can_be_retried(clock):
+    router = _router()
+    router.record_failure("primary", permanent=True)
+    clock[0] += 600
+    router.candidates()
+    assert router.acquire("primary")
+    router.release("primary")
+    assert router.acquire("primary")
+
+
+def test_abandoned_attempts_raise_the_latency_percentile():
+    router = _router()
+    for _ in range(9):
+        router.record_success("primary", 1.0)
+    assert router.latency_percentile("primary", 90) == 1.0
+    # Lost a hedge race after running 8 s: it would have taken at least that
+    router.record_abandoned("primary", 8.0)
+    assert router.latency_percentile("primary", 95) == 8.0
+    assert router.stats()["primary"]["successes"] == 9
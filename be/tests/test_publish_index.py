@@ -0,0 +1,79 @@
+import base64
+import json
+
+import pytest
+
+from app.services.publish_index import InvalidCursorError, PublishIndex
+
+
+def _item(n, views=0):
+    return {"id": f"pub_{n:03d}", "created_at": f"2025-01-01T00:{n // 60:02d}:{n % 60:02d}", "views": views}
+
+
+def _pages(index, items, sort="created_at", limit=10, inserts=()):
+    """Walk every page, inserting ``inserts[i]`` (a list of items) after page i."""
+    seen, cursor, page_no = [], None, 0
+    while True:
+        page = index.query(items, sort=sort, cursor=cursor, limit=limit)
+        seen.extend(item["id"] for item in page.items)
+        for item in inserts[page_no] if page_no < len(inserts) else ():
+            items[item["id"]] = item
+            index.add(item)
+        page_no += 1
+        cursor = page.next_cursor
+        if cursor is None:
+            return seen
+
+
+def _catalog(count, views=lambda n: 0):
+    items = {f"pub_{n:03d}": _item(n, views(n)) for n in range(count)}
+    index = PublishIndex()
+    index.rebuild(list(items.values()))
+    return index, items
+
+
+def test_pages_cover_every_item_once():
+    index, items = _catalog(35)
+    assert _pages(index, items) == [f"pub_{n:03d}" for n in reversed(range(35))]
+
+
+@pytest.mark.parametrize("sort", ["created_at", "views"])
+def test_inserts_between_pages_neither_repeat_nor_skip_items(sort):
+    index, items = _catalog(35, views=lambda n: n % 7)
+    before = set(items)
+    # After each page: one item sorting before the cursor, one after it
+    inserts = [
+        [{**_item(100 + n, views=9), "created_at": "2026-01-01"}, {**_item(200 + n, views=-1), "created_at": "2024-01-01"}]
+        for n in range(3)
+    ]
+    seen = _pages(index, items, sort=sort, inserts=inserts)
+    assert len(seen) == len(set(seen))
+    assert before <= set(seen)
+    assert not {f"pub_{100 + n}" for n in range(3)} & set(seen)
+
+
+def test_cursor_keeps_its_place_when_its_item_is_deleted():
+    index, items = _catalog(20)
+    first = index.query(items, limit=5)
+    index.remove(first.items[-1]["id"])
+    second = index.query(items, cursor=first.next_cursor, limit=5)
+    assert [item["id"] for item in second.items] == [f"pub_{n:03d}" for n in range(14, 9, -1)]
+
+
+def _cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor, sort", [
+    ("not-a-cursor!", "created_at"),
+    (_cursor(["created_at", ["2025-01-01", "pub_001"]]), "views"),
+    (_cursor(["views", ["many", "2025-01-01", "pub_001"]]), "views"),
+    (_cursor(["views", [True, "2025-01-01", "pub_001"]]), "views"),
+    (_cursor(["created_at", [{"a": 1}, "pub_001"]]), "created_at"),
+    (_cursor(["created_at", ["2025-01-01"]]), "created_at"),
+    (_cursor({"sort": "created_at"}), "created_at"),
+])
+def test_invalid_cursors_are_rejected(cursor, sort):
+    index, items = _catalog(5)
+    with pytest.raises(InvalidCursorError):
+        index.query(items, sort=sort, cursor=cursor, limit=2)
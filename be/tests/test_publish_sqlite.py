@@ -0,0 +1,88 @@
+import json
+import sqlite3
+
+import pytest
+
+from app.services import publish_sqlite
+from app.services.publish_migrations import SCHEMA_VERSION
+from app.services.publish_sqlite import SCHEMA, SQLitePublishStore
+
+
+def _item(n, **fields):
+    return {"id": f"pub_{n}", "title": f"Item {n}", "content": "text", "destination": "Lisbon", **fields}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "published.db")
+
+
+def test_writes_from_another_connection_are_picked_up(db_path):
+    reader = SQLitePublishStore(db_path)
+    writer = SQLitePublishStore(db_path)
+    try:
+        reader.insert(_item(1))
+        version = reader.version()
+        assert reader.search("lisbon")[1] == 1
+
+        writer.insert(_item(2, title="Harbour ferries"))
+        writer.update("pub_1", {"title": "Tram 28"})
+
+        # data_version changed: the reader reloads its cache, indexes and version
+        assert len(reader) == 2
+        assert reader.version() > version
+        assert reader.get("pub_1")["title"] == "Tram 28"
+        assert [item["id"] for item, _ in reader.search("ferries")[0]] == ["pub_2"]
+        assert reader.query(filters={"destination": "lisbon"}).total == 2
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_own_writes_do_not_trigger_a_reload(db_path, monkeypatch):
+    store = SQLitePublishStore(db_path)
+    try:
+        store.insert(_item(1))
+        reloads = []
+        monkeypatch.setattr(store._search, "sync", lambda items: reloads.append(len(items)))
+        store.update("pub_1", {"title": "Updated"})
+        assert store.get("pub_1")["title"] == "Updated"
+        assert reloads == []
+    finally:
+        store.close()
+
+
+def _legacy_db(path, items):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    for item in items:
+        conn.execute(
+            "INSERT INTO published_items (id, data) VALUES (?, ?)",
+            (item.get("id") or "", json.dumps(item)),
+        )
+    conn.commit()
+    conn.close()
+
+
+def test_old_databases_are_migrated_once(db_path, monkeypatch):
+    _legacy_db(db_path, [
+        {"id": "pub_1", "title": "Old item", "date": "01/02/2024"},
+        {"id": "pub_2"},  # no title: dropped by the v1 migration
+    ])
+    store = SQLitePublishStore(db_path)
+    try:
+        assert [item["id"] for item in store.list_items()] == ["pub_1"]
+        item = store.get("pub_1")
+        assert item["created_at"] == "01/02/2024"
+        assert item["tags"] == [] and item["image_variants"] is None
+    finally:
+        store.close()
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
+
+    def fail(data):
+        raise AssertionError("migrated twice")
+
+    monkeypatch.setattr(publish_sqlite, "migrate_store", fail)
+    SQLitePublishStore(db_path).close()
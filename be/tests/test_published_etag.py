@@ -0,0 +1,50 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import content
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(content.router, prefix="/api/v1")
+    content.publish_store.insert({"id": "pub_etag", "title": "Tram 28", "destination": "Lisbon", "views": 0, "shares": 0})
+    yield TestClient(app)
+    content.counter_buffer.flush()
+    content.publish_store.delete("pub_etag")
+
+
+def test_if_none_match_star_needs_an_existing_item(client):
+    assert client.get("/api/v1/published/pub_missing", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get("/api/v1/published/pub_etag", headers={"If-None-Match": "*"}).status_code == 304
+
+
+def test_counter_flush_keeps_etags_unless_sorted_by_counts(client):
+    content.counter_buffer.record("pub_etag", views=1)
+    item_etag = client.get("/api/v1/published/pub_etag").headers["etag"]
+    by_views = client.get("/api/v1/published", params={"sort": "views"}).headers["etag"]
+
+    content.counter_buffer.flush()
+    response = client.get("/api/v1/published/pub_etag", headers={"If-None-Match": item_etag})
+    assert response.status_code == 304
+    assert client.get("/api/v1/published", params={"sort": "views"}).headers["etag"] != by_views
+
+
+def test_body_built_during_a_write_is_not_cached_under_the_old_etag(client, monkeypatch):
+    etag = client.get("/api/v1/published/pub_etag").headers["etag"]
+    build = content._published_item
+    calls = []
+
+    def racing_build(item, fields):
+        calls.append(item["id"])
+        if len(calls) == 1:
+            content.publish_store.update("pub_etag", {"title": "Tram 28 at dawn"})
+        return build(item, fields)
+
+    monkeypatch.setattr(content, "_published_item", racing_build)
+    content.published_response_cache.clear()
+    response = client.get("/api/v1/published/pub_etag")
+    assert len(calls) == 2
+    assert response.headers["etag"] != etag
+    assert response.json()["title"] == "Tram 28 at dawn"
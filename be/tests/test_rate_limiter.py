@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from openai import APIConnectionError, APITimeoutError
+
+from app.core.config import settings
+from app.services.rate_limiter import RateLimiter, RateLimitTimeout, TokenBucket, call_limited
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+@pytest.fixture(autouse=True)
+def no_retries(monkeypatch):
+    monkeypatch.setattr(settings, "openai_max_retries", 0)
+    monkeypatch.setattr(settings, "openai_rate_limit_retries", 0)
+
+
+def _tokens_available(limiter):
+    return limiter.tokens.level(time.monotonic())
+
+
+def _tokens_charged(limiter):
+    return limiter.tokens.capacity - _tokens_available(limiter)
+
+
+def test_bucket_schedules_reservations_in_order():
+    bucket = TokenBucket(60)  # one unit per second
+    bucket.take(60, at=100.0)
+    assert bucket.available_at(1, now=100.0) == pytest.approx(101.0)
+    bucket.take(30, at=101.0)
+    # Later reservations queue behind earlier ones instead of jumping ahead
+    assert bucket.available_at(1, now=100.0) == pytest.approx(131.0)
+    bucket.give(30, now=100.0)
+    assert bucket.available_at(1, now=100.0) == pytest.approx(101.0)
+
+
+def test_reservation_over_max_wait_fails_at_once():
+    limiter = RateLimiter("test", rpm=0, tpm=600, max_wait=1)
+    asyncio.run(limiter.acquire(600))
+    with pytest.raises(RateLimitTimeout):
+        asyncio.run(limiter.acquire(100))
+    assert limiter.stats()["timeouts"] == 1
+
+
+def test_settle_returns_the_unused_reservation():
+    limiter = RateLimiter("test", rpm=0, tpm=1000, max_wait=0)
+    asyncio.run(limiter.acquire(1000))
+    limiter.settle(1000, 250)
+    assert _tokens_available(limiter) == pytest.approx(750, abs=1)
+    # Unknown usage keeps the reservation
+    limiter.settle(500, None)
+    assert _tokens_available(limiter) == pytest.approx(750, abs=1)
+
+
+def test_pause_holds_every_caller():
+    limiter = RateLimiter("test", rpm=600, tpm=0, max_wait=1)
+    limiter.pause(5)
+    with pytest.raises(RateLimitTimeout):
+        asyncio.run(limiter.acquire(0))
+    assert limiter.stats()["upstream_rate_limited"] == 1
+
+
+def test_cancelled_wait_frees_the_slot():
+    limiter = RateLimiter("test", rpm=0, tpm=60, max_wait=60)
+
+    async def scenario():
+        await limiter.acquire(60)
+        tat = limiter.tokens.tat
+        waiter = asyncio.ensure_future(limiter.acquire(30))
+        await asyncio.sleep(0.01)
+        assert limiter.tokens.tat == pytest.approx(tat + 30)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.tokens.tat == pytest.approx(tat, abs=0.1)
+
+    asyncio.run(scenario())
+
+
+def _call_failing_with(error, limiter, prompt_tokens=200):
+    async def call():
+        raise error
+
+    with pytest.raises(type(error)):
+        asyncio.run(call_limited(limiter, 1000, call, prompt_tokens=prompt_tokens))
+    return _tokens_charged(limiter)
+
+
+def test_connect_error_refunds_the_whole_reservation():
+    limiter = RateLimiter("test", rpm=0, tpm=10_000, max_wait=0)
+    assert _call_failing_with(APIConnectionError(request=REQUEST), limiter) == pytest.approx(0, abs=1)
+
+
+@pytest.mark.parametrize("error", [APITimeoutError(request=REQUEST), ValueError("bad payload")])
+def test_failures_after_sending_keep_the_prompt_tokens(error):
+    limiter = RateLimiter("test", rpm=0, tpm=10_000, max_wait=0)
+    assert _call_failing_with(error, limiter) == pytest.approx(200, abs=1)
+
+
+def test_cancellation_mid_call_keeps_the_prompt_tokens():
+    limiter = RateLimiter("test", rpm=0, tpm=10_000, max_wait=0)
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def call():
+            started.set()
+            await asyncio.sleep(60)
+
+        task = asyncio.ensure_future(call_limited(limiter, 1000, call, prompt_tokens=200))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert _tokens_charged(limiter) == pytest.approx(200, abs=1)
@@ -0,0 +1,99 @@
+import math
+import random
+
+import pytest
+
+from app.services.search_index import BM25_K1, SearchIndex, tokenize
+
+WORDS = ["food", "market", "tour", "temple", "walk", "tea", "tab", "tap", "tar", "night"] + [
+    f"w{i}" for i in range(200)
+]
+QUERIES = ["food", "market food tour", "ta", "temple walk", "night tea ta", "w1", "missing", "food w3"]
+
+
+def _items(count, seed=3):
+    rng = random.Random(seed)
+
+    def text(n):
+        # Zipf-like: the first words are in most items, so they get tiers
+        return " ".join(WORDS[min(int(rng.paretovariate(0.7)) - 1, len(WORDS) - 1)] for _ in range(n))
+
+    return [
+        {"id": f"item-{i}", "title": text(4), "tags": [text(1)], "content": text(30)}
+        for i in range(count)
+    ]
+
+
+def _brute_force(index, query, limit, offset):
+    """Score every posting: the reference the pruned search must match."""
+    tokens = list(dict.fromkeys(tokenize(query)))
+    count = len(index)
+    scores = {}
+    for pos, token in enumerate(tokens):
+        best = {}
+        for term, weight in index._expand(token, prefix=pos == len(tokens) - 1):
+            postings = index._postings[term]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for item_id, tf in postings.items():
+                value = weight * idf * (BM25_K1 + 1) * tf / (tf + index._norms[item_id])
+                best[item_id] = max(best.get(item_id, 0.0), value)
+        for item_id, value in best.items():
+            scores[item_id] = scores.get(item_id, 0.0) + value
+    ranked = sorted(scores.values(), reverse=True)[offset:offset + limit]
+    return [round(score, 4) for score in ranked], len(scores)
+
+
+def _assert_matches_brute_force(index):
+    for query in QUERIES:
+        for limit, offset in ((20, 0), (5, 10), (40, 200)):
+            hits, total = index.search(query, limit=limit, offset=offset)
+            assert ([score for _, score in hits], total) == _brute_force(index, query, limit, offset)
+
+
+@pytest.fixture
+def items():
+    return _items(1500)
+
+
+def test_pruned_search_matches_brute_force(items):
+    index = SearchIndex()
+    index.rebuild(items)
+    _assert_matches_brute_force(index)
+
+
+def test_search_stays_exact_after_updates(items):
+    index = SearchIndex()
+    index.rebuild(items[:1000])
+    index.search("market food tour")  # rank terms before they change
+    rng = random.Random(5)
+    for _ in range(200):
+        item = rng.choice(items)
+        if rng.random() < 0.4:
+            index.remove(item["id"])
+        else:
+            index.add({**item, "title": "market food " + item["title"]})
+    _assert_matches_brute_force(index)
+
+
+def test_sync_matches_rebuild(items):
+    index = SearchIndex()
+    index.rebuild(items[:1000])
+    index.search("food tour")
+    reloaded = [dict(item) for item in items[100:1200]]
+    for item in reloaded[:50]:
+        item["title"] += " temple"
+    index.sync(reloaded)
+    fresh = SearchIndex()
+    fresh.rebuild(reloaded)
+    assert len(index) == len(reloaded)
+    assert index._postings == fresh._postings
+    _assert_matches_brute_force(index)
+
+
+def test_sync_sees_lists_edited_in_place(items):
+    index = SearchIndex()
+    index.rebuild(items[:10])
+    items[0]["tags"].append("lighthouse")
+    index.sync(items[:10])
+    hits, _ = index.search("lighthouse")
+    assert [item_id for item_id, _ in hits] == [items[0]["id"]]
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import tokens
+from app.services.prompts import PromptRegistry, PromptTemplate
+
+
+class _WordEncoding:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+@pytest.fixture
+def no_tokenizer(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", None)
+
+
+def _tiktoken(monkeypatch, get_encoding):
+    monkeypatch.setattr(tokens, "tiktoken", SimpleNamespace(get_encoding=get_encoding))
+
+
+def test_unavailable_tokenizer_falls_back_to_the_estimate(no_tokenizer, monkeypatch):
+    def offline(name):
+        raise ConnectionError("cannot fetch cl100k_base.tiktoken")
+
+    _tiktoken(monkeypatch, offline)
+    assert not tokens.load_tokenizer()
+    assert tokens.tokenizer_name() == "estimate"
+    assert tokens.count_tokens("a" * 40) == tokens.estimate_tokens("a" * 40)
+
+
+def test_counting_never_loads_the_tokenizer(no_tokenizer, monkeypatch):
+    def unexpected(name):
+        raise AssertionError("loaded on the request path")
+
+    _tiktoken(monkeypatch, unexpected)
+    assert tokens.count_tokens("three short words") == tokens.estimate_tokens("three short words")
+
+
+def test_prompt_prefixes_are_recounted_once_the_tokenizer_loads(no_tokenizer, monkeypatch):
+    _tiktoken(monkeypatch, lambda name: _WordEncoding())
+    registry = PromptRegistry([PromptTemplate("t", "one two three four five six seven eight", "{x}")])
+    registry.load()
+    estimated = registry.get("t").prefix_tokens
+
+    assert tokens.load_tokenizer()
+    registry.load()
+    assert registry.get("t").prefix_tokens == 8 + tokens.MESSAGE_OVERHEAD_TOKENS != estimated
+    assert registry.stats()["tokenizer"] == tokens.settings.tokenizer_encoding